@@ -0,0 +1,203 @@
+# Admin-Routen: Export der Registrierungen (CSV oder JSON-Lines, gestreamt) und Statistiken
+# pro Schule mit Bestätigungs-Funnel. Zugriff nur mit "Authorization: Bearer <admin_token>";
+# ohne admin_token in der Konfiguration sind die Routen abgeschaltet (404).
+import csv
+import hmac
+import io
+import json
+import threading
+import time
+from log_handler import *
+from datetime import date, datetime, timedelta
+
+EXPORT_COLUMNS = (
+    'id', 'firstname', 'lastname', 'email', 'school', 'minecraft_username', 'minecraft_uuid', 'confirmed', 'created_at'
+)
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+DEFAULT_STATS_CACHE_TTL = 30
+
+# Zellen, die Excel & Co. als Formel auswerten würden (Formular-Eingaben sind nicht vertrauenswürdig)
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportFilterError(ValueError):
+    """
+    Ungültiger Filter- oder Format-Parameter beim Export (wird zu 400).
+    """
+
+
+def is_enabled(config) -> bool:
+    return bool(config.get('admin_token'))
+
+
+def is_authorized(authorization, config) -> bool:
+    """
+    Prüft den Authorization-Header ("Bearer <admin_token>") in konstanter Zeit.
+    """
+    token = config.get('admin_token')
+    if not token or not authorization:
+        return False
+    scheme, _, credentials = authorization.partition(' ')
+    if scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(credentials.strip().encode(), str(token).encode())
+
+
+def export_format(args) -> str:
+    fmt = (args.get('format') or 'csv').strip().lower()
+    if fmt not in EXPORT_CONTENT_TYPES:
+        raise ExportFilterError(f"format: erlaubt sind {', '.join(EXPORT_CONTENT_TYPES)}.")
+    return fmt
+
+
+def _parse_date(args, name):
+    value = (args.get(name) or '').strip()
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ExportFilterError(f"{name}: Datum im Format JJJJ-MM-TT erwartet.")
+
+
+def build_export_query(args):
+    """
+    SELECT für den Export aus den Filtern school, confirmed (0/1) und from/to (JJJJ-MM-TT,
+    beide inklusive). Liefert (query, params); die Filter treffen die Indizes
+    (school, confirmed) bzw. (confirmed, created_at).
+    """
+    conditions, params = [], []
+
+    school = (args.get('school') or '').strip()
+    if school:
+        conditions.append("school = %s")
+        params.append(school)
+
+    confirmed = (args.get('confirmed') or '').strip().lower()
+    if confirmed:
+        if confirmed not in ('0', '1', 'true', 'false'):
+            raise ExportFilterError("confirmed: 0 oder 1 erwartet.")
+        conditions.append("confirmed = %s")
+        params.append(1 if confirmed in ('1', 'true') else 0)
+
+    date_from, date_to = _parse_date(args, 'from'), _parse_date(args, 'to')
+    if date_from and date_to and date_from > date_to:
+        raise ExportFilterError("from liegt nach to.")
+    if date_from:
+        conditions.append("created_at >= %s")
+        params.append(datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        conditions.append("created_at < %s")
+        params.append(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {', '.join(EXPORT_COLUMNS)} FROM registrations{where} ORDER BY id", params
+
+
+def _export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    value = _export_value(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_header(fmt: str) -> str:
+    if fmt == 'csv':
+        return ','.join(EXPORT_COLUMNS) + '\r\n'
+    return ''
+
+
+def format_rows(rows, fmt: str) -> str:
+    """
+    Ein Block Zeilen (in der Reihenfolge von EXPORT_COLUMNS) als Text im gewünschten Format.
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+        return buffer.getvalue()
+    return ''.join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row))), ensure_ascii=False) + '\n' for row in rows
+    )
+
+
+def render_export(batches, fmt: str):
+    """
+    Generator für die Streaming-Response: Kopfzeile, dann ein Textblock pro DB-Block.
+    """
+    yield export_header(fmt)
+    for rows in batches:
+        yield format_rows(rows, fmt)
+
+
+def export_filename(fmt: str) -> str:
+    return f"registrations_{datetime.now().strftime('%Y%m%d_%H%M')}.{fmt}"
+
+
+def build_stats(school_rows, mail_rows, whitelisted) -> dict:
+    """
+    Baut aus den GROUP-BY-Ergebnissen [(school, confirmed, anzahl)] und [(status, anzahl)]
+    die Antwort von /admin/stats: Zahlen pro Schule und den Funnel
+    registriert -> bestätigt -> auf der Whitelist.
+    """
+    schools = {}
+    for school, confirmed, count in school_rows:
+        entry = schools.setdefault(school or '', {'registered': 0, 'confirmed': 0, 'pending': 0})
+        entry['registered'] += int(count)
+        entry['confirmed' if confirmed else 'pending'] += int(count)
+
+    funnel = {
+        key: sum(entry[key] for entry in schools.values()) for key in ('registered', 'confirmed', 'pending')
+    }
+    funnel['whitelisted'] = int(whitelisted) if whitelisted is not None else None
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'funnel': funnel,
+        'schools': [
+            {'school': school, **entry}
+            for school, entry in sorted(schools.items(), key=lambda item: (-item[1]['registered'], item[0]))
+        ],
+        'mail_queue': {status: int(count) for status, count in mail_rows},
+    }
+
+
+class StatsCache:
+    """
+    Hält die zuletzt berechneten Statistiken für 'admin_stats_cache_ttl' Sekunden (pro Prozess).
+    """
+
+    def __init__(self):
+        self._value = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if time.monotonic() < self._expires_at:
+                return self._value
+        return None
+
+    def put(self, value, ttl: float):
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + ttl
+
+
+stats_cache = StatsCache()
+
+
+def stats_cache_ttl(config) -> float:
+    return float(config.get('admin_stats_cache_ttl', DEFAULT_STATS_CACHE_TTL))
+
+
+def export_batch_size(config) -> int:
+    return int(config.get('admin_export_batch_size', DEFAULT_EXPORT_BATCH_SIZE))
@@ -0,0 +1,269 @@
+# Asynchroner Datenbankzugriff (aiomysql) für den ASGI-Modus (main_async.py).
+# Die SQL-Statements sind dieselben wie im synchronen DatabaseHandler.
+import aiomysql
+from pymysql.constants import ER
+from pymysql.err import IntegrityError, OperationalError, ProgrammingError
+from database_handler import (
+    CLAIM_MAIL_SELECT_QUERY, CLAIM_MAIL_UPDATE_QUERY, CONFIRM_REGISTRATION_BY_ID_QUERY, CONFIRM_REGISTRATION_QUERY,
+    ENQUEUE_MAIL_QUERY, ENQUEUE_MAIL_UNLESS_RECENT_QUERY, INSERT_WHITELIST_QUERY, LATEST_REGISTRATION_PROFILE_QUERY,
+    LOCK_REGISTRATION_QUERY, MAIL_STATUS_STATS_QUERY, MARK_MAIL_SENT_QUERY, PENDING_REGISTRATION_QUERY, REFRESH_REGISTRATION_QUERY,
+    REGISTRATION_STATS_QUERY, RENAME_WHITELIST_QUERY, RESCHEDULE_MAIL_QUERY, TRY_REGISTER_QUERY, UPSERT_WHITELIST_QUERY,
+    WHITELIST_UUID_INDEX_QUERY, WHITELISTED_REGISTRATIONS_QUERY, RegistrationResult
+)
+from log_handler import *
+from metrics_handler import timed
+
+_pool = None
+# Wie database_handler._whitelist_uuid_unique
+_whitelist_uuid_unique = None
+
+
+async def init_pool(config):
+    """
+    Baut den Verbindungs-Pool für die laufende Event-Loop auf (beim Serverstart).
+    """
+    global _pool
+    _pool = await aiomysql.create_pool(
+        host=config['db_host'],
+        port=config['db_port'],
+        user=config['db_user'],
+        password=config['db_password'],
+        db=config['db_database'],
+        charset='utf8mb4',
+        autocommit=True,
+        minsize=1,
+        maxsize=int(config.get('db_async_pool_size', 50)),
+        pool_recycle=int(config.get('db_pool_recycle', 3600))
+    )
+    logger.info(f"Asynchroner Datenbank-Pool initialisiert (max. {_pool.maxsize} Verbindungen).")
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+class AsyncDatabaseHandler:
+    """
+    Async-Gegenstück zum DatabaseHandler für den Request-Pfad und den Mail-Sender:
+        async with AsyncDatabaseHandler() as db:
+            result = await db.try_register(...)
+    """
+
+    def __init__(self):
+        self.conn = None
+
+    async def __aenter__(self):
+        self.conn = await _pool.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        if self.conn is not None:
+            try:
+                if exc_type is not None:
+                    await self.conn.rollback()
+            except Exception:
+                pass
+            finally:
+                _pool.release(self.conn)
+        self.conn = None
+
+    @timed('mysql')
+    async def try_register(self, firstname, lastname, email, school, minecraft_username, minecraft_uuid,
+                           max_users_per_mail, created_at, link_for=None):
+        """
+        Wie DatabaseHandler.try_register(): E-Mail-Limit und Benutzername atomar in einem Statement,
+        mit 'link_for' samt Bestätigungsmail in derselben Transaktion, Deadlocks bis zu zweimal wiederholt.
+        """
+        params = (firstname, lastname, email, school, minecraft_username, minecraft_uuid, created_at,
+                  email, max_users_per_mail)
+        attempts = 3
+        for attempt in range(1, attempts + 1):
+            await self.conn.begin()
+            try:
+                async with self.conn.cursor() as cursor:
+                    inserted = await cursor.execute(TRY_REGISTER_QUERY, params)
+                    registration_id = cursor.lastrowid
+                    if inserted and link_for is not None:
+                        await cursor.execute(ENQUEUE_MAIL_QUERY, (email, firstname, link_for(registration_id)))
+                await self.conn.commit()
+            except IntegrityError as error:
+                await self.conn.rollback()
+                if error.args[0] == ER.DUP_ENTRY:
+                    return RegistrationResult.USERNAME_TAKEN, None
+                raise
+            except OperationalError as error:
+                await self.conn.rollback()
+                if error.args[0] in (ER.LOCK_DEADLOCK, ER.LOCK_WAIT_TIMEOUT) and attempt < attempts:
+                    logger.info(f"Deadlock bei Registrierung von {email} – Versuch {attempt + 1}.")
+                    continue
+                raise
+            except Exception:
+                await self.conn.rollback()
+                raise
+
+            if inserted:
+                return RegistrationResult.OK, registration_id
+            return RegistrationResult.EMAIL_LIMIT, None
+
+    @timed('mysql')
+    async def refresh_pending_registration(self, email, minecraft_username, created_at):
+        """
+        Wie DatabaseHandler.refresh_pending_registration().
+        """
+        await self.conn.begin()
+        try:
+            async with self.conn.cursor() as cursor:
+                await cursor.execute(PENDING_REGISTRATION_QUERY, (email, minecraft_username))
+                row = await cursor.fetchone()
+                if row:
+                    await cursor.execute(REFRESH_REGISTRATION_QUERY, (created_at, row[0]))
+            await self.conn.commit()
+        except Exception:
+            await self.conn.rollback()
+            raise
+        return row
+
+    @timed('mysql')
+    async def get_user_count_by_email(self, email):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute("SELECT COUNT(*) FROM registrations WHERE email = %s", (email,))
+            return (await cursor.fetchone())[0]
+
+    @timed('mysql')
+    async def is_username_exists(self, minecraft_username):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute("SELECT 1 FROM registrations WHERE minecraft_username = %s LIMIT 1", (minecraft_username,))
+            return await cursor.fetchone() is not None
+
+    async def _write_whitelist(self, cursor, uuid, username):
+        """
+        Wie DatabaseHandler._write_whitelist().
+        """
+        global _whitelist_uuid_unique
+        if _whitelist_uuid_unique is None:
+            await cursor.execute(WHITELIST_UUID_INDEX_QUERY)
+            _whitelist_uuid_unique = await cursor.fetchone() is not None
+        if _whitelist_uuid_unique:
+            await cursor.execute(UPSERT_WHITELIST_QUERY, (uuid, username))
+        else:
+            await cursor.execute(RENAME_WHITELIST_QUERY, (username, uuid))
+            await cursor.execute(INSERT_WHITELIST_QUERY, (uuid, username, uuid))
+
+    @timed('mysql')
+    async def confirm_and_whitelist(self, registration_id, minecraft_username, uuid) -> bool:
+        """
+        Wie DatabaseHandler.confirm_and_whitelist().
+        """
+        await self.conn.begin()
+        try:
+            async with self.conn.cursor() as cursor:
+                await cursor.execute(LOCK_REGISTRATION_QUERY, (registration_id, minecraft_username))
+                if await cursor.fetchone() is None:
+                    await self.conn.rollback()
+                    return False
+                await cursor.execute(CONFIRM_REGISTRATION_BY_ID_QUERY, (registration_id,))
+                await self._write_whitelist(cursor, uuid, minecraft_username)
+            await self.conn.commit()
+        except Exception:
+            await self.conn.rollback()
+            raise
+        return True
+
+    @timed('mysql')
+    async def confirm_registration(self, email):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(CONFIRM_REGISTRATION_QUERY, (email,))
+
+    @timed('mysql')
+    async def get_latest_registration_profile(self, email):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(LATEST_REGISTRATION_PROFILE_QUERY, (email,))
+            return await cursor.fetchone()
+
+    @timed('mysql')
+    async def insert_into_whitelist(self, uuid, username):
+        try:
+            async with self.conn.cursor() as cursor:
+                await self._write_whitelist(cursor, uuid, username)
+            logger.info(f"Spieler {username} mit UUID {uuid} erfolgreich in mysql_whitelist eingetragen.")
+        except Exception as e:
+            logger.error(f"Fehler beim Eintragen in mysql_whitelist: {e}")
+
+    async def stream_rows(self, query, params, batch_size):
+        """
+        Wie DatabaseHandler.stream_rows(): Server-seitiger Cursor (SSCursor), Zeilen in Blöcken.
+        Beim Schliessen liest der Cursor einen abgebrochenen Rest selbst aus.
+        """
+        async with self.conn.cursor(aiomysql.SSCursor) as cursor:
+            await cursor.execute(query, params)
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    @timed('mysql')
+    async def get_registration_stats(self):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(REGISTRATION_STATS_QUERY)
+            school_rows = await cursor.fetchall()
+            await cursor.execute(MAIL_STATUS_STATS_QUERY)
+            mail_rows = await cursor.fetchall()
+            try:
+                await cursor.execute(WHITELISTED_REGISTRATIONS_QUERY)
+                whitelisted = (await cursor.fetchone())[0]
+            except ProgrammingError as error:
+                if error.args[0] != ER.NO_SUCH_TABLE:
+                    raise
+                whitelisted = None
+        return school_rows, mail_rows, whitelisted
+
+    @timed('mysql')
+    async def enqueue_mail(self, recipient, firstname, confirmation_link):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(ENQUEUE_MAIL_QUERY, (recipient, firstname, confirmation_link))
+            return cursor.lastrowid
+
+    @timed('mysql')
+    async def enqueue_mail_unless_recent(self, recipient, firstname, confirmation_link, cooldown_seconds):
+        async with self.conn.cursor() as cursor:
+            inserted = await cursor.execute(
+                ENQUEUE_MAIL_UNLESS_RECENT_QUERY,
+                (recipient, firstname, confirmation_link, recipient, cooldown_seconds)
+            )
+            return cursor.lastrowid if inserted else None
+
+    @timed('mysql')
+    async def claim_mail_batch(self, batch_size, lease_seconds):
+        """
+        Wie DatabaseHandler.claim_mail_batch().
+        """
+        await self.conn.begin()
+        try:
+            async with self.conn.cursor() as cursor:
+                await cursor.execute(CLAIM_MAIL_SELECT_QUERY, (batch_size,))
+                rows = await cursor.fetchall()
+                if rows:
+                    ids = [row[0] for row in rows]
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    await cursor.execute(CLAIM_MAIL_UPDATE_QUERY.format(placeholders=placeholders), (lease_seconds, *ids))
+            await self.conn.commit()
+        except Exception:
+            await self.conn.rollback()
+            raise
+        return [(mail_id, recipient, firstname, link, attempts + 1) for mail_id, recipient, firstname, link, attempts in rows]
+
+    @timed('mysql')
+    async def mark_mail_sent(self, mail_id):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(MARK_MAIL_SENT_QUERY, (mail_id,))
+
+    @timed('mysql')
+    async def reschedule_mail(self, mail_id, delay_seconds, error, failed=False):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(RESCHEDULE_MAIL_QUERY, ('failed' if failed else 'pending', delay_seconds, str(error)[:1000], mail_id))
@@ -0,0 +1,32 @@
+# Benchmark: Wie viele Bestätigungsmails (inkl. Serialisierung) pro Sekunde gebaut werden
+#   python benchmarks/bench_mail_build.py [--count 5000] [--config config.example.json]
+import sys, os, json, time, argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mail_handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bestätigungsmails pro Sekunde bauen")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--config", default="config.example.json")
+    args = parser.parse_args()
+
+    with open(args.config, encoding="utf-8") as file:
+        config = json.load(file)
+    config["debug"] = False
+    mail_handler.configure(config)
+
+    started = time.perf_counter()
+    for i in range(args.count):
+        msg = mail_handler.build_confirmation_email(
+            f"schueler{i}@sluz.ch", f"https://example.com/confirm_page/token{i}", "Anna"
+        )
+        msg.as_bytes()
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.count} Mails in {elapsed:.2f}s -> {args.count / elapsed:.0f} Mails/s")
+
+
+if __name__ == "__main__":
+    main()
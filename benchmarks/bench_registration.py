@@ -0,0 +1,244 @@
+# End-to-End-Benchmark: /register -> Bestätigungsmail -> /confirm_page -> /confirm
+# gegen lokale Stand-ins (Mojang, SMTP, IMAP) und eine Wegwerf-Datenbank auf einem MySQL-Server
+# (oder mit --db-backend sqlite ganz ohne Server in einer SQLite-Datei im Arbeitsverzeichnis).
+#   python benchmarks/bench_registration.py --db-user root --db-password secret \
+#       [--users 200] [--concurrency 8] [--mojang-latency 0.05] [--mojang-error-rate 0.01] \
+#       [--save-baseline benchmarks/baselines/registration.json] [--baseline ...] [--tolerance 0.25]
+# Ohne --db-* werden KSR_BENCH_DB_HOST/PORT/USER/PASSWORD aus der Umgebung verwendet.
+import sys, os, json, time, argparse, tempfile, threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+
+from standins import FakeImap, FakeMojang, SmtpSink
+
+ROUTES = ("register", "mail_delivery", "confirm_page", "confirm")
+
+
+class Recorder:
+    """
+    Sammelt Latenzen und Fehler pro Route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok=True):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(p / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    summary = {}
+    for route in ROUTES:
+        values = sorted(recorder.latencies.get(route, []))
+        summary[route] = {
+            "count": len(values),
+            "errors": recorder.errors.get(route, 0),
+            "throughput": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    return summary
+
+
+def print_report(summary, elapsed, completed):
+    print(f"\n{'Route':<15}{'n':>7}{'Fehler':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, row in summary.items():
+        print(f"{route:<15}{row['count']:>7}{row['errors']:>8}{row['throughput']:>10.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    print(f"\n{completed} vollständige Registrierungen in {elapsed:.2f}s -> {completed / elapsed:.1f}/s")
+
+
+def compare_with_baseline(summary, baseline, tolerance) -> list:
+    """
+    Liefert die Regressionen gegenüber der Baseline (leer = alles OK).
+    """
+    regressions = []
+    for route, base in baseline["routes"].items():
+        current = summary.get(route)
+        if not current or not base["count"]:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {current['p95_ms']:.1f} ms (Baseline {base['p95_ms']:.1f} ms)")
+        if current["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{route}: {current['throughput']:.1f} req/s (Baseline {base['throughput']:.1f} req/s)")
+        if current["count"] and current["errors"] / current["count"] > base["errors"] / base["count"] + 0.01:
+            regressions.append(f"{route}: Fehlerquote {current['errors']}/{current['count']} (Baseline {base['errors']}/{base['count']})")
+    return regressions
+
+
+def write_environment(workdir, args, database, mojang, smtp, imap):
+    """
+    config.json und secret_key.json für die App im Arbeitsverzeichnis anlegen.
+    """
+    config = {
+        "debug": False,
+        "max_users_per_mail": 3,
+        "waiting_time_for_db_cleaner": 60,
+        "accepted_mail_endings": ["bench.test"],
+        "log_retention_days": 0,
+        # Alle simulierten Nutzer kommen von 127.0.0.1: IP-Limits würden den Lauf drosseln
+        "rate_limits": {"register_ip": None, "confirm_ip": None},
+        "url_discord": "https://example.com",
+        "support_mail": "support@bench.test",
+        "url_get_connected": "https://example.com",
+        "db_backend": args.db_backend,
+        "db_sqlite_path": os.path.join(workdir, "registration.db"),
+        "db_host": args.db_host,
+        "db_port": args.db_port,
+        "db_user": args.db_user,
+        "db_password": args.db_password,
+        "db_database": database,
+        "db_pool_size": args.concurrency + 4,
+        "mojang_api_base": mojang.url,
+        "mojang_retries": 0,
+        "mail_queue_poll_interval": 0.2,
+        "smtp_server": "127.0.0.1",
+        "smtp_port": smtp.port,
+        "smtp_username": "bench@bench.test",
+        "smtp_password": "bench",
+        "sender_display_name": "Benchmark",
+        "imap_save_sent": True,
+        "imap_server": "127.0.0.1",
+        "imap_port": imap.port,
+        "imap_ssl": False,
+    }
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as file:
+        json.dump(config, file)
+    with open(os.path.join(workdir, "secret_key.json"), "w", encoding="utf-8") as file:
+        json.dump({"secret_key": "benchmark"}, file)
+    return os.path.join(workdir, "config.json")
+
+
+def run_user(app, index, smtp, recorder, mail_timeout) -> bool:
+    client = app.test_client()
+    email = f"user{index}@bench.test"
+    form = {
+        "firstname": "Bench", "lastname": f"User{index}", "email": email,
+        "school": "KSR", "minecraft_username": f"bench{index:06d}",
+    }
+
+    started = time.perf_counter()
+    response = client.post("/register", data=form)
+    registered = response.status_code == 302
+    recorder.record("register", time.perf_counter() - started, ok=registered)
+    if not registered:
+        return False
+
+    token = smtp.wait_for_token(email, mail_timeout)
+    recorder.record("mail_delivery", time.perf_counter() - started, ok=token is not None)
+    if token is None:
+        return False
+
+    started = time.perf_counter()
+    response = client.get(f"/confirm_page/{token}")
+    recorder.record("confirm_page", time.perf_counter() - started, ok=response.status_code == 200)
+
+    started = time.perf_counter()
+    response = client.post("/confirm", data={"token": token})
+    confirmed = response.status_code == 302
+    recorder.record("confirm", time.perf_counter() - started, ok=confirmed)
+    return confirmed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-End-Benchmark der Registrierung")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mojang-latency", type=float, default=0.05, help="Sekunden pro Mojang-Aufruf")
+    parser.add_argument("--mojang-error-rate", type=float, default=0.0, help="Anteil 503-Antworten (0..1)")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="Sekunden pro Mail (DATA)")
+    parser.add_argument("--imap-latency", type=float, default=0.0, help="Sekunden pro APPEND")
+    parser.add_argument("--mail-timeout", type=float, default=30.0)
+    parser.add_argument("--db-backend", choices=("mysql", "sqlite"), default="mysql")
+    parser.add_argument("--db-host", default=os.environ.get("KSR_BENCH_DB_HOST", "127.0.0.1"))
+    parser.add_argument("--db-port", type=int, default=int(os.environ.get("KSR_BENCH_DB_PORT", 3306)))
+    parser.add_argument("--db-user", default=os.environ.get("KSR_BENCH_DB_USER", "root"))
+    parser.add_argument("--db-password", default=os.environ.get("KSR_BENCH_DB_PASSWORD", ""))
+    parser.add_argument("--keep-db", action="store_true", help="Wegwerf-Datenbank nicht löschen")
+    parser.add_argument("--save-baseline", help="Ergebnis als Baseline (JSON) speichern")
+    parser.add_argument("--baseline", help="Mit dieser Baseline vergleichen (Exit-Code 1 bei Regression)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Erlaubte Abweichung zur Baseline")
+    args = parser.parse_args()
+
+    # Pfade vor dem Wechsel ins Arbeitsverzeichnis auflösen
+    args.save_baseline = args.save_baseline and os.path.abspath(args.save_baseline)
+    args.baseline = args.baseline and os.path.abspath(args.baseline)
+
+    mojang = FakeMojang(args.mojang_latency, args.mojang_error_rate).start()
+    smtp = SmtpSink(args.smtp_latency).start()
+    imap = FakeImap(args.imap_latency).start()
+
+    # Wegwerf-Datenbank (SQLite: Datei im Arbeitsverzeichnis)
+    database = f"ksr_bench_{int(time.time())}_{os.getpid()}"
+    admin = None
+    if args.db_backend == "mysql":
+        admin = mysql.connector.connect(host=args.db_host, port=args.db_port, user=args.db_user, password=args.db_password)
+        with admin.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE `{database}`")
+
+    # Die App liest config.json/secret_key.json und schreibt logs/ im Arbeitsverzeichnis
+    workdir = tempfile.mkdtemp(prefix="ksr-bench-")
+    os.environ["KSR_CONFIG"] = write_environment(workdir, args, database, mojang, smtp, imap)
+    os.chdir(workdir)
+
+    try:
+        import main as app_module
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(
+                lambda i: run_user(app_module.app, i, smtp, recorder, args.mail_timeout), range(args.users)
+            ))
+        elapsed = time.perf_counter() - started
+
+        summary = summarize(recorder, elapsed)
+        print_report(summary, elapsed, sum(results))
+        print(f"Mojang-Aufrufe: {mojang.calls}, Mails: {smtp.messages}, IMAP-APPENDs: {imap.appended}")
+
+        if args.save_baseline:
+            os.makedirs(os.path.dirname(args.save_baseline), exist_ok=True)
+            with open(args.save_baseline, "w", encoding="utf-8") as file:
+                json.dump({"args": vars(args) | {"db_password": None}, "routes": summary}, file, indent=2)
+            print(f"Baseline gespeichert: {args.save_baseline}")
+
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as file:
+                regressions = compare_with_baseline(summary, json.load(file), args.tolerance)
+            if regressions:
+                print("\nRegressionen gegenüber der Baseline:")
+                for line in regressions:
+                    print(f"  - {line}")
+                sys.exit(1)
+            print("\nKeine Regression gegenüber der Baseline.")
+    finally:
+        if admin is not None:
+            if not args.keep_db:
+                with admin.cursor() as cursor:
+                    cursor.execute(f"DROP DATABASE `{database}`")
+            admin.close()
+        mojang.stop()
+        smtp.stop()
+        imap.stop()
+
+
+if __name__ == "__main__":
+    main()
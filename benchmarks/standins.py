@@ -0,0 +1,242 @@
+# Lokale Stand-ins für die Benchmarks: Mojang-API (HTTP), SMTP-Senke und IMAP-Endpunkt.
+# Latenz und Fehlerquote sind einstellbar; alle Server laufen als Threads auf 127.0.0.1.
+import email, json, random, re, socketserver, threading, time, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server:
+    """
+    Gemeinsame Start/Stop-Logik für die Stand-ins.
+    """
+    server = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+# --------------------------------------------------------------------------
+# Mojang
+# --------------------------------------------------------------------------
+
+def fake_uuid(username: str) -> str:
+    return uuid.uuid5(uuid.NAMESPACE_DNS, username.lower()).hex
+
+
+class FakeMojang(_Server):
+    """
+    GET /users/profiles/minecraft/<name> und POST /profiles/minecraft.
+    Jeder Name existiert, ausser er beginnt mit 'unknown'.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status, payload=None):
+                body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _simulate(self) -> bool:
+                stand_in.calls += 1
+                if stand_in.latency:
+                    time.sleep(stand_in.latency)
+                if random.random() < stand_in.error_rate:
+                    self._reply(503, {"error": "injected"})
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self._simulate():
+                    return
+                name = self.path.rsplit("/", 1)[-1]
+                if name.lower().startswith("unknown"):
+                    self._reply(404, {"errorMessage": f"Couldn't find any profile with name {name}"})
+                else:
+                    self._reply(200, {"id": fake_uuid(name), "name": name})
+
+            def do_POST(self):
+                names = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if not self._simulate():
+                    return
+                self._reply(200, [
+                    {"id": fake_uuid(name), "name": name}
+                    for name in names if not name.lower().startswith("unknown")
+                ])
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+
+# --------------------------------------------------------------------------
+# SMTP
+# --------------------------------------------------------------------------
+
+CONFIRM_LINK_PATTERN = re.compile(r"/confirm_page/([A-Za-z0-9_.\-]+)")
+
+
+class SmtpSink(_Server):
+    """
+    Minimaler SMTP-Server (EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT).
+    Merkt sich pro Empfänger den Token aus dem Bestätigungslink.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.messages = 0
+        self._tokens = {}
+        self._cond = threading.Condition()
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                self.reply("220 smtp-sink ESMTP")
+                recipients = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors="replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb == "EHLO":
+                        self.wfile.write(b"250-smtp-sink\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n")
+                    elif verb == "AUTH":
+                        self.reply("235 2.7.0 Authentication successful")
+                    elif verb == "RCPT":
+                        recipients.append(command.split(":", 1)[1].strip(" <>"))
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        data = []
+                        while True:
+                            chunk = self.rfile.readline()
+                            if not chunk or chunk == b".\r\n":
+                                break
+                            data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                        if stand_in.latency:
+                            time.sleep(stand_in.latency)
+                        stand_in._deliver(recipients, b"".join(data))
+                        recipients = []
+                        self.reply("250 OK queued")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    elif verb in ("HELO", "MAIL", "RSET", "NOOP"):
+                        self.reply("250 OK")
+                    else:
+                        self.reply("502 Command not implemented")
+
+        self.server = _ThreadingTCPServer(("127.0.0.1", 0), Handler)
+
+    def _deliver(self, recipients, raw: bytes):
+        message = email.message_from_bytes(raw)
+        token = None
+        for part in message.walk():
+            if part.get_content_type() == "text/plain":
+                match = CONFIRM_LINK_PATTERN.search(part.get_payload(decode=True).decode("utf-8", "replace"))
+                token = match.group(1) if match else None
+                break
+        with self._cond:
+            self.messages += 1
+            for recipient in recipients:
+                self._tokens[recipient.lower()] = token
+            self._cond.notify_all()
+
+    def wait_for_token(self, recipient: str, timeout: float):
+        """
+        Wartet, bis die Bestätigungsmail für 'recipient' angekommen ist.
+        """
+        key = recipient.lower()
+        with self._cond:
+            self._cond.wait_for(lambda: key in self._tokens, timeout)
+            return self._tokens.pop(key, None)
+
+
+# --------------------------------------------------------------------------
+# IMAP
+# --------------------------------------------------------------------------
+
+class FakeImap(_Server):
+    """
+    Minimaler IMAP-Server ohne TLS (CAPABILITY, LOGIN, APPEND, SELECT/EXAMINE, SEARCH, NOOP, LOGOUT).
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.appended = 0
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                self.reply("* OK fake IMAP4rev1 ready")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    parts = line.decode(errors="replace").strip().split(" ", 2)
+                    if len(parts) < 2:
+                        continue
+                    tag, command = parts[0], parts[1].upper()
+                    if command == "CAPABILITY":
+                        self.reply("* CAPABILITY IMAP4rev1")
+                        self.reply(f"{tag} OK CAPABILITY completed")
+                    elif command == "APPEND":
+                        size = int(re.search(r"\{(\d+)\}$", parts[2]).group(1))
+                        self.reply("+ Ready for literal data")
+                        self.rfile.read(size)
+                        self.rfile.readline()
+                        if stand_in.latency:
+                            time.sleep(stand_in.latency)
+                        stand_in.appended += 1
+                        self.reply(f"{tag} OK APPEND completed")
+                    elif command in ("SELECT", "EXAMINE"):
+                        self.reply(f"* {stand_in.appended} EXISTS")
+                        self.reply(f"{tag} OK {command} completed")
+                    elif command == "SEARCH":
+                        self.reply(f"* SEARCH {stand_in.appended}")
+                        self.reply(f"{tag} OK SEARCH completed")
+                    elif command == "LOGOUT":
+                        self.reply("* BYE logging out")
+                        self.reply(f"{tag} OK LOGOUT completed")
+                        return
+                    elif command in ("LOGIN", "NOOP"):
+                        self.reply(f"{tag} OK {command} completed")
+                    else:
+                        self.reply(f"{tag} BAD unknown command")
+
+        self.server = _ThreadingTCPServer(("127.0.0.1", 0), Handler)
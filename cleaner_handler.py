@@ -0,0 +1,155 @@
+# Datenbank-Cleaner: löscht unbestätigte Registrierungen nach Ablauf des Zeitfensters
+import threading
+import time
+from datetime import datetime, timedelta
+import mojang_handler
+from config_handler import get_config
+from database_handler import DatabaseHandler, get_pool_stats
+from metrics_handler import CLEANER_DELETED
+from log_handler import *
+
+# Nur eine Instanz im ganzen Deployment darf gleichzeitig bereinigen
+CLEANER_LOCK_NAME = 'ksr_registration_cleaner'
+
+# Mindestabstand zwischen zwei Durchläufen (Sekunden), bzw. wenn eine andere Instanz bereinigt
+MIN_PASS_INTERVAL = 1.0
+BUSY_RETRY_INTERVAL = 5.0
+
+_stats_lock = threading.Lock()
+_stats = {"passes": 0, "skipped": 0, "deleted_total": 0, "last_deleted": 0, "last_duration_ms": 0.0}
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def next_pass_delay(deadline, window_seconds: float, min_wait: float = 0.0, now: datetime = None) -> float:
+    """
+    Sekunden bis zum nächsten Durchlauf: bis zur Ablauf-Deadline der ältesten unbestätigten
+    Registrierung (aus der DB), höchstens ein Zeitfenster und mindestens 'min_wait'.
+
+    Das Zeitfenster als Obergrenze genügt auch ohne bekannte Deadline: Jede danach (von
+    irgendeinem Prozess) eingefügte Registrierung läuft frühestens ein Zeitfenster später ab.
+    """
+    delay = window_seconds
+    if deadline is not None:
+        delay = min(delay, (deadline - (now or datetime.now())).total_seconds())
+    return max(delay, min_wait)
+
+
+def get_next_deadline(config):
+    """
+    Nächster Ablaufzeitpunkt laut DB oder None, wenn nichts unbestätigt ist.
+    """
+    with DatabaseHandler(config) as db:
+        oldest = db.get_oldest_unconfirmed_created_at()
+    if oldest is None:
+        return None
+    return oldest + timedelta(minutes=config['waiting_time_for_db_cleaner'])
+
+
+def wait_for_next_pass(config, skipped: bool = False):
+    """
+    Wartet bis zum nächsten fälligen Durchlauf.
+    """
+    window_seconds = config['waiting_time_for_db_cleaner'] * 60
+    deadline = get_next_deadline(config)
+    min_wait = BUSY_RETRY_INTERVAL if skipped else MIN_PASS_INTERVAL
+    if deadline is not None:
+        logger.info(f"Nächster Ablauf einer Registrierung: {deadline:%Y-%m-%d %H:%M:%S}")
+    time.sleep(next_pass_delay(deadline, window_seconds, min_wait))
+
+
+def run_cleanup_pass(config):
+    """
+    Ein Durchlauf des Cleaners:
+    - holt den MySQL-Lock (GET_LOCK); hält ihn eine andere Instanz, wird übersprungen
+    - löscht in Blöcken von 'cleaner_chunk_size' Zeilen per Primärschlüssel
+    - loggt genau die gelöschten Zeilen
+    Rückgabe: Anzahl gelöschter Zeilen oder None, wenn übersprungen.
+    """
+    time_difference = config['waiting_time_for_db_cleaner']
+    chunk_size = int(config.get('cleaner_chunk_size', 500))
+    started = time.monotonic()
+
+    with DatabaseHandler(config) as db:
+        if not db.acquire_lock(CLEANER_LOCK_NAME):
+            logger.info("Datenbank-Cleaner läuft bereits auf einer anderen Instanz – Durchlauf übersprungen.")
+            with _stats_lock:
+                _stats["skipped"] += 1
+            return None
+
+        deleted_count = 0
+        try:
+            cutoff = datetime.now() - timedelta(minutes=time_difference)
+            while True:
+                deleted = db.delete_unconfirmed_chunk(cutoff, chunk_size)
+                for _, email, minecraft_username in deleted:
+                    logger.info(f"Gelöscht – Email: {email}, Minecraft-Benutzername: {minecraft_username}")
+                deleted_count += len(deleted)
+                if len(deleted) < chunk_size:
+                    break
+        finally:
+            db.release_lock(CLEANER_LOCK_NAME)
+
+    duration_ms = (time.monotonic() - started) * 1000
+    with _stats_lock:
+        _stats["passes"] += 1
+        _stats["deleted_total"] += deleted_count
+        _stats["last_deleted"] = deleted_count
+        _stats["last_duration_ms"] = duration_ms
+    CLEANER_DELETED.inc(deleted_count)
+
+    if deleted_count > 0:
+        logger.info(f"{deleted_count} Einträge wurden gelöscht ({duration_ms:.0f} ms).")
+    else:
+        logger.info(f"Es wurden keine Einträge gelöscht ({duration_ms:.0f} ms).")
+    return deleted_count
+
+
+# Laufzeit-Statistiken (Pool, Mojang) ins Log schreiben
+def log_runtime_stats():
+    pool_stats = get_pool_stats()
+    if pool_stats:
+        logger.info(
+            f"DB-Pool: Grösse {pool_stats['size']}, in Benutzung {pool_stats['in_use']}, "
+            f"frei {pool_stats['idle']}, Checkouts {pool_stats['checkouts']}, "
+            f"Wartezeit Ø {pool_stats['wait_avg_ms']:.1f} ms / max {pool_stats['wait_max_ms']:.1f} ms, "
+            f"Checkout-Latenz Ø {pool_stats['checkout_avg_ms']:.1f} ms"
+        )
+
+    mojang_stats = mojang_handler.get_stats()
+    logger.info(
+        f"Mojang-API: {mojang_stats['calls']} Aufrufe, {mojang_stats['errors']} Fehler, "
+        f"Latenz Ø {mojang_stats['latency_avg_ms']:.0f} ms / max {mojang_stats['latency_max_ms']:.0f} ms, "
+        f"Breaker {mojang_stats['breaker_state']}"
+    )
+
+
+# Unbestätigte Registrierungen bereinigen: läuft jeweils zur nächsten Ablauf-Deadline
+def run_cleaner():
+    last_stats = 0.0
+    while True:
+        try:
+            logger.info("Starte Datenbank-Cleaner.")
+            config = get_config()
+            deleted = run_cleanup_pass(config)
+
+            # Statistiken höchstens einmal pro Zeitfenster
+            if time.monotonic() - last_stats >= config['waiting_time_for_db_cleaner'] * 60:
+                log_runtime_stats()
+                last_stats = time.monotonic()
+
+            wait_for_next_pass(config, skipped=deleted is None)
+        except Exception as e:
+            logger.error(f"Fehler beim Bereinigen der unbestätigten Registrierungen: {e}")
+            time.sleep(30)
+
+
+def start_cleaner():
+    cleanup_thread = threading.Thread(target=run_cleaner, name='db-cleaner')
+    cleanup_thread.daemon = True
+    cleanup_thread.start()
+    logger.info("Cleanup-Thread gestartet.")
+    return cleanup_thread
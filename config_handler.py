@@ -0,0 +1,242 @@
+# Zentrale Konfiguration: config.json wird einmal geladen, geprüft und als
+# unveränderlicher Snapshot bereitgestellt (Hot-Reload bei Dateiänderung oder SIGHUP)
+import json
+import os
+import signal
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+from log_handler import *
+
+CONFIG_PATH = os.environ.get('KSR_CONFIG', 'config.json')
+
+# Wie oft (Sekunden) get_config() höchstens die mtime der Datei prüft
+RELOAD_CHECK_INTERVAL = 1.0
+
+REQUIRED_KEYS = {
+    'db_host': str,
+    'db_port': int,
+    'db_user': str,
+    'db_password': str,
+    'db_database': str,
+    'waiting_time_for_db_cleaner': (int, float),
+    'smtp_server': str,
+    'smtp_port': int,
+    'smtp_username': str,
+    'smtp_password': str,
+}
+
+
+class ConfigError(ValueError):
+    """
+    config.json fehlt, ist kein gültiges JSON oder enthält ungültige Werte.
+    """
+
+
+def _normalize_email(value: str) -> str:
+    """
+    Normalisiert E-Mail für Vergleiche (case-insensitive).
+    """
+    return (value or "").strip().lower()
+
+
+class EmailPolicy:
+    """
+    Vorberechnete E-Mail-Regeln aus der Konfiguration.
+    - email_user_limits: normalisierte Hash-Map { "mail@domain.tld": int_limit }
+    - accepted_mail_endings: Menge der Endungen; geprüft werden die Suffixe der
+      Adresse, der Aufwand hängt also nicht von der Anzahl Endungen ab
+    """
+
+    def __init__(self, cfg: Mapping):
+        self.default_max = int(cfg.get("max_users_per_mail", 3))
+
+        limits = {}
+        for k, v in (cfg.get("email_user_limits", {}) or {}).items():
+            try:
+                limits[_normalize_email(str(k))] = int(v)
+            except Exception:
+                # Falls jemand Mist einträgt, ignorieren wir den Eintrag
+                logger.warning(f"Ungültiger Eintrag in email_user_limits ignoriert: {k}={v!r}")
+        self.limits = MappingProxyType(limits)
+
+        self.accepted_mail_endings = tuple(cfg.get("accepted_mail_endings", []) or [])
+        self._endings = frozenset(str(ending).lower() for ending in self.accepted_mail_endings)
+
+    def _has_accepted_ending(self, email_lc: str) -> bool:
+        endings = self._endings
+        for start in range(len(email_lc) + 1):
+            if email_lc[start:] in endings:
+                return True
+        return False
+
+    def is_allowed(self, email: str) -> bool:
+        """
+        Erlaubt sind:
+          - E-Mails, deren Endung in accepted_mail_endings vorkommt
+          - ODER E-Mails, die explizit in email_user_limits stehen (auch ohne @sluz.ch)
+        """
+        email_lc = _normalize_email(email)
+        return email_lc in self.limits or self._has_accepted_ending(email_lc)
+
+    def max_users(self, email: str) -> int:
+        """
+        Standard: max_users_per_mail (Fallback 3)
+        Override: email_user_limits[email] (case-insensitive)
+        """
+        return self.limits.get(_normalize_email(email), self.default_max)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class ConfigSnapshot(Mapping):
+    """
+    Unveränderlicher Stand der Konfiguration. Verhält sich wie ein (read-only)
+    dict, zusätzlich mit vorberechneter E-Mail-Policy und Versionsnummer.
+    """
+
+    def __init__(self, raw: dict, version: int = 1, mtime: float = 0.0):
+        self._data = _freeze(raw)
+        self.email_policy = EmailPolicy(raw)
+        self.version = version
+        self.mtime = mtime
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def validate_config(raw) -> dict:
+    if not isinstance(raw, dict):
+        raise ConfigError("config.json muss ein JSON-Objekt enthalten.")
+
+    errors = []
+    backend = raw.get('db_backend', 'mysql')
+    if backend not in ('mysql', 'sqlite'):
+        errors.append("'db_backend' muss \"mysql\" oder \"sqlite\" sein")
+    for key, expected in REQUIRED_KEYS.items():
+        if backend == 'sqlite' and key.startswith('db_'):
+            continue  # eingebettete Datenbank, keine Zugangsdaten nötig
+        if key not in raw:
+            errors.append(f"'{key}' fehlt")
+        elif not isinstance(raw[key], expected) or isinstance(raw[key], bool):
+            errors.append(f"'{key}' hat den falschen Typ ({type(raw[key]).__name__})")
+
+    if not isinstance(raw.get('accepted_mail_endings', []) or [], list):
+        errors.append("'accepted_mail_endings' muss eine Liste sein")
+    if not isinstance(raw.get('email_user_limits', {}) or {}, dict):
+        errors.append("'email_user_limits' muss ein Objekt sein")
+
+    if errors:
+        raise ConfigError("Ungültige Konfiguration: " + ", ".join(errors))
+    return raw
+
+
+def load_config(path: str = None, version: int = 1) -> ConfigSnapshot:
+    path = path or CONFIG_PATH
+    try:
+        mtime = os.stat(path).st_mtime
+        with open(path, encoding="utf-8") as file:
+            raw = json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ConfigError(f"{path} konnte nicht gelesen werden: {e}") from e
+
+    return ConfigSnapshot(validate_config(raw), version=version, mtime=mtime)
+
+
+_snapshot = None
+_seen_mtime = None
+_last_check = 0.0
+_reload_requested = False
+_lock = threading.Lock()
+
+
+def reload_config() -> ConfigSnapshot:
+    """
+    Lädt config.json neu. Bei Fehlern bleibt der bisherige Stand aktiv.
+    """
+    global _snapshot, _seen_mtime
+    with _lock:
+        version = _snapshot.version + 1 if _snapshot else 1
+        try:
+            _snapshot = load_config(version=version)
+            _seen_mtime = _snapshot.mtime
+            logger.info(f"Konfiguration geladen (Version {version}).")
+        except ConfigError as e:
+            if _snapshot is None:
+                raise
+            logger.error(f"Neue Konfiguration verworfen, bisheriger Stand bleibt aktiv: {e}")
+        return _snapshot
+
+
+def get_config() -> ConfigSnapshot:
+    """
+    Liefert den aktuellen Snapshot. Prüft höchstens einmal pro Sekunde,
+    ob config.json geändert wurde oder ein SIGHUP eingegangen ist.
+    """
+    global _last_check, _reload_requested, _seen_mtime
+    snapshot = _snapshot
+    if snapshot is None:
+        return reload_config()
+
+    now = time.monotonic()
+    if now - _last_check < RELOAD_CHECK_INTERVAL and not _reload_requested:
+        return snapshot
+    _last_check = now
+
+    try:
+        mtime = os.stat(CONFIG_PATH).st_mtime
+    except OSError:
+        mtime = _seen_mtime
+
+    # Jede Dateiversion nur einmal versuchen (auch wenn sie ungültig ist)
+    if mtime != _seen_mtime or _reload_requested:
+        _seen_mtime = mtime
+        _reload_requested = False
+        return reload_config()
+    return snapshot
+
+
+def _handle_sighup(signum, frame):
+    global _reload_requested
+    _reload_requested = True
+
+
+def install_reload_signal():
+    """
+    SIGHUP löst einen Reload beim nächsten get_config() aus.
+    (Unter Gunicorn gehört SIGHUP dem Master; dort greift die mtime-Prüfung.)
+    """
+    try:
+        signal.signal(signal.SIGHUP, _handle_sighup)
+    except (ValueError, AttributeError):
+        # Nicht im Main-Thread oder Plattform ohne SIGHUP
+        pass
+
+
+def is_email_allowed(email: str, cfg=None) -> bool:
+    return _policy(cfg).is_allowed(email)
+
+
+def get_max_users_per_mail(email: str, cfg=None) -> int:
+    return _policy(cfg).max_users(email)
+
+
+def _policy(cfg) -> EmailPolicy:
+    if cfg is None:
+        return get_config().email_policy
+    if isinstance(cfg, ConfigSnapshot):
+        return cfg.email_policy
+    return EmailPolicy(cfg)
@@ -1,37 +1,321 @@
-import json
+import os
+import queue
+import threading
+import time
 import mysql.connector
-from datetime import datetime, timedelta
+from mysql.connector import errorcode
+from enum import Enum
+from flask import g, has_app_context
 from log_handler import *
+from metrics_handler import record_stage, timed
+
+
+class RegistrationResult(Enum):
+    """
+    Ergebnis von DatabaseHandler.try_register() (zusammen mit der ID der neuen Zeile).
+    """
+    OK = 'ok'
+    EMAIL_LIMIT = 'email_limit'
+    USERNAME_TAKEN = 'username_taken'
+
+
+class ConnectionPool:
+    """
+    Prozessweiter Pool von MySQL-Verbindungen.
+    - Maximal 'db_pool_size' Verbindungen, weitere Anfragen warten bis 'db_pool_timeout' Sekunden
+    - Health-Check (Ping) beim Auschecken, falls die Verbindung länger unbenutzt war
+    - Abgelaufene Verbindungen werden neu aufgebaut
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.size = int(config.get('db_pool_size', 5))
+        self.timeout = float(config.get('db_pool_timeout', 10))
+        self.health_check_interval = float(config.get('db_pool_health_check_interval', 30))
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._checkout_total = 0.0
+        logger.info(f"Datenbank-Pool initialisiert (Grösse: {self.size}, PID: {os.getpid()}).")
+
+    def _connect(self):
+        conn = mysql.connector.connect(
+            host=self.config['db_host'],
+            port=self.config['db_port'],
+            user=self.config['db_user'],
+            password=self.config['db_password'],
+            database=self.config['db_database'],
+            autocommit=True
+        )
+        logger.info("Neue Verbindung zur Datenbank hergestellt.")
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def checkout(self):
+        started = time.monotonic()
+        entry = None
+        with self._lock:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.size:
+                    self._created += 1
+                    entry = (None, 0.0)
+
+        waited = 0.0
+        if entry is None:
+            # Pool ausgeschöpft: auf eine freie Verbindung warten
+            try:
+                entry = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise mysql.connector.errors.PoolError(
+                    f"Keine freie Datenbank-Verbindung innerhalb von {self.timeout}s (Pool-Grösse {self.size})."
+                )
+            waited = time.monotonic() - started
+
+        conn, last_used = entry
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif not self._is_healthy(conn, last_used):
+                logger.info("Abgelaufene Datenbank-Verbindung erkannt – baue neu auf.")
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+        elapsed = time.monotonic() - started
+        record_stage('mysql', 'pool_checkout', elapsed)
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._checkout_total += elapsed
+
+        if waited > 0.1:
+            logger.warning(f"Auf Datenbank-Verbindung gewartet: {waited * 1000:.0f} ms (Pool-Grösse {self.size}).")
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put((conn, time.monotonic()))
+        except Exception as error:
+            logger.info(f"Verbindung konnte nicht an den Pool zurückgegeben werden: {error}")
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._created -= 1
+        finally:
+            with self._lock:
+                self._in_use -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            checkouts = self._checkouts or 1
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "wait_avg_ms": self._wait_total / checkouts * 1000,
+                "wait_max_ms": self._wait_max * 1000,
+                "checkout_avg_ms": self._checkout_total / checkouts * 1000,
+            }
+
+
+# Ein Pool pro Prozess (Gunicorn forkt nach --preload, Sockets dürfen nicht geteilt werden)
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Ob mysql_whitelist den UNIQUE-Index auf UUID hat; einmal pro Prozess nachgeschlagen,
+# da Migration 6 nur beim Start läuft
+_whitelist_uuid_unique = None
+
+
+def get_pool(config) -> ConnectionPool:
+    pid = os.getpid()
+    with _pools_lock:
+        pool = _pools.get(pid)
+        if pool is None:
+            _pools.clear()
+            pool = ConnectionPool(config)
+            _pools[pid] = pool
+        return pool
+
+
+def get_pool_stats() -> dict:
+    pool = _pools.get(os.getpid())
+    return pool.stats() if pool else {}
+
+
+def _release_request_connection(exception=None):
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        _pools[os.getpid()].release(conn)
+
+
+def init_request_scope(app):
+    """
+    Pro Flask-Request wird genau eine Verbindung ausgecheckt und von allen
+    DatabaseHandler-Blöcken wiederverwendet. Rückgabe beim Teardown.
+    """
+    app.teardown_appcontext(_release_request_connection)
+
+
+# SQL, das auch der asynchrone Handler (async_database_handler.py) verwendet
+TRY_REGISTER_QUERY = """
+    INSERT INTO registrations (firstname, lastname, email, school, minecraft_username, minecraft_uuid,
+                               confirmed, created_at)
+    SELECT %s, %s, %s, %s, %s, %s, 0, %s FROM DUAL
+    WHERE (SELECT COUNT(*) FROM registrations WHERE email = %s) < %s
+"""
+# Für den Massenimport (eine Anweisung pro Zeile): vergebene Benutzernamen werden übersprungen statt abzubrechen.
+# Nur der doppelte Schlüssel wird übergangen (kein IGNORE), alle anderen Fehler brechen ab.
+IMPORT_REGISTRATION_QUERY = TRY_REGISTER_QUERY + "    ON DUPLICATE KEY UPDATE id = id\n"
+PENDING_REGISTRATION_QUERY = """
+    SELECT id, minecraft_uuid FROM registrations
+    WHERE email = %s AND minecraft_username = %s AND confirmed = 0
+    FOR UPDATE
+"""
+REFRESH_REGISTRATION_QUERY = "UPDATE registrations SET created_at = %s WHERE id = %s"
+CONFIRM_REGISTRATION_QUERY = "UPDATE registrations SET confirmed = 1 WHERE email = %s"
+LOCK_REGISTRATION_QUERY = "SELECT id FROM registrations WHERE id = %s AND minecraft_username = %s FOR UPDATE"
+CONFIRM_REGISTRATION_BY_ID_QUERY = "UPDATE registrations SET confirmed = 1 WHERE id = %s"
+LATEST_REGISTRATION_PROFILE_QUERY = (
+    "SELECT minecraft_username, minecraft_uuid FROM registrations WHERE email = %s ORDER BY created_at DESC LIMIT 1"
+)
+# Whitelist-Einträge: eine bekannte UUID bekommt den aktuellen Namen (wie ON CONFLICT ... DO UPDATE
+# unter SQLite). Mit dem UNIQUE-Index ux_mysql_whitelist_uuid (Migration 6) per ON DUPLICATE KEY,
+# ohne ihn (fehlende Tabelle oder Dubletten beim Migrieren) per UPDATE und danach INSERT ... NOT EXISTS.
+WHITELIST_UUID_INDEX_QUERY = """
+    SELECT 1 FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'mysql_whitelist' AND index_name = 'ux_mysql_whitelist_uuid'
+    LIMIT 1
+"""
+UPSERT_WHITELIST_QUERY = """
+    INSERT INTO mysql_whitelist (UUID, user) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE user = VALUES(user)
+"""
+RENAME_WHITELIST_QUERY = "UPDATE mysql_whitelist SET user = %s WHERE UUID = %s"
+# Parameter (uuid, user, uuid)
+INSERT_WHITELIST_QUERY = """
+    INSERT INTO mysql_whitelist (UUID, user)
+    SELECT %s, %s FROM DUAL
+    WHERE NOT EXISTS (SELECT 1 FROM mysql_whitelist WHERE UUID = %s)
+"""
+ENQUEUE_MAIL_QUERY = """
+    INSERT INTO mail_queue (recipient, firstname, confirmation_link, status, next_attempt_at)
+    VALUES (%s, %s, %s, 'pending', NOW())
+"""
+# Nur einfügen, wenn in den letzten n Sekunden keine (nicht aufgegebene) Mail an die Adresse ging
+ENQUEUE_MAIL_UNLESS_RECENT_QUERY = """
+    INSERT INTO mail_queue (recipient, firstname, confirmation_link, status, next_attempt_at)
+    SELECT %s, %s, %s, 'pending', NOW() FROM DUAL
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mail_queue
+        WHERE recipient = %s AND status <> 'failed' AND created_at > NOW() - INTERVAL %s SECOND
+    )
+"""
+CLAIM_MAIL_SELECT_QUERY = """
+    SELECT id, recipient, firstname, confirmation_link, attempts FROM mail_queue
+    WHERE status IN ('pending', 'sending') AND next_attempt_at <= NOW()
+    ORDER BY next_attempt_at
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+CLAIM_MAIL_UPDATE_QUERY = """
+    UPDATE mail_queue
+    SET status = 'sending', attempts = attempts + 1,
+        next_attempt_at = NOW() + INTERVAL %s SECOND
+    WHERE id IN ({placeholders})
+"""
+MARK_MAIL_SENT_QUERY = "UPDATE mail_queue SET status = 'sent', sent_at = NOW(), last_error = NULL WHERE id = %s"
+RESCHEDULE_MAIL_QUERY = """
+    UPDATE mail_queue
+    SET status = %s, next_attempt_at = NOW() + INTERVAL %s SECOND, last_error = %s
+    WHERE id = %s
+"""
+# Statistiken für /admin/stats (Index (school, confirmed) aus Migration 7 bzw. (status, next_attempt_at))
+REGISTRATION_STATS_QUERY = "SELECT school, confirmed, COUNT(*) FROM registrations GROUP BY school, confirmed"
+MAIL_STATUS_STATS_QUERY = "SELECT status, COUNT(*) FROM mail_queue GROUP BY status"
+# UUIDs stehen je nach Quelle mit oder ohne Bindestriche in den Tabellen; jede Registrierung
+# zählt nur einmal, auch wenn die Whitelist Dubletten enthält
+WHITELISTED_REGISTRATIONS_QUERY = """
+    SELECT COUNT(DISTINCT r.id) FROM registrations r
+    JOIN mysql_whitelist w ON REPLACE(w.UUID, '-', '') = REPLACE(r.minecraft_uuid, '-', '')
+    WHERE r.confirmed = 1
+"""
+
 
 class DatabaseHandler:
+    """
+    Zugriff auf die Registrierungs-Datenbank (MySQL). Mit "db_backend": "sqlite" liefert
+    DatabaseHandler(config) stattdessen einen SqliteDatabaseHandler mit denselben Methoden.
+    """
+
+    backend = 'mysql'
+
+    def __new__(cls, config):
+        if cls is DatabaseHandler and config.get('db_backend', 'mysql') == 'sqlite':
+            from sqlite_database_handler import SqliteDatabaseHandler
+            cls = SqliteDatabaseHandler
+        return super().__new__(cls)
+
     def __init__(self, config):
         self.config = config
         self.conn = None
         self.cursor = None
+        self._request_scoped = False
 
     def __enter__(self):
         try:
-            self.conn = mysql.connector.connect(
-                host=self.config['db_host'],
-                port=self.config['db_port'],
-                user=self.config['db_user'],
-                password=self.config['db_password'],
-                database=self.config['db_database']
-            )
+            pool = get_pool(self.config)
+            if has_app_context():
+                self._request_scoped = True
+                if '_db_conn' not in g:
+                    g._db_conn = pool.checkout()
+                self.conn = g._db_conn
+            else:
+                self.conn = pool.checkout()
             self.cursor = self.conn.cursor()
-            logger.info("Verbindung zur Datenbank hergestellt.")
-            
+
         except mysql.connector.Error as error:
             logger.info(f"Fehler bei der Verbindung zur Datenbank: {error}")
-            
+
         return self
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         if self.cursor:
             self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        if self.conn and not self._request_scoped:
+            get_pool(self.config).release(self.conn)
+        self.conn = None
+        self.cursor = None
 
+    @timed('mysql')
     def create_table(self):
         try:
             logger.info("Erstelle Tabelle, falls sie noch nicht existiert.")
@@ -54,27 +338,63 @@ class DatabaseHandler:
             logger.info(f"Fehler beim Erstellen der Tabelle: {error}")
             raise error
         
-    def get_unconfirmed_registrations_before(self, time_difference):
-        query = """
-            SELECT * FROM registrations WHERE confirmed = 0 AND created_at < %s
+    @timed('mysql')
+    def acquire_lock(self, name, timeout=0) -> bool:
+        """
+        MySQL-Named-Lock (GET_LOCK) auf dieser Verbindung. True, wenn gehalten.
         """
-        timestamp = datetime.now() - timedelta(minutes=time_difference)
         with self.conn.cursor() as cursor:
-            cursor.execute(query, (timestamp,))
-            return cursor.fetchall()
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+            result = cursor.fetchone()
+        return bool(result and result[0] == 1)
 
-    def delete_unconfirmed_registrations_before(self, time_difference):
-        query = """
-            DELETE FROM registrations WHERE confirmed = 0 AND created_at < %s
-        """
-        timestamp = datetime.now() - timedelta(minutes=time_difference)
+    @timed('mysql')
+    def release_lock(self, name):
         with self.conn.cursor() as cursor:
-            cursor.execute(query, (timestamp,))
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cursor.fetchone()
+
+    @timed('mysql')
+    def delete_unconfirmed_chunk(self, cutoff, chunk_size):
+        """
+        Löscht höchstens 'chunk_size' unbestätigte Registrierungen älter als 'cutoff'
+        per Primärschlüssel und gibt genau die gelöschten Zeilen zurück:
+        [(id, email, minecraft_username), ...]
+        Die Zeilen sind zwischen SELECT und DELETE gesperrt (FOR UPDATE).
+        """
+        select_query = """
+            SELECT id, email, minecraft_username FROM registrations
+            WHERE confirmed = 0 AND created_at < %s
+            ORDER BY created_at
+            LIMIT %s
+            FOR UPDATE
+        """
+        self.conn.start_transaction()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(select_query, (cutoff, chunk_size))
+                rows = cursor.fetchall()
+                if rows:
+                    placeholders = ", ".join(["%s"] * len(rows))
+                    cursor.execute(f"DELETE FROM registrations WHERE id IN ({placeholders})", [row[0] for row in rows])
             self.conn.commit()
-            deleted_count = cursor.rowcount
-            return deleted_count
-        
+        except Exception:
+            self.conn.rollback()
+            raise
+        return rows
 
+    @timed('mysql')
+    def get_oldest_unconfirmed_created_at(self):
+        """
+        created_at der ältesten unbestätigten Registrierung oder None.
+        (Ein Zugriff auf den Index (confirmed, created_at), kein Scan.)
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT MIN(created_at) FROM registrations WHERE confirmed = 0")
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @timed('mysql')
     def get_user_count_by_email(self, email):
         query = "SELECT COUNT(*) FROM registrations WHERE email = %s"
         with self.conn.cursor() as cursor:
@@ -84,24 +404,186 @@ class DatabaseHandler:
                 return result[0]
             return 0
 
+    @timed('mysql')
     def insert_registration(self, firstname, lastname, email, school, minecraft_username, confirmed, created_at):
         query = "INSERT INTO registrations (firstname, lastname, email, school, minecraft_username, confirmed, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s)"
         with self.conn.cursor() as cursor:
             cursor.execute(query, (firstname, lastname, email, school, minecraft_username, confirmed, created_at))
         self.conn.commit()
 
+    @timed('mysql')
+    def try_register(self, firstname, lastname, email, school, minecraft_username, minecraft_uuid,
+                     max_users_per_mail, created_at, link_for=None):
+        """
+        Prüft das E-Mail-Limit und fügt die Registrierung in einem einzigen Statement ein.
+        - E-Mail-Limit: INSERT ... SELECT fügt nur ein, solange COUNT(email) < Limit
+        - Benutzername: UNIQUE-Index auf minecraft_username statt Check-then-Act
+        Mit 'link_for' wird in derselben Transaktion die Bestätigungsmail mit dem Link
+        link_for(registration_id) in die Warteschlange gelegt (keine Registrierung ohne Mail).
+        Gleichzeitige Anmeldungen mit derselben E-Mail sperren denselben Indexbereich;
+        ein daraus entstehender Deadlock oder Lock-Wait-Timeout wird bis zu zweimal wiederholt
+        (höchstens drei Versuche).
+        """
+        params = (firstname, lastname, email, school, minecraft_username, minecraft_uuid, created_at,
+                  email, max_users_per_mail)
+        attempts = 3
+        for attempt in range(1, attempts + 1):
+            self.conn.start_transaction()
+            try:
+                with self.conn.cursor() as cursor:
+                    cursor.execute(TRY_REGISTER_QUERY, params)
+                    inserted = cursor.rowcount
+                    registration_id = cursor.lastrowid
+                    if inserted and link_for is not None:
+                        cursor.execute(ENQUEUE_MAIL_QUERY, (email, firstname, link_for(registration_id)))
+                self.conn.commit()
+            except mysql.connector.IntegrityError as error:
+                self.conn.rollback()
+                if error.errno == errorcode.ER_DUP_ENTRY:
+                    return RegistrationResult.USERNAME_TAKEN, None
+                raise
+            except mysql.connector.DatabaseError as error:
+                self.conn.rollback()
+                if error.errno in (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT) and attempt < attempts:
+                    logger.info(f"Deadlock bei Registrierung von {email} – Versuch {attempt + 1}.")
+                    continue
+                raise
+            except Exception:
+                self.conn.rollback()
+                raise
+
+            if inserted:
+                return RegistrationResult.OK, registration_id
+            return RegistrationResult.EMAIL_LIMIT, None
+
+    @timed('mysql')
+    def get_registered_usernames(self, usernames) -> set:
+        """
+        Welche der Benutzernamen sind schon registriert? (klein geschrieben)
+        """
+        if not usernames:
+            return set()
+        placeholders = ", ".join(["%s"] * len(usernames))
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"SELECT minecraft_username FROM registrations WHERE minecraft_username IN ({placeholders})", list(usernames))
+            return {row[0].lower() for row in cursor.fetchall()}
+
+    @timed('mysql')
+    def import_registrations(self, rows, created_at, link_for):
+        """
+        Fügt einen Block Registrierungen (firstname, lastname, email, school, minecraft_username,
+        minecraft_uuid, max_users_per_mail) in einer Transaktion ein und legt darin auch die
+        Bestätigungsmails in die Warteschlange (Link von link_for(id, username, uuid, email)).
+        Jede Registrierung ist ein eigenes INSERT ... SELECT (executemany fasst diese Form nicht
+        zusammen): so zählt das E-Mail-Limit auch die Zeilen davor im selben Block mit.
+        E-Mail-Limit wie bei try_register(); vergebene Benutzernamen werden übersprungen. Liefert
+        (id, minecraft_username, minecraft_uuid, email, firstname) der tatsächlich eingefügten Zeilen.
+        """
+        if not rows:
+            return []
+        params = [
+            (firstname, lastname, email, school, username, uuid, created_at, email, max_users)
+            for firstname, lastname, email, school, username, uuid, max_users in rows
+        ]
+        usernames = [row[4] for row in rows]
+        placeholders = ", ".join(["%s"] * len(usernames))
+        self.conn.start_transaction()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.executemany(IMPORT_REGISTRATION_QUERY, params)
+                cursor.execute(
+                    f"""
+                    SELECT id, minecraft_username, minecraft_uuid, email, firstname FROM registrations
+                    WHERE minecraft_username IN ({placeholders}) AND created_at = %s AND confirmed = 0
+                    """,
+                    (*usernames, created_at)
+                )
+                # Eine gleichzeitige Formular-Registrierung desselben Namens gehört nicht dazu
+                requested = {(row[4].lower(), row[2]) for row in rows}
+                inserted = [row for row in cursor.fetchall() if (row[1].lower(), row[3]) in requested]
+                if inserted:
+                    cursor.executemany(ENQUEUE_MAIL_QUERY, [
+                        (email, firstname, link_for(registration_id, username, uuid, email))
+                        for registration_id, username, uuid, email, firstname in inserted
+                    ])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return inserted
+
+    @timed('mysql')
+    def refresh_pending_registration(self, email, minecraft_username, created_at):
+        """
+        Gibt es schon eine unbestätigte Registrierung mit derselben E-Mail und demselben
+        Benutzernamen, wird nur deren created_at erneuert (kein zweiter Eintrag).
+        Liefert (id, minecraft_uuid) dieser Registrierung oder None.
+        """
+        self.conn.start_transaction()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(PENDING_REGISTRATION_QUERY, (email, minecraft_username))
+                row = cursor.fetchone()
+                if row:
+                    cursor.execute(REFRESH_REGISTRATION_QUERY, (created_at, row[0]))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return row
+
+    @timed('mysql')
     def delete_registration(self, email):
         query = "DELETE FROM registrations WHERE email = %s"
         with self.conn.cursor() as cursor:
             cursor.execute(query, (email,))
         self.conn.commit()
 
+    @timed('mysql')
     def confirm_registration(self, email):
-        query = "UPDATE registrations SET confirmed = 1 WHERE email = %s"
         with self.conn.cursor() as cursor:
-            cursor.execute(query, (email,))
+            cursor.execute(CONFIRM_REGISTRATION_QUERY, (email,))
         self.conn.commit()
 
+    def _whitelist_uuid_is_unique(self, cursor) -> bool:
+        global _whitelist_uuid_unique
+        if _whitelist_uuid_unique is None:
+            cursor.execute(WHITELIST_UUID_INDEX_QUERY)
+            _whitelist_uuid_unique = cursor.fetchone() is not None
+        return _whitelist_uuid_unique
+
+    def _write_whitelist(self, cursor, uuid, username):
+        """
+        Trägt die UUID ein oder aktualisiert den Namen eines bereits eingetragenen Spielers.
+        """
+        if self._whitelist_uuid_is_unique(cursor):
+            cursor.execute(UPSERT_WHITELIST_QUERY, (uuid, username))
+        else:
+            cursor.execute(RENAME_WHITELIST_QUERY, (username, uuid))
+            cursor.execute(INSERT_WHITELIST_QUERY, (uuid, username, uuid))
+
+    @timed('mysql')
+    def confirm_and_whitelist(self, registration_id, minecraft_username, uuid) -> bool:
+        """
+        Bestätigt die Registrierung per Primärschlüssel und trägt den Spieler in derselben
+        Transaktion in mysql_whitelist ein. False, wenn die Registrierung nicht (mehr) existiert.
+        """
+        self.conn.start_transaction()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(LOCK_REGISTRATION_QUERY, (registration_id, minecraft_username))
+                if cursor.fetchone() is None:
+                    self.conn.rollback()
+                    return False
+                cursor.execute(CONFIRM_REGISTRATION_BY_ID_QUERY, (registration_id,))
+                self._write_whitelist(cursor, uuid, minecraft_username)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return True
+
+    @timed('mysql')
     def get_latest_minecraft_username(self, email):
         query = "SELECT minecraft_username FROM registrations WHERE email = %s ORDER BY created_at DESC LIMIT 1"
         with self.conn.cursor() as cursor:
@@ -112,12 +594,19 @@ class DatabaseHandler:
             else:
                 return None
 
+    @timed('mysql')
+    def get_latest_registration_profile(self, email):
+        """
+        Liefert (minecraft_username, minecraft_uuid) der neuesten Registrierung oder None.
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(LATEST_REGISTRATION_PROFILE_QUERY, (email,))
+            return cursor.fetchone()
+
+    @timed('mysql')
     def is_username_exists(self, minecraft_username):
         try:
-            if not self.conn.is_connected():
-                self.__enter__()
-
-            query = "SELECT * FROM registrations WHERE minecraft_username = %s"
+            query = "SELECT 1 FROM registrations WHERE minecraft_username = %s LIMIT 1"
             self.cursor.execute(query, (minecraft_username,))
             result = self.cursor.fetchone()
 
@@ -129,16 +618,253 @@ class DatabaseHandler:
             logger.error("Fehler beim Überprüfen des Minecraft-Benutzernamens in der Datenbank: %s", str(e))
             return False
 
+    @timed('mysql')
+    def get_cached_profile(self, username):
+        query = "SELECT uuid, expires_at FROM mojang_profile_cache WHERE username = %s"
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, (username,))
+            return cursor.fetchone()
+
+    @timed('mysql')
+    def store_cached_profile(self, username, uuid, expires_at):
+        query = """
+            INSERT INTO mojang_profile_cache (username, uuid, expires_at) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE uuid = VALUES(uuid), expires_at = VALUES(expires_at)
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, (username, uuid, expires_at))
+        self.conn.commit()
+
+    @timed('mysql')
+    def store_cached_profiles(self, rows):
+        query = """
+            INSERT INTO mojang_profile_cache (username, uuid, expires_at) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE uuid = VALUES(uuid), expires_at = VALUES(expires_at)
+        """
+        with self.conn.cursor() as cursor:
+            cursor.executemany(query, rows)
+        self.conn.commit()
+
+    @timed('mysql')
+    def enqueue_mail(self, recipient, firstname, confirmation_link):
+        with self.conn.cursor() as cursor:
+            cursor.execute(ENQUEUE_MAIL_QUERY, (recipient, firstname, confirmation_link))
+            mail_id = cursor.lastrowid
+        self.conn.commit()
+        return mail_id
+
+    @timed('mysql')
+    def enqueue_mail_unless_recent(self, recipient, firstname, confirmation_link, cooldown_seconds):
+        """
+        Wie enqueue_mail(), aber ohne Eintrag (Rückgabe None), falls an 'recipient'
+        innerhalb von 'cooldown_seconds' schon eine Mail in die Warteschlange kam.
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                ENQUEUE_MAIL_UNLESS_RECENT_QUERY,
+                (recipient, firstname, confirmation_link, recipient, cooldown_seconds)
+            )
+            mail_id = cursor.lastrowid if cursor.rowcount else None
+        self.conn.commit()
+        return mail_id
+
+    @timed('mysql')
+    def claim_mail_batch(self, batch_size, lease_seconds):
+        """
+        Reserviert fällige Mails für diesen Sender. Gesperrte Zeilen anderer Sender werden
+        übersprungen; 'sending'-Zeilen eines abgestürzten Senders werden nach Ablauf der
+        Lease erneut vergeben.
+        """
+        self.conn.start_transaction()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(CLAIM_MAIL_SELECT_QUERY, (batch_size,))
+                rows = cursor.fetchall()
+                if rows:
+                    ids = [row[0] for row in rows]
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    cursor.execute(CLAIM_MAIL_UPDATE_QUERY.format(placeholders=placeholders), (lease_seconds, *ids))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return [(mail_id, recipient, firstname, link, attempts + 1) for mail_id, recipient, firstname, link, attempts in rows]
+
+    @timed('mysql')
+    def mark_mail_sent(self, mail_id):
+        with self.conn.cursor() as cursor:
+            cursor.execute(MARK_MAIL_SENT_QUERY, (mail_id,))
+        self.conn.commit()
+
+    @timed('mysql')
+    def reschedule_mail(self, mail_id, delay_seconds, error, failed=False):
+        with self.conn.cursor() as cursor:
+            cursor.execute(RESCHEDULE_MAIL_QUERY, ('failed' if failed else 'pending', delay_seconds, str(error)[:1000], mail_id))
+        self.conn.commit()
+
+    @timed('mysql')
+    def delete_sent_mails_before(self, days):
+        query = "DELETE FROM mail_queue WHERE status = 'sent' AND sent_at < NOW() - INTERVAL %s DAY"
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, (days,))
+            deleted_count = cursor.rowcount
+        self.conn.commit()
+        return deleted_count
+
+    @timed('mysql')
+    def update_rate_limit_bucket(self, key, initial_tokens, now, update):
+        """
+        Sperrt den Bucket 'key' (legt ihn bei Bedarf voll an), ruft update(tokens, updated_at)
+        auf und speichert dessen Rückgabe als neuen Stand – alles in einer Transaktion.
+        """
+        self.conn.start_transaction()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    "INSERT IGNORE INTO rate_limit_buckets (bucket_key, tokens, updated_at) VALUES (%s, %s, %s)",
+                    (key, initial_tokens, now)
+                )
+                cursor.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE bucket_key = %s FOR UPDATE", (key,))
+                tokens, updated_at = cursor.fetchone()
+                cursor.execute(
+                    "UPDATE rate_limit_buckets SET tokens = %s, updated_at = %s WHERE bucket_key = %s",
+                    (update(tokens, updated_at), now, key)
+                )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    @timed('mysql')
+    def delete_rate_limit_buckets_before(self, timestamp):
+        with self.conn.cursor() as cursor:
+            cursor.execute("DELETE FROM rate_limit_buckets WHERE updated_at < %s", (timestamp,))
+            deleted_count = cursor.rowcount
+        self.conn.commit()
+        return deleted_count
+
+    @timed('mysql')
+    def insert_into_whitelist_many(self, rows) -> int:
+        """
+        Schreibt viele (uuid, username) in mysql_whitelist (idempotent, bekannte UUIDs bekommen
+        den neuen Namen). Mit dem UNIQUE-Index auf UUID ein einziges mehrzeiliges INSERT ... ON
+        DUPLICATE KEY UPDATE, ohne ihn Zeile für Zeile in einer Transaktion. Fehler werden nicht verschluckt.
+        """
+        if not rows:
+            return 0
+        affected = 0
+        self.conn.start_transaction()
+        try:
+            with self.conn.cursor() as cursor:
+                if self._whitelist_uuid_is_unique(cursor):
+                    values = ", ".join(["(%s, %s)"] * len(rows))
+                    cursor.execute(
+                        f"INSERT INTO mysql_whitelist (UUID, user) VALUES {values} ON DUPLICATE KEY UPDATE user = VALUES(user)",
+                        [value for row in rows for value in row]
+                    )
+                    affected = cursor.rowcount
+                else:
+                    for uuid, username in rows:
+                        self._write_whitelist(cursor, uuid, username)
+                        affected += cursor.rowcount
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return affected
+
+    @timed('mysql')
+    def get_whitelist_entries(self, uuids, usernames):
+        """
+        Liefert alle (UUID, user) aus mysql_whitelist, deren UUID oder Name in den Listen vorkommt.
+        """
+        conditions, params = [], []
+        if uuids:
+            conditions.append(f"UUID IN ({', '.join(['%s'] * len(uuids))})")
+            params.extend(uuids)
+        if usernames:
+            conditions.append(f"user IN ({', '.join(['%s'] * len(usernames))})")
+            params.extend(usernames)
+        if not conditions:
+            return []
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"SELECT UUID, user FROM mysql_whitelist WHERE {' OR '.join(conditions)}", params)
+            return cursor.fetchall()
+
+    @timed('mysql')
+    def delete_whitelist_entries(self, rows) -> int:
+        if not rows:
+            return 0
+        with self.conn.cursor() as cursor:
+            cursor.executemany("DELETE FROM mysql_whitelist WHERE UUID = %s AND user = %s", rows)
+            deleted_count = cursor.rowcount
+        self.conn.commit()
+        return deleted_count
+
+    @timed('mysql')
+    def set_registration_uuids(self, rows):
+        """
+        Trägt nachträglich aufgelöste UUIDs ein: rows = [(uuid, minecraft_username), ...]
+        """
+        if not rows:
+            return
+        with self.conn.cursor() as cursor:
+            cursor.executemany("UPDATE registrations SET minecraft_uuid = %s WHERE minecraft_username = %s", rows)
+        self.conn.commit()
+
+    def stream_rows(self, query, params, batch_size):
+        """
+        Führt 'query' mit einem ungepufferten Cursor aus und liefert die Zeilen in Blöcken.
+        Die Zeilen werden nicht auf einmal in den Speicher geladen, die Verbindung ist aber
+        bis zum Ende belegt (weitere Abfragen über einen zweiten Handler).
+        """
+        with self.conn.cursor(buffered=False) as cursor:
+            cursor.execute(query, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                # Vorzeitig abgebrochen (z.B. Client weg): Rest verwerfen, sonst ist die Verbindung unbrauchbar
+                if self.conn.unread_result:
+                    self.conn.consume_results()
+
+    def iter_confirmed_registrations(self, batch_size):
+        """
+        Streamt (minecraft_username, minecraft_uuid) aller bestätigten Registrierungen in Blöcken.
+        """
+        return self.stream_rows(
+            "SELECT minecraft_username, minecraft_uuid FROM registrations WHERE confirmed = 1 ORDER BY id", (), batch_size
+        )
+
+    @timed('mysql')
+    def get_registration_stats(self):
+        """
+        Zahlen für /admin/stats: [(school, confirmed, anzahl)], [(mail-status, anzahl)] und die Anzahl
+        bestätigter Registrierungen in mysql_whitelist (None, falls die Tabelle fehlt).
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(REGISTRATION_STATS_QUERY)
+            school_rows = cursor.fetchall()
+            cursor.execute(MAIL_STATUS_STATS_QUERY)
+            mail_rows = cursor.fetchall()
+            try:
+                cursor.execute(WHITELISTED_REGISTRATIONS_QUERY)
+                whitelisted = cursor.fetchone()[0]
+            except mysql.connector.ProgrammingError as error:
+                if error.errno != errorcode.ER_NO_SUCH_TABLE:
+                    raise
+                whitelisted = None
+        return school_rows, mail_rows, whitelisted
+
+    @timed('mysql')
     def insert_into_whitelist(self, uuid, username):
         try:
-            query = "INSERT INTO mysql_whitelist (UUID, user) VALUES (%s, %s)"
             with self.conn.cursor() as cursor:
-                cursor.execute(query, (uuid, username))
+                self._write_whitelist(cursor, uuid, username)
             self.conn.commit()
             logger.info(f"Spieler {username} mit UUID {uuid} erfolgreich in mysql_whitelist eingetragen.")
         except Exception as e:
             logger.error(f"Fehler beim Eintragen in mysql_whitelist: {e}")
-
-# Lade config.json.
-with open('config.json') as file:
-    config = json.load(file)
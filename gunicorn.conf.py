@@ -0,0 +1,31 @@
+# Gunicorn-Einstellungen (werden aus dem Arbeitsverzeichnis automatisch geladen)
+import glob
+import os
+
+bind = "0.0.0.0:5000"
+workers = 4
+preload_app = True
+
+# Mail-Sender pro Worker statt im Master: /register weckt nach dem Commit den Sender im
+# eigenen Prozess (mail_queue.SENDER_IN_WORKERS_ENV, wird vor dem Laden der App gesetzt)
+os.environ["KSR_MAIL_SENDER_IN_WORKERS"] = "1"
+
+# Prometheus-Dateien eines früheren Laufs entfernen. Das passiert hier beim Laden
+# der Konfiguration, also noch bevor die App (--preload) im Master importiert wird.
+_metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _metrics_dir:
+    os.makedirs(_metrics_dir, exist_ok=True)
+    for _path in glob.glob(os.path.join(_metrics_dir, "*.db")):
+        os.remove(_path)
+
+
+def post_fork(server, worker):
+    import mail_queue
+    from config_handler import get_config
+    mail_queue.start_sender(get_config())
+
+
+def child_exit(server, worker):
+    if _metrics_dir:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
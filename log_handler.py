@@ -1,30 +1,156 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+from datetime import datetime, timedelta
+
+# Was "from log_handler import *" liefert: nur der Logger und seine Konfiguration, damit
+# z.B. das datetime-Modul der importierenden Datei nicht von der Klasse überdeckt wird
+__all__ = ['logger', 'configure_logging']
+
+# Logging über eine Queue: Die Log-Aufrufe legen den Eintrag nur in die Queue,
+# ein Listener-Thread erledigt das Schreiben in Dateien und auf stderr.
+
+LOG_FORMAT = '%(asctime)s %(levelname)s: %(message)s'
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
 
 # Konfigurieren des Loggers
 logger = logging.getLogger('my_logger')
 logger.setLevel(logging.INFO)
 
-# Definieren des FileHandlers mit dynamischem Dateinamen (falls noch nicht vorhanden, dann erstellen)
+# Log-Verzeichnis (falls noch nicht vorhanden, dann erstellen)
 log_dir = 'logs'
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
-log_filename = datetime.now().strftime("%Y-%m-%d") + '_logfile.log'
-file_handler = logging.FileHandler(os.path.join(log_dir, log_filename), encoding='utf-8')
-file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+
+class JsonFormatter(logging.Formatter):
+    """
+    Eine Zeile JSON pro Log-Eintrag (JSON-Lines).
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DailyFileHandler(logging.FileHandler):
+    """
+    Schreibt nach logs/YYYY-MM-DD_logfile.log und wechselt beim Datumswechsel
+    die Datei. Dateien werden nie umbenannt, daher können mehrere Gunicorn-Worker
+    gleichzeitig anhängen. Ist 'retention_days' gesetzt, werden ältere Dateien gelöscht.
+    """
+
+    def __init__(self, directory, suffix='_logfile.log', retention_days=None):
+        self.directory = directory
+        self.suffix = suffix
+        self.retention_days = retention_days
+        self.current_date = datetime.now().strftime('%Y-%m-%d')
+        super().__init__(self._path(self.current_date), encoding='utf-8', delay=True)
+
+    def _path(self, date):
+        return os.path.join(self.directory, date + self.suffix)
+
+    def emit(self, record):
+        date = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d')
+        if date != self.current_date:
+            self.current_date = date
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(self._path(date))
+            self.purge_old_files()
+        super().emit(record)
+
+    def purge_old_files(self):
+        if not self.retention_days:
+            return
+        oldest = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix) or name[:10] >= oldest:
+                continue
+            try:
+                datetime.strptime(name[:10], '%Y-%m-%d')
+                os.remove(os.path.join(self.directory, name))
+            except (ValueError, OSError):
+                # Fremde Datei oder schon von einem anderen Prozess gelöscht
+                pass
+
+
+# Tages-Logdatei
+file_handler = DailyFileHandler(log_dir)
+file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
 
 # Definieren des StreamHandlers
 stream_handler = logging.StreamHandler()
-stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
-
-# Hinzufügen der Handler zum Logger
-logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
+stream_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
 
-# Hinzufügen eines zusätzlichen Handlers zum Fangen aller Exceptions
-exception_handler = logging.FileHandler(os.path.join(log_dir, 'fehler.log'), encoding='utf-8')
+# Zusätzlicher Handler für alle Fehler
+exception_handler = logging.FileHandler(os.path.join(log_dir, 'fehler.log'), encoding='utf-8', delay=True)
 exception_handler.setLevel(logging.ERROR)
-exception_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
-logger.addHandler(exception_handler)
+exception_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+
+_handlers = (file_handler, stream_handler, exception_handler)
+
+# Der Logger selbst hat nur den QueueHandler
+_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+logger.addHandler(_queue_handler)
+
+_listener = None
+
+
+def _start_listener():
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_in_child():
+    """
+    Nach fork() (Gunicorn-Worker) gibt es den Listener-Thread nicht mehr:
+    eigene Queue und eigener Listener pro Prozess.
+    """
+    _queue_handler.queue = queue.SimpleQueue()
+    _start_listener()
+
+
+def configure_logging(config):
+    """
+    Übernimmt die Log-Einstellungen aus der Konfiguration:
+      - log_format: "text" (Standard) oder "json" (JSON-Lines, nur Dateien)
+      - log_retention_days: Tages-Logdateien so viele Tage behalten (Standard 30, 0 = unbegrenzt)
+    """
+    if config.get('log_format', 'text') == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
+    file_handler.setFormatter(formatter)
+    exception_handler.setFormatter(formatter)
+
+    file_handler.retention_days = int(config.get('log_retention_days', 30))
+    file_handler.purge_old_files()
+
+
+_start_listener()
+# Vor fork() wird der Listener angehalten (Queue geleert), damit er im Kind keine
+# Locks (z.B. von stderr) hält
+os.register_at_fork(before=_stop_listener, after_in_parent=_start_listener,
+                    after_in_child=_restart_listener_in_child)
+atexit.register(_stop_listener)
@@ -1,6 +1,11 @@
+import asyncio
+import base64
 import json
+import os
+import queue
 import smtplib
 import ssl
+import threading
 import time
 import imaplib
 import email.utils
@@ -9,8 +14,11 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr, formatdate, make_msgid
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 from log_handler import *
+from config_handler import ConfigSnapshot, get_config
+from metrics_handler import measure
 
 
 def load_email_credentials() -> dict:
@@ -44,6 +52,271 @@ def _connect_smtp(creds: dict):
     return server
 
 
+class SmtpSender:
+    """
+    Langlebige, authentifizierte SMTP-Session für viele Mails.
+    - Verbindet bei Bedarf (lazy) und nach Abbrüchen durch den Server neu
+    - maintain(): NOOP-Keepalive bzw. Schliessen nach Leerlauf
+    - Nach 'messages_per_session' Mails wird die Session erneuert (Provider-Limits)
+    """
+
+    def __init__(self, creds: dict, idle_timeout=60.0, keepalive_interval=20.0, messages_per_session=100):
+        self.creds = creds
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.messages_per_session = messages_per_session
+        self._server = None
+        self._sent_in_session = 0
+        self._last_used = 0.0
+        self._last_noop = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, creds: dict):
+        return cls(
+            creds,
+            idle_timeout=float(config.get("smtp_idle_timeout", 60)),
+            keepalive_interval=float(config.get("smtp_keepalive_interval", 20)),
+            messages_per_session=int(config.get("smtp_messages_per_session", 100))
+        )
+
+    @staticmethod
+    def _is_disconnect(error) -> bool:
+        if isinstance(error, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)):
+            return True
+        # 421: Server beendet die Session
+        return getattr(error, "smtp_code", None) == 421
+
+    def _drop(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                try:
+                    self._server.close()
+                except Exception:
+                    pass
+        self._server = None
+        self._sent_in_session = 0
+
+    def _send_one(self, msg):
+        from_addr = self.creds["smtp_username"]
+        to_addrs = [msg["To"]]
+        payload = msg.as_string()
+
+        for attempt in (1, 2):
+            if self._server is not None and self._sent_in_session >= self.messages_per_session:
+                self._drop()
+            if self._server is None:
+                with measure('smtp', 'connect'):
+                    self._server = _connect_smtp(self.creds)
+
+            try:
+                with measure('smtp', 'sendmail'):
+                    self._server.sendmail(from_addr, to_addrs, payload)
+                self._sent_in_session += 1
+                self._last_used = time.monotonic()
+                return
+            except Exception as e:
+                if attempt == 2 or not self._is_disconnect(e):
+                    raise
+                logger.info(f"SMTP-Verbindung vom Server getrennt ({e}) – verbinde neu.")
+                self._drop()
+
+    def send(self, msg):
+        with self._lock:
+            self._send_one(msg)
+
+    def send_many(self, messages) -> list:
+        """
+        Schickt alle Nachrichten über dieselbe Session.
+        Rückgabe: pro Nachricht None (OK) oder die Exception.
+        """
+        results = []
+        with self._lock:
+            for index, msg in enumerate(messages):
+                try:
+                    self._send_one(msg)
+                    results.append(None)
+                except Exception as e:
+                    logger.error(f"Versand an {msg['To']} fehlgeschlagen: {e}")
+                    results.append(e)
+                    if self._server is None:
+                        # Keine Verbindung möglich: Rest des Blocks nicht einzeln versuchen
+                        results.extend([e] * (len(messages) - index - 1))
+                        break
+        return results
+
+    def maintain(self):
+        """
+        Regelmässig aufrufen (z. B. aus dem Mail-Sender): hält die Session per NOOP
+        am Leben (höchstens einmal pro 'keepalive_interval') und schliesst sie nach
+        'idle_timeout' Sekunden ohne Versand.
+        """
+        with self._lock:
+            if self._server is None:
+                return
+            now = time.monotonic()
+            if now - self._last_used >= self.idle_timeout:
+                logger.info("Beende SMTP-Verbindung (Leerlauf).")
+                self._drop()
+            elif now - max(self._last_used, self._last_noop) >= self.keepalive_interval:
+                self._last_noop = now
+                try:
+                    code, _ = self._server.noop()
+                    if code != 250:
+                        self._drop()
+                except Exception:
+                    self._drop()
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+
+# Eine SMTP-Session pro Prozess
+_sender = None
+_sender_pid = None
+_sender_lock = threading.Lock()
+
+
+def get_smtp_sender() -> SmtpSender:
+    global _sender, _sender_pid
+    with _sender_lock:
+        if _sender is None or _sender_pid != os.getpid():
+            config = _get_config()
+            _sender = SmtpSender.from_config(config, config)
+            _sender_pid = os.getpid()
+        return _sender
+
+
+async def _connect_smtp_async(creds: dict) -> "aiosmtplib.SMTP":
+    """
+    Wie _connect_smtp(), aber mit aiosmtplib (ASGI-Modus).
+    """
+    import aiosmtplib  # nur im ASGI-Modus nötig (requirements-async.txt)
+    port = creds["smtp_port"]
+    server = aiosmtplib.SMTP(
+        hostname=creds["smtp_server"],
+        port=port,
+        use_tls=port == 465,
+        start_tls=port == 587
+    )
+    await server.connect()
+    await server.login(creds["smtp_username"], creds["smtp_password"])
+    return server
+
+
+class AsyncSmtpSender:
+    """
+    Async-Gegenstück zu SmtpSender für den ASGI-Modus: eine langlebige Session
+    pro Event-Loop, gleiche Einstellungen (Leerlauf, Keepalive, Mails pro Session).
+    """
+
+    def __init__(self, creds: dict, idle_timeout=60.0, keepalive_interval=20.0, messages_per_session=100):
+        self.creds = creds
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.messages_per_session = messages_per_session
+        self._server = None
+        self._sent_in_session = 0
+        self._last_used = 0.0
+        self._last_noop = 0.0
+        self._lock = asyncio.Lock()
+
+    from_config = classmethod(SmtpSender.from_config.__func__)
+
+    @staticmethod
+    def _is_disconnect(error) -> bool:
+        import aiosmtplib
+        if isinstance(error, (aiosmtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)):
+            return True
+        return getattr(error, "code", None) == 421
+
+    async def _drop(self):
+        if self._server is not None:
+            try:
+                await self._server.quit()
+            except Exception:
+                self._server.close()
+        self._server = None
+        self._sent_in_session = 0
+
+    async def _send_one(self, msg):
+        from_addr = self.creds["smtp_username"]
+        to_addrs = [msg["To"]]
+        payload = msg.as_string()
+
+        for attempt in (1, 2):
+            if self._server is not None and self._sent_in_session >= self.messages_per_session:
+                await self._drop()
+            if self._server is None:
+                with measure('smtp', 'connect'):
+                    self._server = await _connect_smtp_async(self.creds)
+
+            try:
+                with measure('smtp', 'sendmail'):
+                    await self._server.sendmail(from_addr, to_addrs, payload)
+                self._sent_in_session += 1
+                self._last_used = time.monotonic()
+                return
+            except Exception as e:
+                if attempt == 2 or not self._is_disconnect(e):
+                    raise
+                logger.info(f"SMTP-Verbindung vom Server getrennt ({e}) – verbinde neu.")
+                await self._drop()
+
+    async def send_many(self, messages) -> list:
+        """
+        Wie SmtpSender.send_many(): pro Nachricht None (OK) oder die Exception.
+        """
+        results = []
+        async with self._lock:
+            for index, msg in enumerate(messages):
+                try:
+                    await self._send_one(msg)
+                    results.append(None)
+                except Exception as e:
+                    logger.error(f"Versand an {msg['To']} fehlgeschlagen: {e}")
+                    results.append(e)
+                    if self._server is None:
+                        results.extend([e] * (len(messages) - index - 1))
+                        break
+        return results
+
+    async def maintain(self):
+        async with self._lock:
+            if self._server is None:
+                return
+            now = time.monotonic()
+            if now - self._last_used >= self.idle_timeout:
+                logger.info("Beende SMTP-Verbindung (Leerlauf).")
+                await self._drop()
+            elif now - max(self._last_used, self._last_noop) >= self.keepalive_interval:
+                self._last_noop = now
+                try:
+                    response = await self._server.noop()
+                    if response.code != 250:
+                        await self._drop()
+                except Exception:
+                    await self._drop()
+
+    async def close(self):
+        async with self._lock:
+            await self._drop()
+
+
+_async_sender = None
+
+
+def get_async_smtp_sender() -> AsyncSmtpSender:
+    global _async_sender
+    if _async_sender is None:
+        config = _get_config()
+        _async_sender = AsyncSmtpSender.from_config(config, config)
+    return _async_sender
+
+
 def _is_inbox_namespace_error(data) -> bool:
     """
     Hosttech/Plesk liefert bei falschem Namespace oft:
@@ -59,60 +332,314 @@ def _is_inbox_namespace_error(data) -> bool:
     return False
 
 
-def _append_to_sent_imap(creds: dict, msg: MIMEMultipart, sent_folder: str):
+class ImapArchiver:
     """
-    Legt die gesendete Mail per IMAP in 'sent_folder' ab.
-    Versucht bei Namespace-Problemen automatisch 'INBOX.<sent_folder>'.
-    Gibt den effektiv verwendeten Ordner zurück (oder None bei Skip).
+    Legt gesendete Mails im Hintergrund per IMAP im Sent-Ordner ab.
+    - Eine offene IMAP-Verbindung, Neuaufbau nach Fehlern oder Leerlauf
+    - Der effektive Ordner (z. B. 'INBOX.Sent' bei Namespace-Problemen) wird nach
+      der ersten Probe gecacht
+    - Nachrichten werden gesammelt und blockweise abgelegt
+    - SELECT/SEARCH-Nachweis per Message-ID nur mit 'imap_verify_append' (Debug)
     """
-    imap_host = creds.get("imap_server")
-    imap_port = int(creds.get("imap_port", 993))
-
-    if not imap_host:
-        logger.warning("imap_server fehlt in config.json – Sent-Kopie wird nicht gespeichert.")
-        return None
-
-    user = creds["smtp_username"]
-    pw = creds["smtp_password"]
-
-    internal_date = imaplib.Time2Internaldate(time.time())
 
-    imap = None
-    try:
-        imap = imaplib.IMAP4_SSL(imap_host, imap_port)
-        imap.login(user, pw)
-
-        # 1) erster Versuch
-        status, data = imap.append(sent_folder, r"(\Seen)", internal_date, msg.as_bytes())
-        logger.info(f"IMAP APPEND -> folder='{sent_folder}', status={status}, data={data}")
+    def __init__(self, creds: dict, sent_folder: str, batch_size=20, verify=False, idle_timeout=300.0,
+                 max_queue=1000):
+        self.creds = creds
+        self.sent_folder = sent_folder
+        self.batch_size = batch_size
+        self.verify = verify
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._imap = None
+        self._resolved_folder = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, creds: dict):
+        creds = dict(creds)
+        # IMAP-Server/Port können in config stehen (empfohlen)
+        creds["imap_server"] = config.get("imap_server", creds.get("imap_server"))
+        creds["imap_port"] = config.get("imap_port", creds.get("imap_port", 993))
+        creds["imap_ssl"] = bool(config.get("imap_ssl", True))
+        return cls(
+            creds,
+            config.get("sent_folder", "Sent"),
+            batch_size=int(config.get("imap_archive_batch_size", 20)),
+            verify=bool(config.get("imap_verify_append", False)),
+            idle_timeout=float(config.get("imap_idle_timeout", 300))
+        )
+
+    def submit(self, msg: MIMEMultipart):
+        """
+        Nimmt eine gesendete Mail zur Archivierung entgegen (blockiert nie).
+        """
+        if not self.creds.get("imap_server"):
+            logger.warning("imap_server fehlt in config.json – Sent-Kopie wird nicht gespeichert.")
+            return
+
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((msg.as_bytes(), msg.get("Message-ID"), time.time()))
+        except queue.Full:
+            logger.error("IMAP-Archiv-Warteschlange voll – Sent-Kopie wird verworfen.")
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="imap-archiver", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
 
-        # 2) Fallback: INBOX.<folder>
-        if status != "OK" and _is_inbox_namespace_error(data) and not sent_folder.startswith("INBOX."):
-            fallback = f"INBOX.{sent_folder}"
-            status, data = imap.append(fallback, r"(\Seen)", internal_date, msg.as_bytes())
-            logger.info(f"IMAP APPEND (fallback) -> folder='{fallback}', status={status}, data={data}")
-            sent_folder = fallback
+            try:
+                self._append_batch(batch)
+            except Exception as e:
+                logger.error(f"Sent-Kopie per IMAP konnte nicht gespeichert werden ({len(batch)} Mails): {e}")
+                self._disconnect()
+
+    def _connect(self):
+        if self._imap is None:
+            with measure('imap', 'connect'):
+                imap_class = imaplib.IMAP4_SSL if self.creds.get("imap_ssl", True) else imaplib.IMAP4
+                self._imap = imap_class(self.creds["imap_server"], int(self.creds["imap_port"]))
+                self._imap.login(self.creds["smtp_username"], self.creds["smtp_password"])
+        return self._imap
+
+    def _disconnect(self):
+        if self._imap is not None:
+            try:
+                self._imap.logout()
+            except Exception:
+                pass
+        self._imap = None
+
+    def _append_batch(self, batch):
+        for payload, msgid, sent_at in batch:
+            for attempt in (1, 2):
+                try:
+                    imap = self._connect()
+                    with measure('imap', 'append'):
+                        self._append_one(imap, payload, msgid, sent_at)
+                    break
+                except (imaplib.IMAP4.abort, OSError) as e:
+                    self._disconnect()
+                    if attempt == 2:
+                        raise
+                    logger.info(f"IMAP-Verbindung getrennt ({e}) – verbinde neu.")
+        logger.info(f"✅ {len(batch)} Sent-Kopien gespeichert in: '{self._resolved_folder}'")
+
+    def _append_one(self, imap, payload: bytes, msgid, sent_at: float):
+        internal_date = imaplib.Time2Internaldate(sent_at)
+        folder = self._resolved_folder or self.sent_folder
+
+        status, data = imap.append(folder, r"(\Seen)", internal_date, payload)
+
+        # Fallback: INBOX.<folder> (nur solange der Ordner noch nicht aufgelöst ist)
+        if (status != "OK" and self._resolved_folder is None and _is_inbox_namespace_error(data)
+                and not folder.startswith("INBOX.")):
+            folder = f"INBOX.{folder}"
+            status, data = imap.append(folder, r"(\Seen)", internal_date, payload)
+            logger.info(f"IMAP APPEND (fallback) -> folder='{folder}', status={status}, data={data}")
 
         if status != "OK":
             raise RuntimeError(f"IMAP APPEND fehlgeschlagen: {status} {data}")
 
+        if self._resolved_folder is None:
+            logger.info(f"IMAP Sent-Ordner aufgelöst: '{folder}'")
+            self._resolved_folder = folder
+
         # Optional: Nachweis per Message-ID (hilft beim Debuggen)
-        msgid = msg.get("Message-ID")
-        if msgid:
-            sel_status, _ = imap.select(sent_folder, readonly=True)
-            logger.info(f"IMAP SELECT '{sent_folder}' -> {sel_status}")
+        if self.verify and msgid:
+            sel_status, _ = imap.select(folder, readonly=True)
+            logger.info(f"IMAP SELECT '{folder}' -> {sel_status}")
             if sel_status == "OK":
                 srch_status, hits = imap.search(None, f'(HEADER Message-ID "{msgid}")')
                 logger.info(f"IMAP SEARCH Message-ID -> status={srch_status}, hits={hits}")
 
-        return sent_folder
 
-    finally:
-        try:
-            if imap:
-                imap.logout()
-        except Exception:
-            pass
+# Ein Archiver pro Prozess
+_archiver = None
+_archiver_pid = None
+_archiver_lock = threading.Lock()
+
+
+def get_imap_archiver(config: dict, email_credentials: dict) -> ImapArchiver:
+    global _archiver, _archiver_pid
+    with _archiver_lock:
+        if _archiver is None or _archiver_pid != os.getpid():
+            _archiver = ImapArchiver.from_config(config, email_credentials)
+            _archiver_pid = os.getpid()
+        return _archiver
+
+
+MAIL_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mail_templates")
+
+
+class RenderedMail:
+    """
+    Fertig serialisierte Mail (nur ASCII). Bietet die Teile der Message-API,
+    die SmtpSender und ImapArchiver brauchen.
+    """
+    __slots__ = ("recipient", "message_id", "_wire")
+
+    def __init__(self, recipient: str, message_id: str, wire: str):
+        self.recipient = recipient
+        self.message_id = message_id
+        self._wire = wire
+
+    def get(self, name: str, default=None):
+        return {"To": self.recipient, "Message-ID": self.message_id}.get(name, default)
+
+    def __getitem__(self, name: str):
+        return self.get(name)
+
+    def as_string(self) -> str:
+        return self._wire
+
+    def as_bytes(self) -> bytes:
+        return self._wire.encode("ascii")
+
+
+class ConfirmationMailFactory:
+    """
+    Baut Bestätigungsmails aus den einmal kompilierten Jinja-Templates
+    (mail_templates/confirmation.txt und .html).
+
+    Das MIME-Gerüst (Header, Boundary, Part-Header) wird beim Start einmal mit
+    dem email-Paket serialisiert und in statische Stücke zerlegt. Pro Mail werden
+    nur Empfänger, Datum, Message-ID und die base64-kodierten Bodies eingesetzt.
+    """
+
+    SUBJECT = "Bitte bestätige deine Registrierung bei KSR Minecraft"
+    _FIELDS = ("to", "date", "message_id", "text", "html")
+
+    def __init__(self, config: dict, email_credentials: dict):
+        env = Environment(
+            loader=FileSystemLoader(MAIL_TEMPLATE_DIR),
+            autoescape=select_autoescape(["html"]),
+            keep_trailing_newline=True
+        )
+        self._text_template = env.get_template("confirmation.txt")
+        self._html_template = env.get_template("confirmation.html")
+
+        # Anzeigename aus config.json
+        self.sender_display_name = config.get("sender_display_name", "KSR Minecraft Team")
+        self.debug = config.get("debug", False)
+        self._subject = Header(self.SUBJECT, "utf-8").encode()
+        self._from = formataddr((self.sender_display_name, email_credentials["smtp_username"]), charset="utf-8")
+        self._chunks = self._build_skeleton()
+
+    def _build_skeleton(self) -> list:
+        placeholders = {field: f"@@{field.upper()}@@" for field in self._FIELDS}
+
+        # Multipart-Mail (Plain + HTML)
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = self._subject
+        msg["From"] = self._from
+        msg["To"] = placeholders["to"]
+
+        # Hilft beim IMAP-Append/Debugging + saubere Mail-Metadaten
+        msg["Date"] = placeholders["date"]
+        msg["Message-ID"] = placeholders["message_id"]
+
+        for subtype, field in (("plain", "text"), ("html", "html")):
+            part = MIMEText("", subtype, "utf-8")
+            part.set_payload(placeholders[field])
+            msg.attach(part)
+
+        skeleton = msg.as_string()
+        chunks = []
+        for field in self._FIELDS:
+            head, skeleton = skeleton.split(placeholders[field], 1)
+            chunks.append(head)
+        chunks.append(skeleton)
+        return chunks
+
+    def _render_values(self, confirmation_link: str, firstname: str) -> dict:
+        return {
+            # Name für Anrede einsetzen
+            "greeting_name": firstname if firstname else "Spieler",
+            "confirmation_link": confirmation_link,
+            "sender_display_name": self.sender_display_name,
+        }
+
+    def build(self, to_email: str, confirmation_link: str, firstname: str = "") -> RenderedMail:
+        parsed_email = email.utils.parseaddr(to_email)[1]
+        if not parsed_email.isascii() or any(c in parsed_email for c in "\r\n"):
+            raise ValueError(f"Ungültige Empfängeradresse: {to_email!r}")
+
+        values = self._render_values(confirmation_link, firstname)
+        text_body = base64.encodebytes(self._text_template.render(values).encode("utf-8")).decode("ascii")
+        html_body = base64.encodebytes(self._html_template.render(values).encode("utf-8")).decode("ascii")
+        message_id = make_msgid()
+
+        c = self._chunks
+        wire = "".join((
+            c[0], parsed_email, c[1], formatdate(localtime=True), c[2], message_id,
+            c[3], text_body.rstrip("\n"), c[4], html_body.rstrip("\n"), c[5]
+        ))
+        msg = RenderedMail(parsed_email, message_id, wire)
+
+        # Debugging
+        if self.debug:
+            logger.info(f"Email: {parsed_email}")
+            logger.info(f"Message (UTF-8): {msg.as_string()}")
+
+        return msg
+
+
+# Konfiguration im Speicher: Snapshot aus config_handler (folgt dem Hot-Reload)
+# oder ein explizit per configure() übergebenes dict
+_config = None
+_mail_factory = None
+
+
+def configure(config: dict):
+    """
+    Übernimmt die Konfiguration und kompiliert die Mail-Templates.
+    """
+    global _config, _mail_factory
+    _config = config
+    _mail_factory = ConfirmationMailFactory(config, config)
+    logger.info("Mail-Templates kompiliert.")
+
+
+def _get_config():
+    if _config is None or isinstance(_config, ConfigSnapshot):
+        config = get_config()
+        if config is not _config:
+            configure(config)
+    return _config
+
+
+def build_confirmation_email(to_email: str, confirmation_link: str, firstname: str = "") -> RenderedMail:
+    """
+    Baut die Bestätigungs-E-Mail (Plaintext + HTML).
+    """
+    _get_config()
+    return _mail_factory.build(to_email, confirmation_link, firstname)
+
+
+def _save_sent_copy(config: dict, email_credentials: dict, msg: MIMEMultipart):
+    """
+    Optional: Kopie in Sent speichern (IMAP), asynchron über den Archiver.
+    """
+    if config.get("imap_save_sent", False):
+        get_imap_archiver(config, email_credentials).submit(msg)
 
 
 def send_confirmation_email(to_email: str, confirmation_link: str, firstname: str = ""):
@@ -120,138 +647,61 @@ def send_confirmation_email(to_email: str, confirmation_link: str, firstname: st
     Sende eine Bestätigungs-E-Mail an den Benutzer.
     firstname: wird aus dem Formular übergeben (optional).
     """
-
-    with open('config.json', encoding="utf-8") as file:
-        config = json.load(file)
+    config = _get_config()
 
     logger.info("Sende Bestätigungs-E-Mail.")
-    parsed_email = email.utils.parseaddr(to_email)[1]
-    email_credentials = load_email_credentials()
-
-    # SMTP-Verbindung herstellen
-    server = _connect_smtp(email_credentials)
-
-    # Anzeigename aus config.json
-    sender_display_name = config.get("sender_display_name", "KSR Minecraft Team")
-
-    # Name für Anrede einsetzen
-    greeting_name = firstname if firstname else "Spieler"
-
-    # Betreff
-    subject = Header("Bitte bestätige deine Registrierung bei KSR Minecraft", "utf-8")
-
-    # Plaintext-Version (Fallback)
-    text_body = f"""Hallo {greeting_name},
-
-schön, dass du dich registriert hast!
-Du bist schon fast am Ziel – es fehlt nur noch ein kleiner Schritt:
-
-{confirmation_link}
-
-Viele Grüsse vom {sender_display_name}
-Bei Fragen melde dich ungeniert bei uns!
-
-Discord: https://discord.gg/ekmVqnzF9g
-Website: https://ksrminecraft.ch
-"""
-
-    # HTML-Version (tabellenbasiert → für Outlook geeignet)
-    html_body = f"""
-    <html>
-    <body style="margin:0; padding:0; background-color:#f9f9f9; font-family: Arial, sans-serif;">
-      <table role="presentation" border="0" cellpadding="0" cellspacing="0" width="100%">
-        <tr>
-          <td align="center" style="padding:20px 0;">
-            <table role="presentation" border="0" cellpadding="0" cellspacing="0" width="600" style="background:#ffffff; border-radius:8px;">
-              <tr>
-                <td align="center" style="padding:20px;">
-                  <img src="https://ksrminecraft.ch/media/logos/logotransparentrechteck.png" alt="KSR Minecraft Logo" width="200" style="display:block; margin-bottom:20px;">
-                </td>
-              </tr>
-              <tr>
-                <td style="padding:0 30px; color:#333;">
-                  <h2 style="text-align:center;">Hallo {greeting_name},</h2>
-                  <p style="text-align:center;">schön, dass du dich registriert hast!</p>
-                  <p style="text-align:center;">Du bist schon fast am Ziel – es fehlt nur noch ein kleiner Schritt. Öffne bitte folgenden Link und bestätige deine Registrierung:</p>
-                </td>
-              </tr>
-              <tr>
-                <td align="center" style="padding:30px;">
-                  <table role="presentation" border="0" cellpadding="0" cellspacing="0">
-                    <tr>
-                      <td align="center" bgcolor="#28a745" style="border-radius:5px;">
-                        <a href="{confirmation_link}" target="_blank" style="display:inline-block; padding:12px 20px; font-weight:bold; color:#ffffff; text-decoration:none; font-family: Arial, sans-serif;">
-                          Registrierung bestätigen
-                        </a>
-                      </td>
-                    </tr>
-                  </table>
-                </td>
-              </tr>
-              <tr>
-                <td style="padding:0 30px; text-align:center; color:#333;">
-                  <p>Viele Grüsse vom <strong>{sender_display_name}</strong></p>
-                  <p style="color:#555; font-size:14px;">Bei Fragen melde dich ungeniert bei uns!</p>
-                </td>
-              </tr>
-              <tr>
-                <td align="center" style="padding:20px; font-size:14px;">
-                  <a href="https://discord.gg/ekmVqnzF9g" style="color:#007bff; text-decoration:none;">Discord</a> ∙
-                  <a href="https://ksrminecraft.ch" style="color:#007bff; text-decoration:none;">Website</a>
-                </td>
-              </tr>
-            </table>
-          </td>
-        </tr>
-      </table>
-    </body>
-    </html>
+    msg = build_confirmation_email(to_email, confirmation_link, firstname)
+
+    get_smtp_sender().send(msg)
+    logger.info("✅ SMTP Versand OK")
+    _save_sent_copy(config, config, msg)
+
+
+def send_confirmation_emails(mails: list) -> list:
     """
+    Verschickt viele Bestätigungsmails über eine einzige SMTP-Session.
+    mails: Liste von (to_email, confirmation_link, firstname)
+    Rückgabe: pro Mail None (OK) oder die Exception.
+    """
+    config = _get_config()
+    messages, results = _build_messages(mails)
 
-    # Multipart-Mail (Plain + HTML)
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = formataddr((sender_display_name, email_credentials["smtp_username"]))
-    msg["To"] = parsed_email
-
-    # Hilft beim IMAP-Append/Debugging + saubere Mail-Metadaten
-    msg["Date"] = formatdate(localtime=True)
-    msg["Message-ID"] = make_msgid()
-
-    # Parts anhängen
-    msg.attach(MIMEText(text_body, "plain", "utf-8"))
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-    # Debugging
-    if config.get("debug", False):
-        logger.info(f"Email: {parsed_email}")
-        logger.info(f"Message (UTF-8): {msg.as_string()}")
-
-    # Mail senden + IMAP-Sent-Kopie
-    try:
-        logger.info("Sende E-Mail.")
-        server.sendmail(email_credentials["smtp_username"], [parsed_email], msg.as_string())
-        logger.info("✅ SMTP Versand OK")
-
-        # Optional: Kopie in Sent speichern (IMAP)
-        if config.get("imap_save_sent", False):
-            sent_folder = config.get("sent_folder", "Sent")
-            # IMAP-Server/Port können in config stehen (empfohlen),
-            # wir reichen sie via creds mit.
-            email_credentials["imap_server"] = config.get("imap_server", email_credentials.get("imap_server"))
-            email_credentials["imap_port"] = config.get("imap_port", email_credentials.get("imap_port", 993))
+    logger.info(f"Sende {len(mails)} Bestätigungs-E-Mails über eine SMTP-Session.")
+    send_results = get_smtp_sender().send_many([msg for msg in messages if msg is not None])
+    return _collect_send_results(config, messages, results, send_results)
 
-            try:
-                used_folder = _append_to_sent_imap(email_credentials, msg, sent_folder)
-                if used_folder:
-                    logger.info(f"✅ Sent-Kopie gespeichert in: '{used_folder}'")
-            except Exception as e:
-                # Wichtig: Versand soll nicht scheitern, nur weil Sent-Kopie nicht geht
-                logger.error(f"Sent-Kopie per IMAP konnte nicht gespeichert werden: {e}")
 
-    finally:
-        logger.info("Beende SMTP-Verbindung.")
+def _build_messages(mails: list):
+    messages = []
+    results = []
+    for to_email, confirmation_link, firstname in mails:
         try:
-            server.quit()
-        except Exception:
-            pass
+            messages.append(build_confirmation_email(to_email, confirmation_link, firstname))
+            results.append(None)
+        except Exception as e:
+            messages.append(None)
+            results.append(e)
+    return messages, results
+
+
+def _collect_send_results(config, messages, results, send_results) -> list:
+    send_results = iter(send_results)
+    for index, msg in enumerate(messages):
+        if msg is None:
+            continue
+        results[index] = next(send_results)
+        if results[index] is None:
+            _save_sent_copy(config, config, msg)
+    return results
+
+
+async def send_confirmation_emails_async(mails: list) -> list:
+    """
+    Wie send_confirmation_emails(), aber über aiosmtplib (ASGI-Modus).
+    """
+    config = _get_config()
+    messages, results = _build_messages(mails)
+
+    logger.info(f"Sende {len(mails)} Bestätigungs-E-Mails über eine SMTP-Session (async).")
+    send_results = await get_async_smtp_sender().send_many([msg for msg in messages if msg is not None])
+    return _collect_send_results(config, messages, results, send_results)
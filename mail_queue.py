@@ -0,0 +1,227 @@
+# Dauerhafte Warteschlange für ausgehende Mails (Tabelle mail_queue) + Sender-Thread
+# (bzw. Sender-Task im ASGI-Modus, siehe run_sender_async)
+import asyncio
+import os
+import threading
+import time
+import mail_handler
+from database_handler import DatabaseHandler
+from log_handler import *
+
+# Weckt den Sender im selben Prozess sofort nach enqueue() auf
+_wakeup = threading.Event()
+_wakeup_async = None
+
+# Gesetzt von gunicorn.conf.py: jeder Worker startet seinen Sender selbst (post_fork), weil
+# ein Sender im Master von den Registrierungen in den Workern nie geweckt würde
+SENDER_IN_WORKERS_ENV = 'KSR_MAIL_SENDER_IN_WORKERS'
+
+
+def sender_runs_in_workers() -> bool:
+    return os.environ.get(SENDER_IN_WORKERS_ENV) == '1'
+
+
+def confirmation_queued(recipient: str):
+    """
+    Nach try_register(..., link_for=...): die Bestätigungsmail liegt (mit der Registrierung
+    committet) in der Warteschlange, der Sender im selben Prozess wird geweckt.
+    """
+    logger.info(f"Bestätigungsmail an {recipient} in Warteschlange gelegt.")
+    _wakeup.set()
+    if _wakeup_async is not None:
+        _wakeup_async.set()
+
+
+def _resend_cooldown(config) -> int:
+    return int(config.get('mail_resend_cooldown', 300))
+
+
+def resend_confirmation(db, config, recipient: str, confirmation_link: str, firstname: str = ""):
+    """
+    Legt den Bestätigungslink erneut in die Warteschlange, ausser an 'recipient' ging
+    innerhalb von 'mail_resend_cooldown' Sekunden schon eine Mail (dann None).
+    """
+    mail_id = db.enqueue_mail_unless_recent(recipient, firstname, confirmation_link, _resend_cooldown(config))
+    if mail_id is None:
+        logger.info(f"Keine neue Bestätigungsmail an {recipient}: letzte Mail liegt innerhalb des Cooldowns.")
+        return None
+    logger.info(f"Bestätigungsmail #{mail_id} an {recipient} erneut in Warteschlange gelegt.")
+    _wakeup.set()
+    return mail_id
+
+
+async def resend_confirmation_async(db, config, recipient: str, confirmation_link: str, firstname: str = ""):
+    """
+    Wie resend_confirmation(), über einen AsyncDatabaseHandler.
+    """
+    mail_id = await db.enqueue_mail_unless_recent(recipient, firstname, confirmation_link, _resend_cooldown(config))
+    if mail_id is None:
+        logger.info(f"Keine neue Bestätigungsmail an {recipient}: letzte Mail liegt innerhalb des Cooldowns.")
+        return None
+    logger.info(f"Bestätigungsmail #{mail_id} an {recipient} erneut in Warteschlange gelegt.")
+    if _wakeup_async is not None:
+        _wakeup_async.set()
+    return mail_id
+
+
+def _retry_delay(config, attempts: int) -> int:
+    """
+    Exponentielles Backoff: retry_base, 2x, 4x, ... (max. 1 Stunde)
+    """
+    base = int(config.get('mail_queue_retry_base', 30))
+    return min(base * 2 ** (attempts - 1), 3600)
+
+
+def _batch_settings(config):
+    return (
+        int(config.get('mail_queue_batch_size', 20)),
+        int(config.get('mail_queue_lease', 300)),
+        int(config.get('mail_queue_max_attempts', 8))
+    )
+
+
+def _batch_mails(batch) -> list:
+    return [(recipient, confirmation_link, firstname) for _, recipient, firstname, confirmation_link, _ in batch]
+
+
+def _plan_results(config, batch, results, max_attempts):
+    """
+    Liefert pro Mail (mail_id, None) für versendet oder (mail_id, (delay, fehler, failed)) zum Neuplanen.
+    """
+    for (mail_id, recipient, firstname, confirmation_link, attempts), e in zip(batch, results):
+        if e is None:
+            yield mail_id, None
+            continue
+
+        failed = attempts >= max_attempts
+        delay = _retry_delay(config, attempts)
+        if failed:
+            logger.error(f"Mail #{mail_id} an {recipient} nach {attempts} Versuchen aufgegeben: {e}")
+        else:
+            logger.error(f"Mail #{mail_id} an {recipient} fehlgeschlagen (Versuch {attempts}), neuer Versuch in {delay}s: {e}")
+        yield mail_id, (delay, e, failed)
+
+
+def process_batch(config) -> int:
+    """
+    Verschickt einen Block fälliger Mails. Gibt die Anzahl bearbeiteter Mails zurück.
+    """
+    batch_size, lease_seconds, max_attempts = _batch_settings(config)
+
+    with DatabaseHandler(config) as db:
+        batch = db.claim_mail_batch(batch_size, lease_seconds)
+
+    if not batch:
+        return 0
+
+    # Ganzer Block über eine SMTP-Session
+    results = mail_handler.send_confirmation_emails(_batch_mails(batch))
+
+    with DatabaseHandler(config) as db:
+        for mail_id, retry in _plan_results(config, batch, results, max_attempts):
+            if retry is None:
+                db.mark_mail_sent(mail_id)
+            else:
+                delay, e, failed = retry
+                db.reschedule_mail(mail_id, delay, e, failed=failed)
+
+    return len(batch)
+
+
+async def process_batch_async(config) -> int:
+    """
+    Wie process_batch(), mit aiomysql und aiosmtplib (ASGI-Modus).
+    """
+    from async_database_handler import AsyncDatabaseHandler
+    batch_size, lease_seconds, max_attempts = _batch_settings(config)
+
+    async with AsyncDatabaseHandler() as db:
+        batch = await db.claim_mail_batch(batch_size, lease_seconds)
+
+    if not batch:
+        return 0
+
+    results = await mail_handler.send_confirmation_emails_async(_batch_mails(batch))
+
+    async with AsyncDatabaseHandler() as db:
+        for mail_id, retry in _plan_results(config, batch, results, max_attempts):
+            if retry is None:
+                await db.mark_mail_sent(mail_id)
+            else:
+                delay, e, failed = retry
+                await db.reschedule_mail(mail_id, delay, e, failed=failed)
+
+    return len(batch)
+
+
+def run_sender(config):
+    """
+    Arbeitet die Warteschlange ab. Ist nichts fällig, wird bis zum nächsten
+    enqueue() (selber Prozess) oder höchstens 'mail_queue_poll_interval' Sekunden gewartet.
+    """
+    poll_interval = float(config.get('mail_queue_poll_interval', 2))
+    retention_days = int(config.get('mail_queue_retention_days', 7))
+    last_purge = 0.0
+
+    logger.info("Mail-Sender gestartet.")
+    while True:
+        try:
+            if time.monotonic() - last_purge > 3600:
+                purged = _purge_sent_mails(config, retention_days)
+                if purged:
+                    logger.info(f"{purged} versendete Mails aus der Warteschlange entfernt.")
+                last_purge = time.monotonic()
+
+            if process_batch(config) == 0:
+                mail_handler.get_smtp_sender().maintain()
+                _wakeup.wait(poll_interval)
+                _wakeup.clear()
+        except Exception as e:
+            logger.error(f"Fehler im Mail-Sender: {e}")
+            time.sleep(poll_interval)
+
+
+async def run_sender_async(config):
+    """
+    Sender als Task in der Event-Loop des ASGI-Servers. Das Aufräumen alter
+    Mails läuft synchron in einem Thread (selten, kein Request-Pfad).
+    """
+    global _wakeup_async
+    _wakeup_async = asyncio.Event()
+    poll_interval = float(config.get('mail_queue_poll_interval', 2))
+    retention_days = int(config.get('mail_queue_retention_days', 7))
+    last_purge = 0.0
+
+    logger.info("Mail-Sender (async) gestartet.")
+    while True:
+        try:
+            if time.monotonic() - last_purge > 3600:
+                purged = await asyncio.to_thread(_purge_sent_mails, config, retention_days)
+                if purged:
+                    logger.info(f"{purged} versendete Mails aus der Warteschlange entfernt.")
+                last_purge = time.monotonic()
+
+            if await process_batch_async(config) == 0:
+                await mail_handler.get_async_smtp_sender().maintain()
+                try:
+                    await asyncio.wait_for(_wakeup_async.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                _wakeup_async.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Fehler im Mail-Sender: {e}")
+            await asyncio.sleep(poll_interval)
+
+
+def _purge_sent_mails(config, retention_days) -> int:
+    with DatabaseHandler(config) as db:
+        return db.delete_sent_mails_before(retention_days)
+
+
+def start_sender(config):
+    sender_thread = threading.Thread(target=run_sender, args=(config,), name='mail-sender')
+    sender_thread.daemon = True
+    sender_thread.start()
+    return sender_thread
@@ -1,88 +1,77 @@
 # Main-File für die Registrierung von Benutzern für den Minecraft-Server
-from flask import Flask, render_template, request, redirect, url_for
-from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
+from flask import Flask, Response, jsonify, render_template, request, redirect, stream_with_context, url_for
+from itsdangerous import SignatureExpired, BadSignature
 from log_handler import *
-from database_handler import DatabaseHandler
-import json, mail_handler, datetime, time, threading, signal, sys
+from database_handler import DatabaseHandler, RegistrationResult, init_request_scope
+from migration_handler import run_migrations
+from config_handler import get_config, install_reload_signal, is_email_allowed, get_max_users_per_mail
+from registration_handler import (
+    ConfirmationTokens, confirmation_link, email_not_allowed_message, load_secret_key, token_max_age,
+    validate_registration_form
+)
+import mail_handler, mail_queue, datetime, os, signal, sys
 import mojang_handler  # neue Datei für Mojang-Username/UUID-Check
+import cleaner_handler
+import metrics_handler
+import rate_limit_handler
+import admin_handler
+import page_cache
 
 
 app = Flask(__name__, template_folder='templates')
 
-# Laden der Konfiguration
-with open('config.json', encoding="utf-8") as file:
-    config = json.load(file)
+# Static-Assets mit Fingerprint und vorgerenderte Seiten (siehe page_cache.py)
+assets = page_cache.StaticAssets(app.static_folder)
+pages = page_cache.PageCache(os.path.join(app.root_path, app.template_folder))
 
 
-def _normalize_email(value: str) -> str:
-    """
-    Normalisiert E-Mail für Vergleiche (case-insensitive).
-    """
-    return (value or "").strip().lower()
+@app.template_global()
+def asset_url(filename):
+    name = assets.fingerprinted(filename)
+    if name is None:
+        return url_for('static', filename=filename)
+    return url_for('asset', name=name)
 
 
-def _get_email_user_limits_map(cfg: dict) -> dict:
-    """
-    Liefert email_user_limits als normalisierte Map:
-      { "mail@domain.tld": int_limit, ... }
-    """
-    raw = cfg.get("email_user_limits", {}) or {}
-    normalized = {}
-    for k, v in raw.items():
-        key = _normalize_email(str(k))
-        try:
-            normalized[key] = int(v)
-        except Exception:
-            # Falls jemand Mist einträgt, ignorieren wir den Eintrag
-            continue
-    return normalized
+def cached_response(cached):
+    return page_cache.respond(
+        cached, request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since'),
+        request.headers.get('Accept-Encoding')
+    )
 
 
-def is_email_allowed(email: str, cfg: dict) -> bool:
-    """
-    Erlaubt sind:
-      - E-Mails, deren Endung in accepted_mail_endings vorkommt
-      - ODER E-Mails, die explizit in email_user_limits stehen (auch ohne @sluz.ch)
-    """
-    email_lc = _normalize_email(email)
+# Seite ohne Request-Abhängigkeit: einmal pro Konfigurationsversion rendern, danach nur noch ausliefern
+def static_page(template):
+    config = get_config()
+    if not page_cache.is_enabled(config):
+        return render_template(template, config=config)
+    cached = pages.get(template, config)
+    if cached is None:
+        cached = pages.put(template, render_template(template, config=config), config)
+    return cached_response(cached)
 
-    # Whitelist/Override via email_user_limits
-    limits = _get_email_user_limits_map(cfg)
-    if email_lc in limits:
-        return True
 
-    accepted_mail_endings = cfg.get("accepted_mail_endings", []) or []
-    return any(email_lc.endswith(str(ending).lower()) for ending in accepted_mail_endings)
-
-
-def get_max_users_per_mail(email: str, cfg: dict) -> int:
-    """
-    Standard: cfg['max_users_per_mail'] (Fallback 3)
-    Override: cfg['email_user_limits'][email] (case-insensitive)
-    """
-    default_max = int(cfg.get("max_users_per_mail", 3))
-    email_lc = _normalize_email(email)
-
-    limits = _get_email_user_limits_map(cfg)
-    if email_lc in limits:
-        return limits[email_lc]
-
-    return default_max
+@app.route('/assets/<path:name>')
+def asset(name):
+    cached = assets.get(name)
+    if cached is None:
+        return Response('Not Found', 404)
+    return cached_response(cached)
 
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return static_page('index.html')
 
 
 @app.route('/success')
 def success():
-    return render_template('success.html', config=config)
+    return static_page('success.html')
 
 
 @app.route('/registration_completed')
 def registration_completed():
-    return render_template('registration_completed.html', config=config)
+    return static_page('registration_completed.html')
 
 
 @app.route('/error')
@@ -93,109 +82,141 @@ def error():
 
 @app.route('/register', methods=['GET'])
 def show_registration_form():
-    return render_template('registration.html')
-
-
-# SECRET_KEY aus JSON-Datei laden
-def load_secret_key():
-    with open('secret_key.json', encoding="utf-8") as file:
-        data = json.load(file)
-        logger.info("Json-Secret-File erfolgreich geladen.")
-        return data['secret_key']
+    return static_page('registration.html')
 
 
 # Laden der SECRET_KEY aus der JSON-Datei
 app.config['SECRET_KEY'] = load_secret_key()
-serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'])
+tokens = ConfirmationTokens(app.config['SECRET_KEY'])
 logger.info("Json-Secret-File erfolgreich inizialisiert.")
 
 
+# Rate-Limit oder Lastabwurf: sofort ablehnen, ohne DB, Mojang oder SMTP
+@app.errorhandler(rate_limit_handler.RateLimitExceeded)
+def too_many_requests(e):
+    return render_template('error.html', errors=[e.message]), e.status, {'Retry-After': str(e.retry_after)}
+
+
+# Link für eine bereits offene Registrierung erneut schicken (mit Cooldown gegen Mehrfachversand)
+def resend_confirmation(db, config, pending, minecraft_username, email, firstname):
+    registration_id, minecraft_uuid = pending
+    token = tokens.dumps(registration_id, minecraft_uuid, minecraft_username, email)
+    mail_id = mail_queue.resend_confirmation(db, config, email, confirmation_link(request.host_url, token), firstname=firstname)
+    metrics_handler.RESENDS.labels('sent' if mail_id else 'cooldown').inc()
+    return redirect(url_for('success'))
+
+
+# Fehlerseite für eine abgelehnte Registrierung (E-Mail-Limit oder Benutzername vergeben)
+def reject_registration(result, email, minecraft_username, max_permitted_users_per_mail):
+    # Zu viele Accounts pro Mail?
+    if result == RegistrationResult.EMAIL_LIMIT:
+        logger.info(f"Abbruch: Zu viele User mit dieser E-Mail-Adresse registriert ({email})")
+        metrics_handler.REJECTIONS.labels('email_limit').inc()
+        return render_template(
+            'error.html',
+            errors=[f"Es sind bereits {max_permitted_users_per_mail} Benutzer mit dieser E-Mail-Adresse registriert."]
+        )
+
+    # Benutzername schon registriert
+    logger.info(f"Abbruch: Benutzername bereits in der Datenbank vorhanden ({minecraft_username}).")
+    metrics_handler.REJECTIONS.labels('username_taken').inc()
+    return render_template('error.html', errors=['Dieser Minecraft-Benutzername ist bereits registriert.'])
+
+
 # Registrierungsdaten verarbeiten
 @app.route('/register', methods=['POST'])
+@rate_limit_handler.shed_load
 def register():
     logger.info("Versuche neuen User zu registrieren.")
-    firstname = request.form['firstname']
-    lastname = request.form['lastname']
-    email = request.form['email']
-    school = request.form['school']
-    minecraft_username = request.form['minecraft_username']
-
-    errors = []
+    config = get_config()
+    rate_limit_handler.enforce(('register_ip', rate_limit_handler.request_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))))
 
     # Validierung der Eingabedaten
-    if not firstname:
-        errors.append('Vorname ist erforderlich.')
-    if not lastname:
-        errors.append('Nachname ist erforderlich.')
-    if not email:
-        errors.append('E-Mail ist erforderlich.')
-    if not school:
-        errors.append('Schule ist erforderlich.')
-    if not minecraft_username:
-        errors.append('Minecraft-Benutzername ist erforderlich.')
+    form, errors = validate_registration_form(request.form)
+    firstname = form['firstname']
+    lastname = form['lastname']
+    email = form['email']
+    school = form['school']
+    minecraft_username = form['minecraft_username']
 
     if errors:
+        metrics_handler.REJECTIONS.labels('invalid_form').inc()
         return render_template('error.html', errors=errors)
 
+    rate_limit_handler.enforce(('register_email', email), ('register_username', minecraft_username))
+
     # E-Mail erlauben? (Endung oder Whitelist via email_user_limits)
     if not is_email_allowed(email, config):
-        accepted_mail_endings = config.get('accepted_mail_endings', []) or []
         logger.info("Abbruch: Unzulässige Mailadresse (nicht in Whitelist und Endung nicht erlaubt).")
-        return render_template(
-            'error.html',
-            errors=[f"Die Registrierung ist nur für E-Mail-Adressen mit folgenden Endungen erlaubt: {', '.join(accepted_mail_endings)}"]
-        )
+        metrics_handler.REJECTIONS.labels('email_not_allowed').inc()
+        return render_template('error.html', errors=[email_not_allowed_message(config)])
 
-    # Anzahl Accounts pro Mail prüfen (mit Override via email_user_limits)
-    with DatabaseHandler(config) as db:
-        count = db.get_user_count_by_email(email)
-
-    max_permitted_users_per_mail = get_max_users_per_mail(email, config)
-
-    # Zu viele Accounts pro Mail?
-    if count >= max_permitted_users_per_mail:
-        logger.info(f"Abbruch: Zu viele User mit dieser E-Mail-Adresse registriert ({email})")
-        return render_template(
-            'error.html',
-            errors=[f"Es sind bereits {max_permitted_users_per_mail} Benutzer mit dieser E-Mail-Adresse registriert."]
-        )
-
-    # Benutzername schon registriert?
+    # Dieselbe Registrierung (E-Mail + Benutzername) ist noch offen: Eintrag auffrischen und
+    # Link erneut schicken – kein zweiter Eintrag, kein weiterer Mojang-Aufruf
+    created_at = datetime.datetime.now()
     with DatabaseHandler(config) as db:
+        pending = db.refresh_pending_registration(email, minecraft_username, created_at)
+        if pending:
+            logger.info(f"Offene Registrierung für {minecraft_username} ({email}) aufgefrischt.")
+            return resend_confirmation(db, config, pending, minecraft_username, email, firstname)
+
+        # Günstige Vorprüfung über die Indizes, damit abgelehnte Anfragen Mojang nicht belasten.
+        # Verbindlich bleibt die atomare Prüfung in try_register() (Limit mit Override via email_user_limits).
+        max_permitted_users_per_mail = get_max_users_per_mail(email, config)
+        if db.get_user_count_by_email(email) >= max_permitted_users_per_mail:
+            return reject_registration(RegistrationResult.EMAIL_LIMIT, email, minecraft_username, max_permitted_users_per_mail)
         if db.is_username_exists(minecraft_username):
-            logger.info(f"Abbruch: Benutzername bereits in der Datenbank vorhanden ({minecraft_username}).")
-            return render_template('error.html', errors=['Dieser Minecraft-Benutzername ist bereits registriert.'])
+            return reject_registration(RegistrationResult.USERNAME_TAKEN, email, minecraft_username, max_permitted_users_per_mail)
 
-    # Offizieller Minecraft-Account?
-    if not mojang_handler.is_official_username(minecraft_username):
+    # Offizieller Minecraft-Account? Die UUID wird direkt mit der Registrierung gespeichert.
+    try:
+        minecraft_uuid = mojang_handler.get_uuid(minecraft_username)
+    except mojang_handler.MojangUnavailableError as e:
+        logger.error(f"Abbruch: Mojang-API nicht erreichbar ({e}).")
+        metrics_handler.REJECTIONS.labels('mojang_unavailable').inc()
+        return render_template('error.html', errors=['Der Minecraft-Dienst ist momentan nicht erreichbar. Bitte versuche es in ein paar Minuten erneut.'])
+    if not minecraft_uuid:
         logger.info(f"Abbruch: Kein gültiger Minecraft-Account ({minecraft_username}).")
+        metrics_handler.REJECTIONS.labels('invalid_username').inc()
         return render_template('error.html', errors=['Ungültiger Minecraft-Benutzername.'])
 
-    # Token generieren
-    logger.info("Generiere Token für Bestätigungslink.")
-    token = serializer.dumps(email, salt='email-confirm')
+    # Bestätigungslink (führt auf confirm_page!) – Versand übernimmt der Mail-Sender.
+    # Das Token enthält ID und UUID der Registrierung, /confirm braucht also weder Mojang noch eine Suche per E-Mail.
+    def link_for(registration_id):
+        token = tokens.dumps(registration_id, minecraft_uuid, minecraft_username, email)
+        logger.info(f"Lege Bestätigungslink mit Token ({token}) in die Mail-Warteschlange.")
+        return confirmation_link(request.host_url, token)
 
-    # Registrierung speichern
+    # Registrierung und Bestätigungsmail in einer Transaktion speichern: E-Mail-Limit und
+    # Benutzername werden atomar in der DB geprüft
     logger.info("Speichere Registrierungsdaten in Datenbank.")
-    created_at = datetime.datetime.now()
     with DatabaseHandler(config) as db:
-        db.insert_registration(firstname, lastname, email, school, minecraft_username, 0, created_at)
+        result, _ = db.try_register(firstname, lastname, email, school, minecraft_username, minecraft_uuid,
+                                    max_permitted_users_per_mail, created_at, link_for=link_for)
+
+        # Gleichzeitig doppelt abgeschickt: der andere Request hat den Eintrag eben angelegt
+        if result == RegistrationResult.USERNAME_TAKEN:
+            pending = db.refresh_pending_registration(email, minecraft_username, created_at)
+            if pending:
+                return resend_confirmation(db, config, pending, minecraft_username, email, firstname)
 
-    # Bestätigungslink (führt auf confirm_page!)
-    confirmation_link = request.host_url + 'confirm_page/' + token
-    logger.info(f"Sende Bestätigungslink mit Token ({token}) per E-Mail.")
-    mail_handler.send_confirmation_email(to_email=email, confirmation_link=confirmation_link, firstname=firstname)
+    if result != RegistrationResult.OK:
+        return reject_registration(result, email, minecraft_username, max_permitted_users_per_mail)
+
+    mail_queue.confirmation_queued(email)
 
     logger.info("Registrierung erfolgreich abgeschlossen.")
+    metrics_handler.REGISTRATIONS.inc()
     return redirect(url_for('success'))
 
 
 # Zwischenseite anzeigen
 @app.route('/confirm_page/<token>', methods=['GET'])
 def confirm_page(token):
+    config = get_config()
     try:
-        email = serializer.loads(token, salt='email-confirm', max_age=config['waiting_time_for_db_cleaner'] * 600)
-        return render_template('confirm_page.html', email=email, token=token)
+        data = tokens.loads(token, token_max_age(config))
+        return render_template('confirm_page.html', email=data['email'], token=token)
     except SignatureExpired:
         logger.info("Bestätigungslink abgelaufen (Zwischenseite).")
         return render_template('error.html', errors=['Bestätigungslink ist abgelaufen.'])
@@ -209,34 +230,35 @@ def confirm_page(token):
 
 # Bestätigung per Button-Klick (POST)
 @app.route('/confirm', methods=['POST'])
+@rate_limit_handler.shed_load
 def confirm_email():
+    rate_limit_handler.enforce(('confirm_ip', rate_limit_handler.request_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))))
     token = request.form.get('token')
+    config = get_config()
     try:
         logger.info("Versuche Bestätigungsemail zu verarbeiten.")
-        email = serializer.loads(token, salt='email-confirm', max_age=config['waiting_time_for_db_cleaner'] * 600)
-
-        # Registrierungsstatus setzen
-        logger.info("Aktualisiere Bestätigungsstatus in Datenbank.")
-        with DatabaseHandler(config) as db:
-            db.confirm_registration(email)
-
-        # Benutzernamen abrufen
-        with DatabaseHandler(config) as db:
-            minecraft_username = db.get_latest_minecraft_username(email)
-
-        if minecraft_username:
+        data = tokens.loads(token, token_max_age(config))
+        if 'rid' not in data:
+            return confirm_legacy_token(config, data['email'])
+
+        # Bestätigen und Whitelist-Eintrag in einer Transaktion, per Primärschlüssel
+        minecraft_username, uuid = data['username'], data['uuid']
+        if not uuid:
+            # Erneut verschickter Link einer Registrierung von vor der UUID-Spalte
             uuid = mojang_handler.get_uuid(minecraft_username)
-            if uuid:
-                with DatabaseHandler(config) as db:
-                    db.insert_into_whitelist(uuid, minecraft_username)
-                logger.info("Bestätigung erfolgreich abgeschlossen und Spieler in mysql_whitelist eingetragen.")
-            else:
+            if not uuid:
                 logger.error(f"Keine UUID für {minecraft_username} gefunden – Spieler NICHT eingetragen!")
+                return redirect(url_for('registration_completed'))
 
-            return redirect(url_for('registration_completed'))
-        else:
-            logger.info("Kein Benutzername in der DB gefunden.")
-            return render_template('error.html', errors=[f'Der Minecraft-Benutzername für {email} konnte nicht gefunden werden.'])
+        with DatabaseHandler(config) as db:
+            confirmed = db.confirm_and_whitelist(data['rid'], minecraft_username, uuid)
+        if not confirmed:
+            logger.info(f"Registrierung #{data['rid']} nicht (mehr) vorhanden.")
+            return render_template('error.html', errors=[f"Die Registrierung für {data['email']} konnte nicht gefunden werden."])
+
+        logger.info(f"Bestätigung erfolgreich abgeschlossen und Spieler {minecraft_username} in mysql_whitelist eingetragen.")
+        metrics_handler.CONFIRMATIONS.inc()
+        return redirect(url_for('registration_completed'))
 
     except SignatureExpired:
         logger.info("Bestätigungslink abgelaufen.")
@@ -249,47 +271,122 @@ def confirm_email():
         return render_template('error.html', errors=['Fehler beim Bestätigen der Registrierung.'])
 
 
-# Cleanup-Handler
-def cleanup_handler(signum, frame):
-    logger.info("Datenbank-Cleaner beendet.")
-    sys.exit(0)
+# Links aus Mails von vor der Umstellung (Token enthält nur die E-Mail)
+def confirm_legacy_token(config, email):
+    # Registrierungsstatus setzen
+    logger.info("Aktualisiere Bestätigungsstatus in Datenbank (alter Link).")
+    with DatabaseHandler(config) as db:
+        db.confirm_registration(email)
+
+        # Benutzernamen und bei der Registrierung gespeicherte UUID abrufen
+        profile = db.get_latest_registration_profile(email)
+        if not profile:
+            logger.info("Kein Benutzername in der DB gefunden.")
+            return render_template('error.html', errors=[f'Der Minecraft-Benutzername für {email} konnte nicht gefunden werden.'])
 
+        minecraft_username, uuid = profile
+        if not uuid:
+            # Registrierungen von vor der UUID-Spalte
+            uuid = mojang_handler.get_uuid(minecraft_username)
+        if uuid:
+            db.insert_into_whitelist(uuid, minecraft_username)
+            logger.info("Bestätigung erfolgreich abgeschlossen und Spieler in mysql_whitelist eingetragen.")
+            metrics_handler.CONFIRMATIONS.inc()
+        else:
+            logger.error(f"Keine UUID für {minecraft_username} gefunden – Spieler NICHT eingetragen!")
+
+    return redirect(url_for('registration_completed'))
+
+
+# Admin-Zugriff per Bearer-Token; ohne 'admin_token' in der Konfiguration gibt es die Routen nicht
+def admin_denied(config):
+    if not admin_handler.is_enabled(config):
+        return Response('Not Found', 404)
+    if not admin_handler.is_authorized(request.headers.get('Authorization'), config):
+        logger.warning(f"Admin-Zugriff ohne gültiges Token auf {request.path} von {request.remote_addr}.")
+        return Response('Nicht autorisiert.', 401, {'WWW-Authenticate': 'Bearer realm="admin"'})
+    return None
 
-# Unbestätigte Registrierungen bereinigen
-def cleanup_unconfirmed_registrations():
-    while True:
-        try:
-            logger.info("Starte Datenbank-Cleaner.")
-            time_difference = config['waiting_time_for_db_cleaner']
-            with DatabaseHandler(config) as db_handler:
-                unconfirmed = db_handler.get_unconfirmed_registrations_before(time_difference)
-                deleted_count = db_handler.delete_unconfirmed_registrations_before(time_difference)
 
-            if deleted_count > 0:
-                logger.info(f"{deleted_count} Einträge wurden gelöscht:")
-                for reg in unconfirmed:
-                    email = reg[3]
-                    minecraft_username = reg[5]
-                    logger.info(f"Email: {email}, Minecraft-Benutzername: {minecraft_username}")
-            else:
-                logger.info("Es wurden keine Einträge gelöscht.")
+# Export der Registrierungen als CSV oder JSON-Lines, gestreamt aus einem ungepufferten Cursor
+@app.route('/admin/export')
+def admin_export():
+    config = get_config()
+    denied = admin_denied(config)
+    if denied:
+        return denied
+    try:
+        fmt = admin_handler.export_format(request.args)
+        query, params = admin_handler.build_export_query(request.args)
+    except admin_handler.ExportFilterError as e:
+        return Response(str(e), 400)
+
+    logger.info(f"Admin-Export ({fmt}) gestartet, Filter: {params}.")
+
+    def generate():
+        with DatabaseHandler(config) as db:
+            yield from admin_handler.render_export(db.stream_rows(query, params, admin_handler.export_batch_size(config)), fmt)
+
+    return Response(
+        stream_with_context(generate()),
+        content_type=admin_handler.EXPORT_CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{admin_handler.export_filename(fmt)}"'}
+    )
+
+
+# Zahlen pro Schule und Bestätigungs-Funnel (kurz zwischengespeichert)
+@app.route('/admin/stats')
+def admin_stats():
+    config = get_config()
+    denied = admin_denied(config)
+    if denied:
+        return denied
+    stats = admin_handler.stats_cache.get()
+    if stats is None:
+        with DatabaseHandler(config) as db:
+            stats = admin_handler.build_stats(*db.get_registration_stats())
+        admin_handler.stats_cache.put(stats, admin_handler.stats_cache_ttl(config))
+    return jsonify(stats)
 
-            time.sleep(time_difference * 60)
-        except Exception as e:
-            logger.error(f"Fehler beim Bereinigen der unbestätigten Registrierungen: {e}")
-            time.sleep(30)
+
+# Prometheus-Metriken (alle Gunicorn-Worker zusammengefasst)
+@app.route('/metrics')
+def metrics():
+    data, content_type = metrics_handler.render_metrics()
+    return Response(data, content_type=content_type)
+
+
+# Cleanup-Handler
+def cleanup_handler(signum, frame):
+    logger.info("Datenbank-Cleaner beendet.")
+    sys.exit(0)
 
 
 # Factory-Methode für Gunicorn
 def init_app():
-    logger.info("Initialisiere App (DB + Cleaner).")
+    logger.info("Initialisiere App (DB + Cleaner + Mail-Sender).")
+    config = get_config()
+    configure_logging(config)
+    install_reload_signal()
+    init_request_scope(app)
+    mojang_handler.configure(config)
+    mail_handler.configure(config)
+    rate_limit_handler.configure(config)
     with DatabaseHandler(config) as db_handler:
         db_handler.create_table()
+        run_migrations(db_handler)
+
+    if page_cache.is_enabled(config):
+        with app.test_request_context():
+            for template in page_cache.STATIC_PAGES:
+                pages.put(template, render_template(template, config=config), config)
+
+    cleaner_handler.start_cleaner()
 
-    cleanup_thread = threading.Thread(target=cleanup_unconfirmed_registrations)
-    cleanup_thread.daemon = True
-    cleanup_thread.start()
-    logger.info("Cleanup-Thread gestartet.")
+    # Unter gunicorn startet jeder Worker seinen Sender per post_fork (siehe gunicorn.conf.py);
+    # mehrere Sender sind dank FOR UPDATE SKIP LOCKED unproblematisch
+    if not mail_queue.sender_runs_in_workers():
+        mail_queue.start_sender(config)
 
     return app
 
@@ -301,4 +398,4 @@ application = init_app()
 if __name__ == '__main__':
     logger.info("Starte Webserver im DEV-Modus.")
     signal.signal(signal.SIGTERM, cleanup_handler)
-    app.run(host="127.0.0.1", port=5000, debug=config['debug'])
+    app.run(host="127.0.0.1", port=5000, debug=get_config()['debug'])
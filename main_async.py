@@ -0,0 +1,389 @@
+# ASGI-Variante der Registrierung (Quart): derselbe Ablauf wie main.py, aber DB-, Mojang- und
+# SMTP-Zugriffe blockieren keinen Worker-Thread, sondern laufen in der Event-Loop.
+# Start: hypercorn main_async:app --workers 4 --bind 0.0.0.0:5000
+from quart import Quart, Response, jsonify, render_template, request, redirect, url_for
+from itsdangerous import SignatureExpired, BadSignature
+from log_handler import *
+from database_handler import DatabaseHandler, RegistrationResult
+from async_database_handler import AsyncDatabaseHandler, init_pool, close_pool
+from migration_handler import run_migrations
+from config_handler import get_config, install_reload_signal, is_email_allowed, get_max_users_per_mail
+from registration_handler import (
+    ConfirmationTokens, confirmation_link, email_not_allowed_message, load_secret_key, token_max_age,
+    validate_registration_form
+)
+import asyncio, datetime, mail_handler, mail_queue, os
+import mojang_handler
+import cleaner_handler
+import metrics_handler
+import rate_limit_handler
+import admin_handler
+import page_cache
+
+
+app = Quart(__name__, template_folder='templates')
+
+app.config['SECRET_KEY'] = load_secret_key()
+tokens = ConfirmationTokens(app.config['SECRET_KEY'])
+
+assets = page_cache.StaticAssets(app.static_folder)
+pages = page_cache.PageCache(os.path.join(app.root_path, app.template_folder))
+
+
+@app.template_global()
+def asset_url(filename):
+    name = assets.fingerprinted(filename)
+    if name is None:
+        return url_for('static', filename=filename)
+    return url_for('asset', name=name)
+
+
+def cached_response(cached):
+    return page_cache.respond(
+        cached, request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since'),
+        request.headers.get('Accept-Encoding')
+    )
+
+
+async def static_page(template):
+    config = get_config()
+    if not page_cache.is_enabled(config):
+        return await render_template(template, config=config)
+    cached = pages.get(template, config)
+    if cached is None:
+        cached = pages.put(template, await render_template(template, config=config), config)
+    return cached_response(cached)
+
+
+@app.route('/assets/<path:name>')
+async def asset(name):
+    cached = assets.get(name)
+    if cached is None:
+        return Response('Not Found', 404)
+    return cached_response(cached)
+
+
+@app.route('/')
+async def index():
+    return await static_page('index.html')
+
+
+@app.route('/success')
+async def success():
+    return await static_page('success.html')
+
+
+@app.route('/registration_completed')
+async def registration_completed():
+    return await static_page('registration_completed.html')
+
+
+@app.route('/error')
+async def error():
+    errors = request.args.get('errors')
+    return await render_template('error.html', errors=errors)
+
+
+@app.route('/register', methods=['GET'])
+async def show_registration_form():
+    return await static_page('registration.html')
+
+
+# Rate-Limit oder Lastabwurf: sofort ablehnen, ohne DB, Mojang oder SMTP
+@app.errorhandler(rate_limit_handler.RateLimitExceeded)
+async def too_many_requests(e):
+    return await render_template('error.html', errors=[e.message]), e.status, {'Retry-After': str(e.retry_after)}
+
+
+# Link für eine bereits offene Registrierung erneut schicken (mit Cooldown gegen Mehrfachversand)
+async def resend_confirmation(db, config, pending, minecraft_username, email, firstname):
+    registration_id, minecraft_uuid = pending
+    token = tokens.dumps(registration_id, minecraft_uuid, minecraft_username, email)
+    mail_id = await mail_queue.resend_confirmation_async(db, config, email, confirmation_link(request.host_url, token), firstname=firstname)
+    metrics_handler.RESENDS.labels('sent' if mail_id else 'cooldown').inc()
+    return redirect(url_for('success'))
+
+
+# Fehlerseite für eine abgelehnte Registrierung (E-Mail-Limit oder Benutzername vergeben)
+async def reject_registration(result, email, minecraft_username, max_permitted_users_per_mail):
+    if result == RegistrationResult.EMAIL_LIMIT:
+        logger.info(f"Abbruch: Zu viele User mit dieser E-Mail-Adresse registriert ({email})")
+        metrics_handler.REJECTIONS.labels('email_limit').inc()
+        return await render_template(
+            'error.html',
+            errors=[f"Es sind bereits {max_permitted_users_per_mail} Benutzer mit dieser E-Mail-Adresse registriert."]
+        )
+
+    logger.info(f"Abbruch: Benutzername bereits in der Datenbank vorhanden ({minecraft_username}).")
+    metrics_handler.REJECTIONS.labels('username_taken').inc()
+    return await render_template('error.html', errors=['Dieser Minecraft-Benutzername ist bereits registriert.'])
+
+
+# Registrierungsdaten verarbeiten
+@app.route('/register', methods=['POST'])
+@rate_limit_handler.shed_load
+async def register():
+    logger.info("Versuche neuen User zu registrieren.")
+    config = get_config()
+    await rate_limit_handler.enforce_async(('register_ip', rate_limit_handler.request_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))))
+
+    form, errors = validate_registration_form(await request.form)
+    firstname = form['firstname']
+    lastname = form['lastname']
+    email = form['email']
+    school = form['school']
+    minecraft_username = form['minecraft_username']
+
+    if errors:
+        metrics_handler.REJECTIONS.labels('invalid_form').inc()
+        return await render_template('error.html', errors=errors)
+
+    await rate_limit_handler.enforce_async(('register_email', email), ('register_username', minecraft_username))
+
+    if not is_email_allowed(email, config):
+        logger.info("Abbruch: Unzulässige Mailadresse (nicht in Whitelist und Endung nicht erlaubt).")
+        metrics_handler.REJECTIONS.labels('email_not_allowed').inc()
+        return await render_template('error.html', errors=[email_not_allowed_message(config)])
+
+    # Dieselbe Registrierung ist noch offen: auffrischen und Link erneut schicken (ohne Mojang)
+    created_at = datetime.datetime.now()
+    async with AsyncDatabaseHandler() as db:
+        pending = await db.refresh_pending_registration(email, minecraft_username, created_at)
+        if pending:
+            logger.info(f"Offene Registrierung für {minecraft_username} ({email}) aufgefrischt.")
+            return await resend_confirmation(db, config, pending, minecraft_username, email, firstname)
+
+        # Vorprüfung über die Indizes vor dem Mojang-Aufruf; verbindlich bleibt try_register()
+        max_permitted_users_per_mail = get_max_users_per_mail(email, config)
+        if await db.get_user_count_by_email(email) >= max_permitted_users_per_mail:
+            return await reject_registration(RegistrationResult.EMAIL_LIMIT, email, minecraft_username, max_permitted_users_per_mail)
+        if await db.is_username_exists(minecraft_username):
+            return await reject_registration(RegistrationResult.USERNAME_TAKEN, email, minecraft_username, max_permitted_users_per_mail)
+
+    try:
+        minecraft_uuid = await mojang_handler.get_uuid_async(minecraft_username)
+    except mojang_handler.MojangUnavailableError as e:
+        logger.error(f"Abbruch: Mojang-API nicht erreichbar ({e}).")
+        metrics_handler.REJECTIONS.labels('mojang_unavailable').inc()
+        return await render_template('error.html', errors=['Der Minecraft-Dienst ist momentan nicht erreichbar. Bitte versuche es in ein paar Minuten erneut.'])
+    if not minecraft_uuid:
+        logger.info(f"Abbruch: Kein gültiger Minecraft-Account ({minecraft_username}).")
+        metrics_handler.REJECTIONS.labels('invalid_username').inc()
+        return await render_template('error.html', errors=['Ungültiger Minecraft-Benutzername.'])
+
+    def link_for(registration_id):
+        token = tokens.dumps(registration_id, minecraft_uuid, minecraft_username, email)
+        logger.info(f"Lege Bestätigungslink mit Token ({token}) in die Mail-Warteschlange.")
+        return confirmation_link(request.host_url, token)
+
+    # Registrierung und Bestätigungsmail in einer Transaktion
+    logger.info("Speichere Registrierungsdaten in Datenbank.")
+    async with AsyncDatabaseHandler() as db:
+        result, _ = await db.try_register(firstname, lastname, email, school, minecraft_username,
+                                          minecraft_uuid, max_permitted_users_per_mail, created_at,
+                                          link_for=link_for)
+
+        if result == RegistrationResult.USERNAME_TAKEN:
+            pending = await db.refresh_pending_registration(email, minecraft_username, created_at)
+            if pending:
+                return await resend_confirmation(db, config, pending, minecraft_username, email, firstname)
+
+    if result != RegistrationResult.OK:
+        return await reject_registration(result, email, minecraft_username, max_permitted_users_per_mail)
+
+    mail_queue.confirmation_queued(email)
+
+    logger.info("Registrierung erfolgreich abgeschlossen.")
+    metrics_handler.REGISTRATIONS.inc()
+    return redirect(url_for('success'))
+
+
+# Zwischenseite anzeigen
+@app.route('/confirm_page/<token>', methods=['GET'])
+async def confirm_page(token):
+    config = get_config()
+    try:
+        data = tokens.loads(token, token_max_age(config))
+        return await render_template('confirm_page.html', email=data['email'], token=token)
+    except SignatureExpired:
+        logger.info("Bestätigungslink abgelaufen (Zwischenseite).")
+        return await render_template('error.html', errors=['Bestätigungslink ist abgelaufen.'])
+    except BadSignature:
+        logger.info("Ungültiger Bestätigungslink (Zwischenseite).")
+        return await render_template('error.html', errors=['Ungültiger Bestätigungslink.'])
+    except Exception as e:
+        logger.info(f"Fehler beim Laden der Zwischenseite: {e}")
+        return await render_template('error.html', errors=['Fehler beim Laden der Bestätigungsseite.'])
+
+
+# Bestätigung per Button-Klick (POST)
+@app.route('/confirm', methods=['POST'])
+@rate_limit_handler.shed_load
+async def confirm_email():
+    await rate_limit_handler.enforce_async(('confirm_ip', rate_limit_handler.request_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))))
+    token = (await request.form).get('token')
+    config = get_config()
+    try:
+        logger.info("Versuche Bestätigungsemail zu verarbeiten.")
+        data = tokens.loads(token, token_max_age(config))
+        if 'rid' not in data:
+            return await confirm_legacy_token(data['email'])
+
+        # Bestätigen und Whitelist-Eintrag in einer Transaktion, per Primärschlüssel
+        minecraft_username, uuid = data['username'], data['uuid']
+        if not uuid:
+            uuid = await mojang_handler.get_uuid_async(minecraft_username)
+            if not uuid:
+                logger.error(f"Keine UUID für {minecraft_username} gefunden – Spieler NICHT eingetragen!")
+                return redirect(url_for('registration_completed'))
+
+        async with AsyncDatabaseHandler() as db:
+            confirmed = await db.confirm_and_whitelist(data['rid'], minecraft_username, uuid)
+        if not confirmed:
+            logger.info(f"Registrierung #{data['rid']} nicht (mehr) vorhanden.")
+            return await render_template('error.html', errors=[f"Die Registrierung für {data['email']} konnte nicht gefunden werden."])
+
+        logger.info(f"Bestätigung erfolgreich abgeschlossen und Spieler {minecraft_username} in mysql_whitelist eingetragen.")
+        metrics_handler.CONFIRMATIONS.inc()
+        return redirect(url_for('registration_completed'))
+
+    except SignatureExpired:
+        logger.info("Bestätigungslink abgelaufen.")
+        return await render_template('error.html', errors=['Bestätigungslink ist abgelaufen.'])
+    except BadSignature:
+        logger.info("Ungültiger Bestätigungslink.")
+        return await render_template('error.html', errors=['Ungültiger Bestätigungslink.'])
+    except Exception as e:
+        logger.info(f"Fehler beim Bestätigen: {e}")
+        return await render_template('error.html', errors=['Fehler beim Bestätigen der Registrierung.'])
+
+
+# Links aus Mails von vor der Umstellung (Token enthält nur die E-Mail)
+async def confirm_legacy_token(email):
+    async with AsyncDatabaseHandler() as db:
+        await db.confirm_registration(email)
+        profile = await db.get_latest_registration_profile(email)
+
+        if not profile:
+            logger.info("Kein Benutzername in der DB gefunden.")
+            return await render_template('error.html', errors=[f'Der Minecraft-Benutzername für {email} konnte nicht gefunden werden.'])
+
+        minecraft_username, uuid = profile
+        if not uuid:
+            # Registrierungen von vor der UUID-Spalte
+            uuid = await mojang_handler.get_uuid_async(minecraft_username)
+        if uuid:
+            await db.insert_into_whitelist(uuid, minecraft_username)
+            logger.info("Bestätigung erfolgreich abgeschlossen und Spieler in mysql_whitelist eingetragen.")
+            metrics_handler.CONFIRMATIONS.inc()
+        else:
+            logger.error(f"Keine UUID für {minecraft_username} gefunden – Spieler NICHT eingetragen!")
+
+    return redirect(url_for('registration_completed'))
+
+
+def admin_denied(config):
+    if not admin_handler.is_enabled(config):
+        return Response('Not Found', 404)
+    if not admin_handler.is_authorized(request.headers.get('Authorization'), config):
+        logger.warning(f"Admin-Zugriff ohne gültiges Token auf {request.path} von {request.remote_addr}.")
+        return Response('Nicht autorisiert.', 401, {'WWW-Authenticate': 'Bearer realm="admin"'})
+    return None
+
+
+@app.route('/admin/export')
+async def admin_export():
+    config = get_config()
+    denied = admin_denied(config)
+    if denied:
+        return denied
+    try:
+        fmt = admin_handler.export_format(request.args)
+        query, params = admin_handler.build_export_query(request.args)
+    except admin_handler.ExportFilterError as e:
+        return Response(str(e), 400)
+
+    logger.info(f"Admin-Export ({fmt}) gestartet, Filter: {params}.")
+
+    async def generate():
+        yield admin_handler.export_header(fmt)
+        async with AsyncDatabaseHandler() as db:
+            async for rows in db.stream_rows(query, params, admin_handler.export_batch_size(config)):
+                yield admin_handler.format_rows(rows, fmt)
+
+    return Response(
+        generate(),
+        content_type=admin_handler.EXPORT_CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{admin_handler.export_filename(fmt)}"'}
+    )
+
+
+@app.route('/admin/stats')
+async def admin_stats():
+    config = get_config()
+    denied = admin_denied(config)
+    if denied:
+        return denied
+    stats = admin_handler.stats_cache.get()
+    if stats is None:
+        async with AsyncDatabaseHandler() as db:
+            stats = admin_handler.build_stats(*await db.get_registration_stats())
+        admin_handler.stats_cache.put(stats, admin_handler.stats_cache_ttl(config))
+    return jsonify(stats)
+
+
+@app.route('/metrics')
+async def metrics():
+    data, content_type = metrics_handler.render_metrics()
+    return Response(data, content_type=content_type)
+
+
+def _prepare_database(config):
+    with DatabaseHandler(config) as db_handler:
+        db_handler.create_table()
+        run_migrations(db_handler)
+
+
+# Start/Stopp pro Worker-Prozess (Pool, HTTP-Client und SMTP-Session gehören zur Event-Loop)
+@app.before_serving
+async def startup():
+    logger.info("Initialisiere App im ASGI-Modus (DB-Pool + Cleaner + Mail-Sender).")
+    config = get_config()
+    configure_logging(config)
+    if config.get('db_backend', 'mysql') != 'mysql':
+        raise RuntimeError('Der ASGI-Modus unterstützt nur "db_backend": "mysql".')
+    install_reload_signal()
+    mojang_handler.configure(config)
+    mail_handler.configure(config)
+    rate_limit_handler.configure(config)
+    await asyncio.to_thread(_prepare_database, config)
+    await init_pool(config)
+
+    if page_cache.is_enabled(config):
+        async with app.test_request_context('/'):
+            for template in page_cache.STATIC_PAGES:
+                pages.put(template, await render_template(template, config=config), config)
+
+    cleaner_handler.start_cleaner()
+    app.config['MAIL_SENDER_TASK'] = asyncio.create_task(mail_queue.run_sender_async(config))
+
+
+@app.after_serving
+async def shutdown():
+    task = app.config.pop('MAIL_SENDER_TASK', None)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await mail_handler.get_async_smtp_sender().close()
+    await mojang_handler.close_async_client()
+    await close_pool()
+    logger.info("ASGI-App beendet.")
+
+
+# Nur im DEV-Modus direkt starten
+if __name__ == '__main__':
+    logger.info("Starte Webserver (ASGI) im DEV-Modus.")
+    app.run(host="127.0.0.1", port=5000, debug=get_config()['debug'])
@@ -0,0 +1,90 @@
+# Prometheus-Metriken: Latenz pro Stufe (MySQL, Mojang, SMTP, IMAP) und fachliche Zähler.
+# Unter Gunicorn muss PROMETHEUS_MULTIPROC_DIR gesetzt sein (siehe Dockerfile und
+# gunicorn.conf.py), dann werden die Werte aller Worker zusammengefasst.
+import functools
+import inspect
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+# Buckets in Sekunden: von schnellen DB-Abfragen bis zu langsamen SMTP-Logins
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_DURATION = Histogram(
+    'ksr_stage_duration_seconds', 'Dauer einzelner Arbeitsschritte',
+    ['stage', 'operation'], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    'ksr_stage_errors_total', 'Fehlgeschlagene Arbeitsschritte', ['stage', 'operation']
+)
+
+REGISTRATIONS = Counter('ksr_registrations_total', 'Erfolgreiche Registrierungen')
+REJECTIONS = Counter('ksr_registration_rejections_total', 'Abgelehnte Registrierungen', ['reason'])
+RESENDS = Counter(
+    'ksr_registration_resends_total', 'Wiederholte Registrierungen (Link erneut gesendet oder Cooldown)', ['result']
+)
+CONFIRMATIONS = Counter('ksr_confirmations_total', 'Bestätigte Registrierungen')
+CLEANER_DELETED = Counter('ksr_cleaner_deleted_total', 'Vom Cleaner gelöschte unbestätigte Registrierungen')
+RATE_LIMITED = Counter('ksr_rate_limited_total', 'Durch Rate-Limit oder Lastabwurf abgelehnte Anfragen', ['scope'])
+
+
+def record_stage(stage: str, operation: str, seconds: float, failed: bool = False):
+    STAGE_DURATION.labels(stage, operation).observe(seconds)
+    if failed:
+        STAGE_ERRORS.labels(stage, operation).inc()
+
+
+class measure:
+    """
+    Context-Manager: misst die Dauer des Blocks als Stufe 'stage'/'operation'.
+    Eine Exception im Block zählt als Fehler.
+    """
+
+    def __init__(self, stage: str, operation: str):
+        self.stage = stage
+        self.operation = operation
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        record_stage(self.stage, self.operation, time.perf_counter() - self.started, failed=exc_type is not None)
+        return False
+
+
+def timed(stage: str):
+    """
+    Decorator: misst jeden Aufruf der Funktion (operation = Funktionsname).
+    Funktioniert auch für async-Funktionen.
+    """
+    def decorator(func):
+        operation = func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with measure(stage, operation):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(stage, operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    """
+    Liefert (Body, Content-Type) für /metrics.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
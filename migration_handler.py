@@ -0,0 +1,291 @@
+# Versionierte Schema-Migrationen für die Registrierungs-Datenbank
+import mysql.connector
+from log_handler import *
+
+MIGRATION_LOCK_NAME = 'ksr_registration_schema_migration'
+
+
+class MigrationError(RuntimeError):
+    """
+    Eine Migration kann ohne Eingriff von Hand nicht angewendet werden.
+    """
+
+
+def _index_exists(cursor, table, index_name) -> bool:
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+        """,
+        (table, index_name)
+    )
+    return cursor.fetchone() is not None
+
+
+def _create_index(cursor, table, index_name, statement):
+    if _index_exists(cursor, table, index_name):
+        logger.info(f"Index {index_name} existiert bereits.")
+        return
+    logger.info(f"Erstelle Index {index_name} auf {table}.")
+    cursor.execute(statement)
+
+
+def _remove_duplicate_usernames(cursor):
+    """
+    Vor dem UNIQUE-Index auf minecraft_username: unbestätigte Dubletten werden gelöscht
+    (die bestätigte bzw. neueste Zeile bleibt), jede gelöschte Zeile wird protokolliert.
+    Mehrfach bestätigte Namen muss ein Admin klären, dann bricht die Migration ab.
+    """
+    cursor.execute(
+        """
+        SELECT minecraft_username, GROUP_CONCAT(id ORDER BY id) FROM registrations
+        WHERE confirmed = 1
+        GROUP BY minecraft_username HAVING COUNT(*) > 1
+        """
+    )
+    confirmed_duplicates = cursor.fetchall()
+    if confirmed_duplicates:
+        for username, ids in confirmed_duplicates:
+            logger.error(f"Benutzername {username} ist mehrfach bestätigt (registrations.id {ids}).")
+        raise MigrationError(
+            f"{len(confirmed_duplicates)} Minecraft-Benutzernamen sind mehrfach bestätigt, der UNIQUE-Index "
+            "ux_registrations_minecraft_username kann nicht angelegt werden. Bitte pro Name alle bis auf "
+            "eine Zeile löschen (ids siehe fehler.log) und die App neu starten."
+        )
+
+    cursor.execute(
+        """
+        SELECT DISTINCT r1.id, r1.minecraft_username, r1.email, r1.created_at FROM registrations r1
+        JOIN registrations r2
+          ON r1.minecraft_username = r2.minecraft_username AND r1.id <> r2.id
+        WHERE r1.confirmed = 0 AND (r2.confirmed = 1 OR r2.id > r1.id)
+        ORDER BY r1.id
+        """
+    )
+    duplicates = cursor.fetchall()
+    for registration_id, username, email, created_at in duplicates:
+        logger.warning(
+            f"Lösche unbestätigte Dublette id={registration_id}: {username} ({email}), registriert {created_at}."
+        )
+    if duplicates:
+        ids = [row[0] for row in duplicates]
+        cursor.execute(f"DELETE FROM registrations WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        logger.info(f"{cursor.rowcount} unbestätigte Dubletten von Minecraft-Benutzernamen entfernt.")
+
+
+def _migration_001_registrations_indexes(cursor):
+    """
+    Indizes für die häufigen Abfragen:
+      - E-Mail-Zähler pro Adresse
+      - Benutzername eindeutig (ersetzt den Vollscan in is_username_exists)
+      - Cleaner: confirmed = 0 AND created_at < ...
+    """
+    _create_index(
+        cursor, 'registrations', 'idx_registrations_email',
+        "CREATE INDEX idx_registrations_email ON registrations (email)"
+    )
+
+    if not _index_exists(cursor, 'registrations', 'ux_registrations_minecraft_username'):
+        _remove_duplicate_usernames(cursor)
+
+    _create_index(
+        cursor, 'registrations', 'ux_registrations_minecraft_username',
+        "CREATE UNIQUE INDEX ux_registrations_minecraft_username ON registrations (minecraft_username)"
+    )
+    _create_index(
+        cursor, 'registrations', 'idx_registrations_confirmed_created_at',
+        "CREATE INDEX idx_registrations_confirmed_created_at ON registrations (confirmed, created_at)"
+    )
+
+
+def _column_exists(cursor, table, column_name) -> bool:
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+        """,
+        (table, column_name)
+    )
+    return cursor.fetchone() is not None
+
+
+def _migration_002_mojang_profiles(cursor):
+    """
+    UUID wird bei der Registrierung gespeichert (keine zweite Mojang-Abfrage beim Bestätigen)
+    und gemeinsamer Profil-Cache für alle Worker.
+    """
+    if not _column_exists(cursor, 'registrations', 'minecraft_uuid'):
+        cursor.execute("ALTER TABLE registrations ADD COLUMN minecraft_uuid VARCHAR(36) NULL AFTER minecraft_username")
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mojang_profile_cache (
+            username VARCHAR(32) PRIMARY KEY,
+            uuid VARCHAR(36) NULL,
+            expires_at DATETIME NOT NULL,
+            INDEX idx_mojang_profile_cache_expires_at (expires_at)
+        )
+        """
+    )
+
+
+def _migration_003_mail_queue(cursor):
+    """
+    Ausgehende Mails werden in mail_queue gespeichert und vom Sender-Thread verschickt.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mail_queue (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            recipient VARCHAR(255) NOT NULL,
+            firstname VARCHAR(255),
+            confirmation_link TEXT NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL,
+            last_error TEXT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME NULL,
+            INDEX idx_mail_queue_status_next_attempt (status, next_attempt_at)
+        )
+        """
+    )
+
+
+def _migration_004_rate_limit_buckets(cursor):
+    """
+    Token-Buckets für rate_limit_store = "mysql" (gemeinsam für alle Worker).
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            bucket_key VARCHAR(320) PRIMARY KEY,
+            tokens DOUBLE NOT NULL,
+            updated_at DOUBLE NOT NULL,
+            INDEX idx_rate_limit_buckets_updated_at (updated_at)
+        )
+        """
+    )
+
+
+def _migration_005_mail_queue_recipient_index(cursor):
+    """
+    Für die Cooldown-Prüfung beim erneuten Versand (letzte Mail pro Empfänger).
+    """
+    _create_index(
+        cursor, 'mail_queue', 'idx_mail_queue_recipient_created_at',
+        "CREATE INDEX idx_mail_queue_recipient_created_at ON mail_queue (recipient, created_at)"
+    )
+
+
+def _table_exists(cursor, table) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s LIMIT 1",
+        (table,)
+    )
+    return cursor.fetchone() is not None
+
+
+def _migration_006_whitelist_unique_uuid(cursor):
+    """
+    UNIQUE-Index auf mysql_whitelist.UUID gegen gleichzeitige Einträge derselben UUID.
+    Die Tabelle gehört dem Plugin: bestehende Dubletten werden nicht angefasst, dann bleibt
+    der Index weg (die Whitelist-Writes nehmen dann UPDATE und INSERT ... NOT EXISTS).
+    """
+    if not _table_exists(cursor, 'mysql_whitelist'):
+        logger.warning("Tabelle mysql_whitelist existiert nicht – UNIQUE-Index auf UUID übersprungen.")
+        return
+    if _index_exists(cursor, 'mysql_whitelist', 'ux_mysql_whitelist_uuid'):
+        return
+
+    cursor.execute("SELECT UUID FROM mysql_whitelist GROUP BY UUID HAVING COUNT(*) > 1 LIMIT 1")
+    if cursor.fetchone() is not None:
+        logger.warning("mysql_whitelist enthält doppelte UUIDs – UNIQUE-Index auf UUID übersprungen.")
+        return
+    _create_index(
+        cursor, 'mysql_whitelist', 'ux_mysql_whitelist_uuid',
+        "CREATE UNIQUE INDEX ux_mysql_whitelist_uuid ON mysql_whitelist (UUID)"
+    )
+
+
+def _migration_007_registrations_school_index(cursor):
+    """
+    Für /admin/stats (GROUP BY school, confirmed) und den nach Schule gefilterten Export.
+    """
+    _create_index(
+        cursor, 'registrations', 'idx_registrations_school_confirmed',
+        "CREATE INDEX idx_registrations_school_confirmed ON registrations (school, confirmed)"
+    )
+
+
+# (Version, Beschreibung, Funktion) – Reihenfolge nie ändern, nur anhängen!
+MIGRATIONS = [
+    (1, "Indizes für email, minecraft_username (unique) und (confirmed, created_at)", _migration_001_registrations_indexes),
+    (2, "Spalte minecraft_uuid und Tabelle mojang_profile_cache", _migration_002_mojang_profiles),
+    (3, "Tabelle mail_queue für den asynchronen Mailversand", _migration_003_mail_queue),
+    (4, "Tabelle rate_limit_buckets für gemeinsame Rate-Limits", _migration_004_rate_limit_buckets),
+    (5, "Index (recipient, created_at) auf mail_queue für den Versand-Cooldown", _migration_005_mail_queue_recipient_index),
+    (6, "UNIQUE-Index auf mysql_whitelist.UUID", _migration_006_whitelist_unique_uuid),
+    (7, "Index (school, confirmed) auf registrations für die Admin-Statistiken", _migration_007_registrations_school_index),
+]
+
+
+def get_schema_version(cursor) -> int:
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def run_migrations(db_handler):
+    """
+    Führt alle noch nicht angewendeten Migrationen aus und protokolliert die
+    Version in 'schema_version'. Ein MySQL-Lock verhindert, dass mehrere
+    Container gleichzeitig migrieren.
+    """
+    if db_handler.backend != 'mysql':
+        # SQLite: create_table() legt das aktuelle Schema samt Indizes direkt an
+        return
+    conn = db_handler.conn
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                description VARCHAR(255),
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATION_LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Migrations-Lock konnte nicht innerhalb von 60s geholt werden.")
+
+        try:
+            current = get_schema_version(cursor)
+            pending = [m for m in MIGRATIONS if m[0] > current]
+            if not pending:
+                logger.info(f"Datenbankschema ist aktuell (Version {current}).")
+                return current
+
+            for version, description, migrate in pending:
+                logger.info(f"Wende Migration {version} an: {description}")
+                try:
+                    migrate(cursor)
+                    cursor.execute(
+                        "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                    conn.commit()
+                except (mysql.connector.Error, MigrationError) as error:
+                    conn.rollback()
+                    logger.error(f"Migration {version} fehlgeschlagen: {error}")
+                    raise
+                current = version
+
+            logger.info(f"Datenbankschema auf Version {current} aktualisiert.")
+            return current
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+            cursor.fetchone()
@@ -0,0 +1,130 @@
+# Cache für Mojang-Profile (Username -> UUID) mit TTL, Negativ-Cache und LRU
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from log_handler import *
+
+# Marker für "nicht im Cache" (None bedeutet: Username existiert bei Mojang nicht)
+MISS = object()
+
+
+class ProfileCache:
+    """
+    LRU-Cache für Mojang-Profile.
+    - Treffer (UUID) und "nicht gefunden" (None) haben getrennte TTLs
+    - Maximal 'max_size' Einträge, älteste Zugriffe werden verdrängt
+    - Optional in MySQL (Tabelle mojang_profile_cache) persistiert,
+      damit alle Gunicorn-Worker denselben Cache sehen
+    """
+
+    def __init__(self, ttl=86400, negative_ttl=300, max_size=10000, db_config=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.db_config = db_config
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            ttl=int(config.get('mojang_cache_ttl', 86400)),
+            negative_ttl=int(config.get('mojang_cache_negative_ttl', 300)),
+            max_size=int(config.get('mojang_cache_size', 10000)),
+            db_config=config if config.get('mojang_cache_persist', False) else None
+        )
+
+    @staticmethod
+    def _key(username: str) -> str:
+        return (username or "").strip().lower()
+
+    def get(self, username: str):
+        """
+        Liefert die UUID, None (bekannt: existiert nicht) oder MISS.
+        """
+        key = self._key(username)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                uuid, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return uuid
+                del self._entries[key]
+
+        if self.db_config is not None:
+            uuid = self._load_from_db(key)
+            if uuid is not MISS:
+                with self._lock:
+                    self.hits += 1
+                return uuid
+
+        with self._lock:
+            self.misses += 1
+        return MISS
+
+    def put(self, username: str, uuid):
+        key = self._key(username)
+        expires_at = time.time() + (self.ttl if uuid else self.negative_ttl)
+        self._remember(key, uuid, expires_at)
+
+        if self.db_config is not None:
+            self._store_in_db(key, uuid, expires_at)
+
+    def put_many(self, profiles: dict):
+        """
+        Wie put(), aber für viele Einträge mit einem einzigen DB-Schreibvorgang.
+        """
+        now = time.time()
+        rows = []
+        for username, uuid in profiles.items():
+            key = self._key(username)
+            expires_at = now + (self.ttl if uuid else self.negative_ttl)
+            self._remember(key, uuid, expires_at)
+            rows.append((key, uuid, datetime.fromtimestamp(expires_at)))
+
+        if self.db_config is not None and rows:
+            from database_handler import DatabaseHandler
+            try:
+                with DatabaseHandler(self.db_config) as db:
+                    db.store_cached_profiles(rows)
+            except Exception as e:
+                logger.error(f"Mojang-Cache konnte nicht in die DB geschrieben werden: {e}")
+
+    def _remember(self, key, uuid, expires_at):
+        with self._lock:
+            self._entries[key] = (uuid, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _load_from_db(self, key):
+        from database_handler import DatabaseHandler
+        try:
+            with DatabaseHandler(self.db_config) as db:
+                row = db.get_cached_profile(key)
+        except Exception as e:
+            logger.error(f"Mojang-Cache konnte nicht aus der DB gelesen werden: {e}")
+            return MISS
+
+        if not row:
+            return MISS
+        uuid, expires_at = row
+        expires_ts = expires_at.timestamp()
+        if expires_ts <= time.time():
+            return MISS
+        self._remember(key, uuid, expires_ts)
+        return uuid
+
+    def _store_in_db(self, key, uuid, expires_at):
+        from database_handler import DatabaseHandler
+        try:
+            with DatabaseHandler(self.db_config) as db:
+                db.store_cached_profile(key, uuid, datetime.fromtimestamp(expires_at))
+        except Exception as e:
+            logger.error(f"Mojang-Cache konnte nicht in die DB geschrieben werden: {e}")
@@ -1,34 +1,458 @@
+import asyncio
+import os
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from log_handler import logger
+from metrics_handler import record_stage
+from mojang_cache import ProfileCache, MISS
+
+MOJANG_API_BASE = "https://api.mojang.com"
+
+# Bulk-Endpunkt von Mojang: maximal 10 Namen pro POST
+BULK_CHUNK_SIZE = 10
+BULK_MAX_WORKERS = 4
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class MojangUnavailableError(Exception):
+    """
+    Mojang-API nicht erreichbar, überlastet (429/5xx) oder Circuit Breaker offen.
+    """
+
+
+class _MojangRetry(Retry):
+    """
+    Retry mit Backoff; Retry-After von 429-Antworten wird beachtet, aber auf
+    'max_retry_after' Sekunden gekappt, damit kein Worker minutenlang schläft.
+    """
+    max_retry_after = 5.0
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class CircuitBreaker:
+    """
+    Nach 'failure_threshold' Fehlern in Folge wird der Circuit geöffnet und alle
+    Aufrufe schlagen sofort fehl. Nach 'reset_timeout' Sekunden (oder nach dem
+    Retry-After von Mojang) darf ein einzelner Testaufruf durch (half-open). Bleibt dessen
+    Ergebnis länger als 'reset_timeout' aus, wird ein neuer Testaufruf zugelassen.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now >= self._open_until:
+                self._set_state(self.HALF_OPEN)
+                self._probe_started = now
+                return True
+            if self.state == self.HALF_OPEN and (
+                self._probe_started is None or now - self._probe_started >= self.reset_timeout
+            ):
+                # Der letzte Testaufruf hat kein Ergebnis gemeldet (abgebrochen oder hängend)
+                self._probe_started = now
+                return True
+            return False
+
+    def release(self):
+        """
+        Für Aufrufe, die ohne Ergebnis enden (z.B. abgebrochen): gibt den Testaufruf im
+        Zustand half-open frei, damit der nächste Aufruf testen darf.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_started = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_started = None
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self, retry_after=None):
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold or retry_after:
+                self._open_until = time.monotonic() + max(self.reset_timeout, retry_after or 0)
+                if self.state != self.OPEN:
+                    self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        logger.warning(f"Mojang Circuit Breaker: {self.state} -> {state}")
+        self.state = state
+
+
+# Ohne configure() nur In-Memory-Cache und Standardwerte
+_profile_cache = ProfileCache()
+_breaker = CircuitBreaker()
+_timeouts = (2.0, 5.0)
+_pool_size = 10
+_retries = 2
+_backoff = 0.3
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_async_client = None
+_async_client_loop = None
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "errors": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+
+def configure(config: dict):
+    """
+    Initialisiert Profil-Cache und HTTP-Client aus config.json
+    (TTLs, Cache-Grösse, Persistenz, Timeouts, Retries, Circuit Breaker).
+    """
+    global _profile_cache, _breaker, _timeouts, _pool_size, _retries, _backoff, _session, MOJANG_API_BASE
+    _profile_cache = ProfileCache.from_config(config)
+    MOJANG_API_BASE = config.get("mojang_api_base", MOJANG_API_BASE).rstrip("/")
+
+    _timeouts = (float(config.get("mojang_connect_timeout", 2)), float(config.get("mojang_read_timeout", 5)))
+    _pool_size = int(config.get("mojang_pool_size", 10))
+    _retries = int(config.get("mojang_retries", 2))
+    _backoff = float(config.get("mojang_retry_backoff", 0.3))
+    _MojangRetry.max_retry_after = float(config.get("mojang_max_retry_after", 5))
+    _breaker = CircuitBreaker(
+        failure_threshold=int(config.get("mojang_breaker_failures", 5)),
+        reset_timeout=float(config.get("mojang_breaker_reset_timeout", 30))
+    )
+    with _session_lock:
+        _session = None
+
+    logger.info(
+        f"Mojang-Cache: TTL {_profile_cache.ttl}s, Negativ-TTL {_profile_cache.negative_ttl}s, "
+        f"max. {_profile_cache.max_size} Einträge, persistent: {_profile_cache.db_config is not None}"
+    )
+    logger.info(f"Mojang-Client: Timeouts {_timeouts}, Pool {_pool_size}, Retries {_retries}.")
+
+
+def _get_session() -> requests.Session:
+    """
+    Eine Keep-Alive-Session pro Prozess (nach dem Gunicorn-Fork neu aufbauen).
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            retry = _MojangRetry(
+                total=_retries,
+                backoff_factor=_backoff,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "POST"}),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def _record_call(elapsed: float, failed: bool):
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["errors"] += int(failed)
+        _stats["latency_total"] += elapsed
+        _stats["latency_max"] = max(_stats["latency_max"], elapsed)
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        calls = _stats["calls"] or 1
+        return {
+            "calls": _stats["calls"],
+            "errors": _stats["errors"],
+            "latency_avg_ms": _stats["latency_total"] / calls * 1000,
+            "latency_max_ms": _stats["latency_max"] * 1000,
+            "breaker_state": _breaker.state,
+        }
+
+
+def _record_network_error(method: str, url: str, operation: str, elapsed: float, error: Exception):
+    _record_call(elapsed, failed=True)
+    record_stage('mojang', operation, elapsed, failed=True)
+    _breaker.record_failure()
+    logger.error(f"Mojang {method} {url} fehlgeschlagen nach {elapsed * 1000:.0f} ms: {error}")
+
+
+def _record_response(method: str, url: str, operation: str, elapsed: float, status_code: int, headers):
+    """
+    Auswertung einer Mojang-Antwort (sync und async): Statistik, Metriken, Log, Circuit Breaker.
+    Wirft MojangUnavailableError bei 429/5xx.
+    """
+    failed = status_code == 429 or status_code >= 500
+    _record_call(elapsed, failed=failed)
+    record_stage('mojang', operation, elapsed, failed=failed)
+    logger.info(f"Mojang {method} {url} -> {status_code} in {elapsed * 1000:.0f} ms (Breaker: {_breaker.state})")
+
+    if failed:
+        retry_after = headers.get("Retry-After")
+        _breaker.record_failure(float(retry_after) if retry_after and retry_after.isdigit() else None)
+        raise MojangUnavailableError(f"Mojang-API antwortete mit {status_code}")
+
+    _breaker.record_success()
+
+
+def _request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    HTTP-Aufruf an Mojang über die gemeinsame Session (Timeouts, Retries, Circuit Breaker).
+    Wirft MojangUnavailableError bei Netzwerkfehlern, 429/5xx oder offenem Circuit.
+    """
+    if not _breaker.allow():
+        raise MojangUnavailableError("Mojang-API vorübergehend gesperrt (Circuit Breaker offen).")
+
+    operation = 'bulk_profiles' if method == 'POST' else 'profile'
+    started = time.monotonic()
+    response = None
+    try:
+        response = _get_session().request(method, url, timeout=_timeouts, **kwargs)
+    except requests.RequestException as e:
+        _record_network_error(method, url, operation, time.monotonic() - started, e)
+        raise MojangUnavailableError(str(e)) from e
+    finally:
+        if response is None:
+            # Unterbrochen, ohne Ergebnis für den Breaker: einen Testaufruf wieder freigeben
+            _breaker.release()
+
+    _record_response(method, url, operation, time.monotonic() - started, response.status_code, response.headers)
+    return response
 
-def is_official_username(username: str) -> bool:
-    logger.info(f"Prüfe, ob Benutzername {username} ein offizieller Mojang-Account ist.")
-    api_url = f'https://api.mojang.com/users/profiles/minecraft/{username}'
-    response = requests.get(api_url)
 
+def _get_async_client() -> "httpx.AsyncClient":
+    """
+    Ein Keep-Alive-Client pro Event-Loop (ASGI-Modus).
+    """
+    import httpx  # nur im ASGI-Modus nötig (requirements-async.txt)
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        connect_timeout, read_timeout = _timeouts
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=_pool_size, max_keepalive_connections=_pool_size)
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def _send_with_retries(method: str, url: str, **kwargs) -> "httpx.Response":
+    """
+    Wie der Retry-Adapter der Session: Backoff bei Netzwerkfehlern und 429/5xx,
+    Retry-After wird beachtet, aber auf max_retry_after gekappt.
+    """
+    import httpx
+    client = _get_async_client()
+    for attempt in range(_retries + 1):
+        delay = _backoff * 2 ** attempt
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if attempt == _retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == _retries:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = min(float(retry_after), _MojangRetry.max_retry_after)
+        await asyncio.sleep(delay)
+
+
+async def _request_async(method: str, url: str, **kwargs) -> "httpx.Response":
+    """
+    Async-Variante von _request() (httpx), gleicher Circuit Breaker und gleiche Statistik.
+    """
+    import httpx
+    if not _breaker.allow():
+        raise MojangUnavailableError("Mojang-API vorübergehend gesperrt (Circuit Breaker offen).")
+
+    operation = 'bulk_profiles' if method == 'POST' else 'profile'
+    started = time.monotonic()
+    response = None
+    try:
+        response = await _send_with_retries(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        _record_network_error(method, url, operation, time.monotonic() - started, e)
+        raise MojangUnavailableError(str(e)) from e
+    finally:
+        if response is None:
+            # Abgebrochen (CancelledError, z.B. Client weg): Testaufruf wieder freigeben
+            _breaker.release()
+
+    _record_response(method, url, operation, time.monotonic() - started, response.status_code, response.headers)
+    return response
+
+
+def _parse_profile_response(username: str, response):
+    """
+    Liefert (uuid | None, cachebar) für eine Antwort von /users/profiles/minecraft/<name>.
+    """
     if response.status_code == 200:
+        return response.json().get("id"), True
+    if response.status_code in (204, 404):
+        return None, True
+    logger.error(f"Fehler bei Mojang-API für {username}: {response.status_code}")
+    return None, False
+
+
+def lookup_uuid(username: str) -> str | None:
+    """
+    Liefert die UUID zu einem Minecraft-Username (oder None, falls es ihn nicht gibt).
+    Treffer und "nicht gefunden" werden gecacht, API-Fehler nicht.
+    Wirft MojangUnavailableError, wenn Mojang nicht erreichbar ist.
+    """
+    cached = _profile_cache.get(username)
+    if cached is not MISS:
+        logger.info(f"Mojang-Cache-Treffer für {username}: {cached}")
+        return cached
+
+    api_url = f"{MOJANG_API_BASE}/users/profiles/minecraft/{username}"
+    response = _request("GET", api_url)
+
+    uuid, cacheable = _parse_profile_response(username, response)
+    if cacheable:
+        _profile_cache.put(username, uuid)
+    return uuid
+
+
+async def _cache_call(func, *args):
+    # Der persistente Cache fragt MySQL synchron ab – dann in einem Thread
+    if _profile_cache.db_config is not None:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+async def lookup_uuid_async(username: str) -> str | None:
+    """
+    Async-Variante von lookup_uuid() für den ASGI-Modus.
+    """
+    cached = await _cache_call(_profile_cache.get, username)
+    if cached is not MISS:
+        logger.info(f"Mojang-Cache-Treffer für {username}: {cached}")
+        return cached
+
+    response = await _request_async("GET", f"{MOJANG_API_BASE}/users/profiles/minecraft/{username}")
+
+    uuid, cacheable = _parse_profile_response(username, response)
+    if cacheable:
+        await _cache_call(_profile_cache.put, username, uuid)
+    return uuid
+
+
+def is_official_username(username: str) -> bool:
+    logger.info(f"Prüfe, ob Benutzername {username} ein offizieller Mojang-Account ist.")
+    if lookup_uuid(username):
         logger.info(f"Benutzername {username} ist offiziell.")
         return True
-    elif response.status_code in (204, 404):
-        logger.info(f"Benutzername {username} ist nicht offiziell.")
-        return False
-    else:
-        logger.error(f"Fehler bei Mojang-API für {username}: {response.status_code}")
-        return False
-    
+    logger.info(f"Benutzername {username} ist nicht offiziell.")
+    return False
+
 
 def get_uuid(username: str) -> str | None:
     """
     Holt die UUID zu einem Minecraft-Username über die Mojang API.
     """
-    url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
-    response = requests.get(url)
+    uuid = lookup_uuid(username)
+    if uuid:
+        logger.info(f"UUID für {username} gefunden: {uuid}")
+    else:
+        logger.info(f"Keine UUID für {username} gefunden.")
+    return uuid
 
-    if response.status_code == 200:
-        data = response.json()
-        uuid = data.get("id")
+
+async def get_uuid_async(username: str) -> str | None:
+    uuid = await lookup_uuid_async(username)
+    if uuid:
         logger.info(f"UUID für {username} gefunden: {uuid}")
-        return uuid
     else:
         logger.info(f"Keine UUID für {username} gefunden.")
-        return None
\ No newline at end of file
+    return uuid
+
+
+def _resolve_chunk(names: list) -> dict:
+    """
+    Löst bis zu 10 Namen mit einem POST auf. Nicht gefundene Namen fehlen in der Antwort.
+    """
+    response = _request("POST", f"{MOJANG_API_BASE}/profiles/minecraft", json=names)
+    if response.status_code != 200:
+        raise RuntimeError(f"Mojang-Bulk-API antwortete mit {response.status_code}")
+
+    found = {profile["name"].lower(): profile["id"] for profile in response.json()}
+    return {name: found.get(name.lower()) for name in names}
+
+
+def resolve_many(usernames, max_workers: int = BULK_MAX_WORKERS) -> dict:
+    """
+    Löst viele Minecraft-Usernames auf einmal auf: { username: uuid | None }.
+    - Cache-Treffer werden direkt übernommen
+    - Rest in 10er-Blöcken, parallel mit höchstens 'max_workers' Anfragen
+    - Blöcke mit API-Fehler fehlen im Ergebnis (und werden nicht gecacht)
+    """
+    result = {}
+    pending = []
+    seen = set()
+    for name in usernames:
+        key = name.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+
+        cached = _profile_cache.get(name)
+        if cached is MISS:
+            pending.append(name)
+        else:
+            result[name] = cached
+
+    chunks = [pending[i:i + BULK_CHUNK_SIZE] for i in range(0, len(pending), BULK_CHUNK_SIZE)]
+    if not chunks:
+        return result
+
+    logger.info(f"Löse {len(pending)} Usernames in {len(chunks)} Bulk-Anfragen bei Mojang auf.")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        futures = [(chunk, executor.submit(_resolve_chunk, chunk)) for chunk in chunks]
+        for chunk, future in futures:
+            try:
+                resolved = future.result()
+            except Exception as e:
+                logger.error(f"Bulk-Auflösung für {chunk} fehlgeschlagen: {e}")
+                continue
+            _profile_cache.put_many(resolved)
+            result.update(resolved)
+
+    return result
@@ -0,0 +1,170 @@
+# HTTP-Caching für die Seiten ohne Request-Abhängigkeit und die Static-Assets.
+# Die Seiten hängen nur von der Konfiguration ab: sie werden einmal pro Konfigurationsversion
+# gerendert, vorab komprimiert (gzip, brotli falls installiert) und mit ETag/Last-Modified
+# ausgeliefert. Assets bekommen einen Fingerprint im Namen und werden "immutable" gecacht.
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from log_handler import *
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # optional (pip install brotli), sonst nur gzip
+
+# Seiten, die vorgerendert werden (alle ohne Formular- oder Query-Daten)
+STATIC_PAGES = ('index.html', 'registration.html', 'success.html', 'registration_completed.html')
+
+DEFAULT_PAGE_MAX_AGE = 60
+# Neuer Inhalt = neuer Dateiname, die alte URL darf also beliebig lange gecacht werden
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Kleinere Antworten lohnen die Komprimierung nicht
+MIN_COMPRESS_SIZE = 512
+_COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+class CachedResponse:
+    """
+    Fertiger Antwort-Body mit vorab komprimierten Varianten und Validatoren.
+    """
+
+    def __init__(self, body: bytes, content_type: str, last_modified: float, cache_control: str):
+        self.body = body
+        self.content_type = content_type
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.last_modified = int(last_modified)
+        self.cache_control = cache_control
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_SIZE and content_type.startswith(_COMPRESSIBLE_TYPES):
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=11)
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def _accepted_encodings(accept_encoding) -> set:
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '').lower() in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _not_modified(cached: CachedResponse, if_none_match, if_modified_since) -> bool:
+    if if_none_match:
+        # Vergleich ohne W/ und ohne Encoding-Suffix (die Varianten haben denselben Inhalt)
+        candidates = {tag.strip().removeprefix('W/').strip('"').split('-')[0] for tag in if_none_match.split(',')}
+        return '*' in candidates or cached.etag in candidates
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since).timestamp() >= cached.last_modified
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def respond(cached: CachedResponse, if_none_match=None, if_modified_since=None, accept_encoding=None):
+    """
+    (body, status, headers) für Flask und Quart: 304, wenn der Client die Version schon hat,
+    sonst die kleinste Variante, die er annimmt.
+    """
+    headers = {
+        'Cache-Control': cached.cache_control,
+        'Last-Modified': formatdate(cached.last_modified, usegmt=True),
+        'Vary': 'Accept-Encoding',
+    }
+    encoding = next(
+        (coding for coding in ('br', 'gzip') if coding in cached.variants and coding in _accepted_encodings(accept_encoding)),
+        None
+    )
+    headers['ETag'] = f'"{cached.etag}-{encoding}"' if encoding else f'"{cached.etag}"'
+
+    if _not_modified(cached, if_none_match, if_modified_since):
+        return b'', 304, headers
+
+    headers['Content-Type'] = cached.content_type
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        return cached.variants[encoding], 200, headers
+    return cached.body, 200, headers
+
+
+def is_enabled(config) -> bool:
+    # Im DEV-Modus werden Templates bei jeder Änderung neu geladen, dann nicht cachen
+    return not config.get('debug')
+
+
+class PageCache:
+    """
+    Gerenderte Seiten der aktuellen Konfigurationsversion; eine neue Version verwirft alle.
+    """
+
+    def __init__(self, templates_dir: str):
+        self.templates_dir = templates_dir
+        self._version = None
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, template: str, config):
+        with self._lock:
+            if self._version != getattr(config, 'version', None):
+                return None
+            return self._pages.get(template)
+
+    def put(self, template: str, html: str, config) -> CachedResponse:
+        try:
+            template_mtime = os.path.getmtime(os.path.join(self.templates_dir, template))
+        except OSError:
+            template_mtime = 0.0
+        cached = CachedResponse(
+            html.encode('utf-8'),
+            'text/html; charset=utf-8',
+            max(getattr(config, 'mtime', 0.0), template_mtime),
+            f"public, max-age={int(config.get('page_cache_max_age', DEFAULT_PAGE_MAX_AGE))}"
+        )
+        version = getattr(config, 'version', None)
+        with self._lock:
+            if self._version != version:
+                self._version = version
+                self._pages = {}
+            self._pages[template] = cached
+        return cached
+
+
+class StaticAssets:
+    """
+    Liest beim Start alle Dateien aus static/ ein: 'styles.css' ist danach unter
+    'styles.<hash>.css' erreichbar, fertig komprimiert.
+    """
+
+    def __init__(self, static_dir: str):
+        self._names = {}
+        self._assets = {}
+        for root, _, files in os.walk(static_dir):
+            for file in sorted(files):
+                path = os.path.join(root, file)
+                filename = os.path.relpath(path, static_dir).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+
+                stem, ext = os.path.splitext(filename)
+                name = f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                if content_type.startswith('text/'):
+                    content_type += '; charset=utf-8'
+                self._names[filename] = name
+                self._assets[name] = CachedResponse(body, content_type, os.path.getmtime(path), ASSET_CACHE_CONTROL)
+        logger.info(
+            f"{len(self._assets)} Static-Assets geladen (Komprimierung: {'brotli + gzip' if brotli else 'gzip'})."
+        )
+
+    def fingerprinted(self, filename: str):
+        return self._names.get(filename)
+
+    def get(self, name: str):
+        return self._assets.get(name)
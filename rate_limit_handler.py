@@ -0,0 +1,281 @@
+# Token-Bucket-Limits pro Client-IP, E-Mail und Minecraft-Benutzername sowie Lastabwurf.
+# Abgelehnte Anfragen bekommen sofort ein 429 (bzw. 503), noch bevor Mojang, SMTP oder
+# die Registrierungstabellen angesprochen werden.
+import asyncio
+import functools
+import inspect
+import math
+import threading
+import time
+from config_handler import get_config
+from log_handler import *
+from metrics_handler import RATE_LIMITED
+
+# capacity = erlaubter Burst, per_minute = Nachfüllrate, None = aus. Die IP-Limits sind
+# standardmässig aus: hinter dem NAT einer Schule teilen sich alle Schüler eine IP, ein
+# fester Wert würde eine ganze Schule drosseln. Wer sie einschaltet, bemisst sie nach der
+# Anzahl Schüler hinter der grössten Schul-IP (siehe README).
+DEFAULT_LIMITS = {
+    'register_ip': None,
+    'register_email': {'capacity': 5, 'per_minute': 1},
+    'register_username': {'capacity': 5, 'per_minute': 1},
+    'confirm_ip': None,
+}
+
+# Ab so vielen Schlüsseln räumt der In-Process-Store volle (= unbenutzte) Buckets weg
+MEMORY_STORE_MAX_KEYS = 50000
+
+# Wie oft (Sekunden) der MySQL-Store alte Buckets löscht
+MYSQL_PURGE_INTERVAL = 3600
+
+
+class RateLimitExceeded(Exception):
+    """
+    Anfrage abgelehnt: Limit erreicht (429) oder Server ausgelastet (503).
+    Die Apps machen daraus per errorhandler die Fehlerseite mit Retry-After.
+    """
+
+    def __init__(self, retry_after: int, status: int = 429):
+        super().__init__(f"Zu viele Anfragen, nächster Versuch in {retry_after}s.")
+        self.retry_after = retry_after
+        self.status = status
+
+    @property
+    def message(self) -> str:
+        if self.status == 503:
+            return 'Der Server ist gerade ausgelastet. Bitte versuche es in ein paar Sekunden erneut.'
+        return f'Zu viele Anfragen. Bitte versuche es in {self.retry_after} Sekunden erneut.'
+
+
+def take_token(tokens: float, updated_at: float, now: float, capacity: float, rate: float):
+    """
+    Füllt den Bucket seit 'updated_at' auf und entnimmt ein Token.
+    Liefert (neuer Stand, erlaubt, Sekunden bis zum nächsten Token).
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= 1:
+        return tokens - 1, True, 0.0
+    return tokens, False, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """
+    Buckets im Speicher des Prozesses (Standard). Jeder Worker zählt für sich.
+    """
+
+    def __init__(self, max_keys: int = MEMORY_STORE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, now: float):
+        with self._lock:
+            tokens, updated_at, _, _ = self._buckets.get(key, (capacity, now, capacity, rate))
+            tokens, allowed, retry_after = take_token(tokens, updated_at, now, capacity, rate)
+            self._buckets[key] = (tokens, now, capacity, rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now: float):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * bucket[3] < bucket[2]
+        }
+        if len(self._buckets) > self.max_keys:
+            # Immer noch zu viele aktive Buckets: die ältere Hälfte verwerfen
+            newest = sorted(self._buckets.items(), key=lambda item: item[1][1])[len(self._buckets) // 2:]
+            self._buckets = dict(newest)
+
+
+class MysqlBucketStore:
+    """
+    Buckets in der Tabelle rate_limit_buckets, gemeinsam für alle Worker und Container.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._last_purge = 0.0
+
+    def take(self, key: str, capacity: float, rate: float, now: float):
+        from database_handler import DatabaseHandler
+        with DatabaseHandler(self.config) as db:
+            if now - self._last_purge > MYSQL_PURGE_INTERVAL:
+                self._last_purge = now
+                db.delete_rate_limit_buckets_before(now - 86400)
+
+            result = {}
+
+            def update(tokens, updated_at):
+                tokens, result['allowed'], result['retry_after'] = take_token(tokens, updated_at, now, capacity, rate)
+                return tokens
+
+            db.update_rate_limit_bucket(key, capacity, now, update)
+        return result['allowed'], result['retry_after']
+
+
+class RateLimiter:
+    def __init__(self, store, limits: dict):
+        self.store = store
+        self.limits = limits
+        self.shared = isinstance(store, MysqlBucketStore)
+
+    @classmethod
+    def from_config(cls, config, memory_store: MemoryBucketStore = None):
+        limits = {}
+        configured = config.get('rate_limits', {}) or {}
+        for scope, default in DEFAULT_LIMITS.items():
+            limit = configured.get(scope, default)
+            if not limit or not limit.get('capacity') or not limit.get('per_minute'):
+                continue  # Limit deaktiviert
+            limits[scope] = (float(limit['capacity']), float(limit['per_minute']) / 60)
+
+        if config.get('rate_limit_store', 'memory') == 'mysql':
+            store = MysqlBucketStore(config)
+        else:
+            store = memory_store or MemoryBucketStore()
+        return cls(store, limits)
+
+    def check(self, *checks):
+        """
+        Prüft die Paare (scope, wert) der Reihe nach. Liefert None, wenn alle erlaubt sind,
+        sonst die Wartezeit in Sekunden bis zum nächsten Versuch.
+        """
+        now = time.time()
+        for scope, value in checks:
+            limit = self.limits.get(scope)
+            if limit is None or not value:
+                continue
+            capacity, rate = limit
+            key = f"{scope}:{value.strip().lower()}"
+            try:
+                allowed, retry_after = self.store.take(key, capacity, rate, now)
+            except Exception as e:
+                # Limiter-Fehler dürfen die Registrierung nicht blockieren
+                logger.error(f"Rate-Limit für {scope} konnte nicht geprüft werden: {e}")
+                continue
+            if not allowed:
+                logger.info(f"Rate-Limit {scope} für {value} erreicht (nächster Versuch in {retry_after:.0f}s).")
+                RATE_LIMITED.labels(scope).inc()
+                return max(1, math.ceil(retry_after))
+        return None
+
+
+class InflightLimiter:
+    """
+    Lastabwurf: höchstens 'limit' gleichzeitige Anfragen pro Prozess (0 = aus).
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self.limit and self.inflight >= self.limit:
+                return False
+            self.inflight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.inflight -= 1
+
+
+def client_ip(remote_addr: str, forwarded_for: str = None, proxy_count: int = 0) -> str:
+    """
+    Client-Adresse für die IP-Limits. Hinter 'proxy_count' vertrauenswürdigen Reverse-Proxys
+    wird der entsprechende Eintrag (von rechts) aus X-Forwarded-For genommen.
+    """
+    if proxy_count and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if len(hops) >= proxy_count:
+            return hops[-proxy_count]
+    return remote_addr or ''
+
+
+_memory_store = MemoryBucketStore()
+_limiter = None
+_limiter_config = None
+_inflight = InflightLimiter()
+
+
+def configure(config):
+    """
+    Übernimmt Limits und Store aus der Konfiguration (die In-Process-Buckets bleiben erhalten).
+    """
+    global _limiter, _limiter_config
+    _limiter = RateLimiter.from_config(config, memory_store=_memory_store)
+    _limiter_config = config
+    _inflight.limit = int(config.get('max_inflight_requests', 0))
+    logger.info(
+        f"Rate-Limits: {', '.join(sorted(_limiter.limits)) or 'keine'} "
+        f"({'MySQL' if _limiter.shared else 'im Prozess'}), max. gleichzeitige Anfragen: {_inflight.limit or 'unbegrenzt'}."
+    )
+
+
+def get_limiter() -> RateLimiter:
+    config = get_config()
+    if config is not _limiter_config:
+        configure(config)
+    return _limiter
+
+
+def request_ip(remote_addr: str, forwarded_for: str = None) -> str:
+    return client_ip(remote_addr, forwarded_for, int(get_config().get('rate_limit_proxy_count', 0)))
+
+
+def enforce(*checks):
+    """
+    Wirft RateLimitExceeded, wenn eines der Limits (scope, wert) erreicht ist.
+    """
+    retry_after = get_limiter().check(*checks)
+    if retry_after is not None:
+        raise RateLimitExceeded(retry_after)
+
+
+async def enforce_async(*checks):
+    """
+    Wie enforce(); der MySQL-Store läuft in einem Thread, damit die Event-Loop frei bleibt.
+    """
+    limiter = get_limiter()
+    if limiter.shared:
+        retry_after = await asyncio.to_thread(limiter.check, *checks)
+    else:
+        retry_after = limiter.check(*checks)
+    if retry_after is not None:
+        raise RateLimitExceeded(retry_after)
+
+
+def _enter():
+    get_limiter()
+    if not _inflight.try_enter():
+        logger.info(f"Lastabwurf: bereits {_inflight.inflight} Anfragen in Bearbeitung.")
+        RATE_LIMITED.labels('inflight').inc()
+        raise RateLimitExceeded(1, status=503)
+
+
+def shed_load(func):
+    """
+    Decorator für Routen: lehnt ab, solange 'max_inflight_requests' Anfragen laufen.
+    Funktioniert auch für async-Routen.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            _enter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _inflight.leave()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _enter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _inflight.leave()
+    return wrapper
@@ -0,0 +1,99 @@
+# Gemeinsame Logik der Registrierungs-Routen (main.py = WSGI, main_async.py = ASGI)
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itsdangerous import SignatureExpired, URLSafeTimedSerializer
+from log_handler import *
+
+# Formularfeld -> Fehlermeldung, falls leer
+REQUIRED_FORM_FIELDS = {
+    'firstname': 'Vorname ist erforderlich.',
+    'lastname': 'Nachname ist erforderlich.',
+    'email': 'E-Mail ist erforderlich.',
+    'school': 'Schule ist erforderlich.',
+    'minecraft_username': 'Minecraft-Benutzername ist erforderlich.',
+}
+
+TOKEN_SALT = 'email-confirm'
+
+# So viele geprüfte Tokens merkt sich jeder Prozess (Zwischenseite + /confirm)
+TOKEN_CACHE_SIZE = 1024
+
+
+# SECRET_KEY aus JSON-Datei laden
+def load_secret_key():
+    with open('secret_key.json', encoding="utf-8") as file:
+        data = json.load(file)
+        logger.info("Json-Secret-File erfolgreich geladen.")
+        return data['secret_key']
+
+
+class ConfirmationTokens:
+    """
+    Bestätigungs-Tokens mit Registrierungs-ID, UUID, Benutzername und E-Mail.
+    Alte Tokens (nur die E-Mail signiert) werden weiterhin gelesen und liefern nur 'email'.
+    Geprüfte Signaturen werden zwischengespeichert; das Alter wird trotzdem bei jedem
+    Aufruf gegen max_age geprüft.
+    """
+
+    def __init__(self, secret_key, cache_size: int = TOKEN_CACHE_SIZE):
+        self.serializer = URLSafeTimedSerializer(secret_key)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def dumps(self, registration_id: int, minecraft_uuid: str, minecraft_username: str, email: str) -> str:
+        payload = {'rid': registration_id, 'uuid': minecraft_uuid, 'username': minecraft_username, 'email': email}
+        return self.serializer.dumps(payload, salt=TOKEN_SALT)
+
+    def loads(self, token: str, max_age: int) -> dict:
+        """
+        Liefert die Token-Daten. Wirft SignatureExpired bzw. BadSignature wie itsdangerous.
+        """
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                self._cache.move_to_end(token)
+
+        if cached is None:
+            payload, signed_at = self.serializer.loads(token, salt=TOKEN_SALT, max_age=max_age, return_timestamp=True)
+            if isinstance(payload, str):
+                payload = {'email': payload}
+            cached = (payload, signed_at.timestamp())
+            with self._lock:
+                self._cache[token] = cached
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return payload
+
+        payload, signed_at = cached
+        if time.time() - signed_at > max_age:
+            raise SignatureExpired(
+                f"Signature age exceeds {max_age} seconds", payload=payload,
+                date_signed=datetime.fromtimestamp(signed_at, timezone.utc)
+            )
+        return payload
+
+
+def token_max_age(config) -> int:
+    return config['waiting_time_for_db_cleaner'] * 600
+
+
+def validate_registration_form(form):
+    """
+    Liefert (Werte, Fehlermeldungen) für das Registrierungsformular.
+    """
+    values = {field: form.get(field, '') for field in REQUIRED_FORM_FIELDS}
+    errors = [message for field, message in REQUIRED_FORM_FIELDS.items() if not values[field]]
+    return values, errors
+
+
+def email_not_allowed_message(config) -> str:
+    accepted_mail_endings = config.get('accepted_mail_endings', []) or []
+    return f"Die Registrierung ist nur für E-Mail-Adressen mit folgenden Endungen erlaubt: {', '.join(accepted_mail_endings)}"
+
+
+def confirmation_link(host_url: str, token: str) -> str:
+    return host_url + 'confirm_page/' + token
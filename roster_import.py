@@ -0,0 +1,178 @@
+# Vorregistrierung ganzer Klassen aus einer CSV-Klassenliste (Spalten wie im Formular:
+# firstname, lastname, email, school, minecraft_username). Die Liste wird blockweise gelesen,
+# die Benutzernamen gebündelt bei Mojang aufgelöst, die Registrierungen blockweise in einer
+# Transaktion eingefügt und die Bestätigungsmails in die Warteschlange gelegt (Versand durch den Mail-Sender).
+# Aufruf: python roster_import.py klasse.csv --base-url https://registrierung.example.com/
+import argparse
+import csv
+import sys
+import time
+from datetime import datetime
+import mojang_handler
+from config_handler import get_config, get_max_users_per_mail, is_email_allowed
+from database_handler import DatabaseHandler
+from log_handler import *
+from registration_handler import (
+    REQUIRED_FORM_FIELDS, ConfirmationTokens, confirmation_link, load_secret_key, validate_registration_form
+)
+
+DEFAULT_CHUNK_SIZE = 200
+
+
+def read_chunks(file, chunk_size: int, delimiter: str = None):
+    """
+    Liefert die Zeilen der CSV-Datei als Blöcke von (Zeilennummer, dict). Ohne 'delimiter'
+    wird das Trennzeichen (Komma, Semikolon, Tab) aus der Kopfzeile erraten.
+    """
+    if delimiter is None:
+        header = file.readline()
+        delimiter = max(',;\t', key=header.count)
+        file.seek(0)
+    reader = csv.DictReader(file, delimiter=delimiter)
+    missing = [field for field in REQUIRED_FORM_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Spalten fehlen in der Kopfzeile: {', '.join(missing)}")
+
+    chunk = []
+    for row in reader:
+        chunk.append((reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RosterImport:
+    """
+    Ein Importlauf: Zähler pro Ergebnis und optional eine CSV mit den abgelehnten Zeilen.
+    """
+
+    def __init__(self, config, base_url: str, tokens: ConfirmationTokens, dry_run: bool = False, rejects=None):
+        self.config = config
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.tokens = tokens
+        self.dry_run = dry_run
+        self.rejects = rejects
+        self.counts = {'rows': 0, 'imported': 0}
+        self._seen_usernames = set()
+
+    def _reject(self, line, row, reason):
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        logger.info(f"Zeile {line} übersprungen ({reason}): {row.get('minecraft_username', '')} / {row.get('email', '')}")
+        if self.rejects is not None:
+            self.rejects.writerow([line, reason, *(row.get(field, '') for field in REQUIRED_FORM_FIELDS)])
+
+    def _validate(self, chunk):
+        valid = []
+        for line, row in chunk:
+            values, errors = validate_registration_form(row)
+            if errors:
+                self._reject(line, row, 'invalid_form')
+            elif not is_email_allowed(values['email'], self.config):
+                self._reject(line, row, 'email_not_allowed')
+            elif values['minecraft_username'].lower() in self._seen_usernames:
+                self._reject(line, row, 'duplicate_in_file')
+            else:
+                self._seen_usernames.add(values['minecraft_username'].lower())
+                valid.append((line, values))
+        return valid
+
+    def process_chunk(self, db, chunk):
+        self.counts['rows'] += len(chunk)
+        valid = self._validate(chunk)
+        if not valid:
+            return
+
+        # Schon registrierte Namen gar nicht erst bei Mojang nachfragen
+        taken = db.get_registered_usernames([values['minecraft_username'] for _, values in valid])
+        pending = []
+        for line, values in valid:
+            if values['minecraft_username'].lower() in taken:
+                self._reject(line, values, 'username_taken')
+            else:
+                pending.append((line, values))
+
+        resolved = mojang_handler.resolve_many([values['minecraft_username'] for _, values in pending])
+        rows = []
+        for line, values in pending:
+            username = values['minecraft_username']
+            if username not in resolved:
+                self._reject(line, values, 'mojang_unavailable')
+            elif not resolved[username]:
+                self._reject(line, values, 'invalid_username')
+            else:
+                rows.append((line, values, resolved[username]))
+
+        if self.dry_run:
+            self.counts['imported'] += len(rows)
+            return
+
+        created_at = datetime.now().replace(microsecond=0)
+        inserted = db.import_registrations(
+            [(values['firstname'], values['lastname'], values['email'], values['school'], values['minecraft_username'],
+              uuid, get_max_users_per_mail(values['email'], self.config)) for _, values, uuid in rows],
+            created_at,
+            self._link_for
+        )
+
+        inserted_names = {username.lower() for _, username, _, _, _ in inserted}
+        skipped = [(line, values) for line, values, _ in rows if values['minecraft_username'].lower() not in inserted_names]
+        if skipped:
+            # Nicht eingefügt: Name inzwischen anderweitig registriert, sonst E-Mail-Limit erreicht
+            taken = db.get_registered_usernames([values['minecraft_username'] for _, values in skipped])
+            for line, values in skipped:
+                self._reject(line, values, 'username_taken' if values['minecraft_username'].lower() in taken else 'email_limit')
+        self.counts['imported'] += len(inserted)
+
+    def _link_for(self, registration_id, username, uuid, email):
+        return confirmation_link(self.base_url, self.tokens.dumps(registration_id, uuid, username, email))
+
+    def run(self, file, chunk_size: int = DEFAULT_CHUNK_SIZE, delimiter: str = None) -> dict:
+        started = time.monotonic()
+        with DatabaseHandler(self.config) as db:
+            for chunk in read_chunks(file, chunk_size, delimiter):
+                self.process_chunk(db, chunk)
+                elapsed = max(time.monotonic() - started, 1e-6)
+                logger.info(
+                    f"Import: {self.counts['rows']} Zeilen, {self.counts['imported']} registriert "
+                    f"({self.counts['rows'] / elapsed:.0f} Zeilen/s)."
+                )
+        self.counts['seconds'] = round(time.monotonic() - started, 1)
+        return self.counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Registriert ganze Klassen aus einer CSV-Klassenliste vor.")
+    parser.add_argument("roster", help="CSV mit den Spalten " + ", ".join(REQUIRED_FORM_FIELDS))
+    parser.add_argument("--base-url", required=True, help="öffentliche URL der Registrierung (für die Bestätigungslinks)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Zeilen pro Block")
+    parser.add_argument("--delimiter", help="Trennzeichen (Standard: aus der Kopfzeile erraten)")
+    parser.add_argument("--rejects", help="CSV, in die abgelehnte Zeilen mit Grund geschrieben werden")
+    parser.add_argument("--dry-run", action="store_true", help="nur prüfen und auflösen, nichts schreiben")
+    args = parser.parse_args(argv)
+
+    config = get_config()
+    mojang_handler.configure(config)
+    tokens = ConfirmationTokens(load_secret_key())
+
+    rejects_file = open(args.rejects, 'w', newline='', encoding='utf-8') if args.rejects else None
+    try:
+        rejects = None
+        if rejects_file is not None:
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(['line', 'reason', *REQUIRED_FORM_FIELDS])
+        with open(args.roster, newline='', encoding='utf-8-sig') as roster:
+            counts = RosterImport(config, args.base_url, tokens, dry_run=args.dry_run, rejects=rejects).run(
+                roster, chunk_size=args.chunk_size, delimiter=args.delimiter
+            )
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+
+    logger.info(f"Import{' (Probelauf)' if args.dry_run else ''} abgeschlossen: {counts}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
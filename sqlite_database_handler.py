@@ -0,0 +1,507 @@
+# Eingebettete SQLite-Datenbank statt MySQL ("db_backend": "sqlite" in config.json), z.B. für
+# kleine Installationen auf einem Server, lokale Tests und Lasttests ohne MySQL-Server.
+# Gleiche Methoden und Rückgabewerte wie der DatabaseHandler, WAL-Modus und dieselben Indizes.
+# Nur für die WSGI-App (main.py) und die CLIs; der ASGI-Modus braucht MySQL.
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from database_handler import (
+    MAIL_STATUS_STATS_QUERY, REGISTRATION_STATS_QUERY, WHITELISTED_REGISTRATIONS_QUERY, DatabaseHandler,
+    RegistrationResult
+)
+from log_handler import *
+from metrics_handler import timed
+
+DEFAULT_SQLITE_PATH = 'registration.db'
+
+# Datums-Spalten als 'YYYY-MM-DD HH:MM:SS' speichern und als datetime zurückgeben
+# (Abfragen vergleichen die Texte, das Format muss also überall gleich sein)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' '))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+# Entspricht dem MySQL-Schema nach allen Migrationen (die Namen der Indizes sind dieselben).
+# COLLATE NOCASE, weil MySQL E-Mail und Benutzername ohne Gross-/Kleinschreibung vergleicht.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS registrations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    firstname TEXT,
+    lastname TEXT,
+    email TEXT COLLATE NOCASE,
+    school TEXT,
+    minecraft_username TEXT COLLATE NOCASE,
+    minecraft_uuid TEXT,
+    confirmed INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_registrations_email ON registrations (email);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_registrations_minecraft_username ON registrations (minecraft_username);
+CREATE INDEX IF NOT EXISTS idx_registrations_confirmed_created_at ON registrations (confirmed, created_at);
+CREATE INDEX IF NOT EXISTS idx_registrations_school_confirmed ON registrations (school, confirmed);
+
+CREATE TABLE IF NOT EXISTS mojang_profile_cache (
+    username TEXT PRIMARY KEY COLLATE NOCASE,
+    uuid TEXT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mojang_profile_cache_expires_at ON mojang_profile_cache (expires_at);
+
+CREATE TABLE IF NOT EXISTS mail_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL COLLATE NOCASE,
+    firstname TEXT,
+    confirmation_link TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL,
+    last_error TEXT NULL,
+    created_at TIMESTAMP NOT NULL,
+    sent_at TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mail_queue_status_next_attempt ON mail_queue (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_mail_queue_recipient_created_at ON mail_queue (recipient, created_at);
+
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket_key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_updated_at ON rate_limit_buckets (updated_at);
+
+CREATE TABLE IF NOT EXISTS mysql_whitelist (
+    UUID TEXT NOT NULL,
+    user TEXT NOT NULL COLLATE NOCASE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mysql_whitelist_uuid ON mysql_whitelist (UUID);
+"""
+
+TRY_REGISTER_QUERY = """
+    INSERT INTO registrations (firstname, lastname, email, school, minecraft_username, minecraft_uuid,
+                               confirmed, created_at)
+    SELECT ?, ?, ?, ?, ?, ?, 0, ?
+    WHERE (SELECT COUNT(*) FROM registrations WHERE email = ?) < ?
+"""
+IMPORT_REGISTRATION_QUERY = TRY_REGISTER_QUERY + "    ON CONFLICT (minecraft_username) DO NOTHING\n"
+INSERT_WHITELIST_QUERY = """
+    INSERT INTO mysql_whitelist (UUID, user) VALUES (?, ?)
+    ON CONFLICT (UUID) DO UPDATE SET user = excluded.user
+"""
+STORE_CACHED_PROFILE_QUERY = """
+    INSERT INTO mojang_profile_cache (username, uuid, expires_at) VALUES (?, ?, ?)
+    ON CONFLICT (username) DO UPDATE SET uuid = excluded.uuid, expires_at = excluded.expires_at
+"""
+ENQUEUE_MAIL_QUERY = """
+    INSERT INTO mail_queue (recipient, firstname, confirmation_link, status, next_attempt_at, created_at)
+    VALUES (?, ?, ?, 'pending', ?, ?)
+"""
+ENQUEUE_MAIL_UNLESS_RECENT_QUERY = """
+    INSERT INTO mail_queue (recipient, firstname, confirmation_link, status, next_attempt_at, created_at)
+    SELECT ?, ?, ?, 'pending', ?, ?
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mail_queue
+        WHERE recipient = ? AND status <> 'failed' AND created_at > ?
+    )
+"""
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+def _placeholders(values) -> str:
+    return ", ".join(["?"] * len(values))
+
+
+# Eine Verbindung pro Thread und Prozess (sqlite3-Verbindungen dürfen weder Threads noch fork() überleben)
+_local = threading.local()
+
+
+def _connect(config):
+    path = config.get('db_sqlite_path', DEFAULT_SQLITE_PATH)
+    cached = getattr(_local, 'connection', None)
+    if cached is not None and cached[0] == (os.getpid(), path):
+        return cached[1]
+
+    conn = sqlite3.connect(
+        path, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        timeout=float(config.get('db_sqlite_busy_timeout', 5))
+    )
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    _local.connection = ((os.getpid(), path), conn)
+    logger.info(f"SQLite-Datenbank {path} geöffnet (WAL).")
+    return conn
+
+
+class SqliteDatabaseHandler(DatabaseHandler):
+    """
+    SQLite-Variante des DatabaseHandler. Wird von DatabaseHandler(config) automatisch
+    erzeugt, wenn "db_backend": "sqlite" gesetzt ist. Schreibende Transaktionen beginnen
+    mit BEGIN IMMEDIATE: SQLite lässt immer nur einen Schreiber zu, das ersetzt die
+    Zeilensperren (FOR UPDATE / SKIP LOCKED) der MySQL-Variante.
+    """
+
+    backend = 'sqlite'
+
+    def __enter__(self):
+        self.conn = _connect(self.config)
+        self.cursor = self.conn.cursor()
+        self._locks = {}
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if self.cursor:
+            self.cursor.close()
+        if self.conn is not None and self.conn.in_transaction:
+            self.conn.rollback()
+        for name in list(self._locks):
+            self.release_lock(name)
+        self.conn = None
+        self.cursor = None
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn.cursor()
+        except Exception:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+
+    @timed('sqlite')
+    def create_table(self):
+        """
+        Legt das komplette Schema an (die MySQL-Migrationen entfallen, siehe run_migrations).
+        """
+        logger.info("Erstelle SQLite-Tabellen, falls sie noch nicht existieren.")
+        self.conn.executescript(SCHEMA)
+
+    def acquire_lock(self, name, timeout=0) -> bool:
+        """
+        Ersatz für GET_LOCK: exklusiver Datei-Lock neben der Datenbank, gehalten bis
+        release_lock() oder bis der Prozess endet.
+        """
+        path = f"{self.config.get('db_sqlite_path', DEFAULT_SQLITE_PATH)}.{name}.lock"
+        lock_file = open(path, 'a')
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._locks[name] = lock_file
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    return False
+                time.sleep(0.05)
+
+    def release_lock(self, name):
+        lock_file = self._locks.pop(name, None)
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    @timed('sqlite')
+    def delete_unconfirmed_chunk(self, cutoff, chunk_size):
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                SELECT id, email, minecraft_username FROM registrations
+                WHERE confirmed = 0 AND created_at < ?
+                ORDER BY created_at
+                LIMIT ?
+                """,
+                (cutoff, chunk_size)
+            )
+            rows = cursor.fetchall()
+            if rows:
+                cursor.execute(f"DELETE FROM registrations WHERE id IN ({_placeholders(rows)})", [row[0] for row in rows])
+        return rows
+
+    @timed('sqlite')
+    def get_oldest_unconfirmed_created_at(self):
+        row = self.conn.execute(
+            'SELECT MIN(created_at) AS "created_at [TIMESTAMP]" FROM registrations WHERE confirmed = 0'
+        ).fetchone()
+        return row[0] if row else None
+
+    @timed('sqlite')
+    def get_user_count_by_email(self, email):
+        return self.conn.execute("SELECT COUNT(*) FROM registrations WHERE email = ?", (email,)).fetchone()[0]
+
+    @timed('sqlite')
+    def insert_registration(self, firstname, lastname, email, school, minecraft_username, confirmed, created_at):
+        self.conn.execute(
+            "INSERT INTO registrations (firstname, lastname, email, school, minecraft_username, confirmed, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (firstname, lastname, email, school, minecraft_username, confirmed, created_at)
+        )
+
+    @timed('sqlite')
+    def try_register(self, firstname, lastname, email, school, minecraft_username, minecraft_uuid,
+                     max_users_per_mail, created_at, link_for=None):
+        """
+        Wie DatabaseHandler.try_register(); Schreibtransaktionen sind in SQLite ohnehin
+        serialisiert, Deadlocks gibt es nicht.
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    TRY_REGISTER_QUERY,
+                    (firstname, lastname, email, school, minecraft_username, minecraft_uuid, created_at,
+                     email, max_users_per_mail)
+                )
+                inserted, registration_id = cursor.rowcount, cursor.lastrowid
+                if inserted and link_for is not None:
+                    now = _now()
+                    cursor.execute(ENQUEUE_MAIL_QUERY, (email, firstname, link_for(registration_id), now, now))
+        except sqlite3.IntegrityError:
+            return RegistrationResult.USERNAME_TAKEN, None
+        if inserted:
+            return RegistrationResult.OK, registration_id
+        return RegistrationResult.EMAIL_LIMIT, None
+
+    @timed('sqlite')
+    def get_registered_usernames(self, usernames) -> set:
+        if not usernames:
+            return set()
+        rows = self.conn.execute(
+            f"SELECT minecraft_username FROM registrations WHERE minecraft_username IN ({_placeholders(usernames)})",
+            list(usernames)
+        ).fetchall()
+        return {row[0].lower() for row in rows}
+
+    @timed('sqlite')
+    def import_registrations(self, rows, created_at, link_for):
+        if not rows:
+            return []
+        usernames = [row[4] for row in rows]
+        with self._transaction() as cursor:
+            cursor.executemany(IMPORT_REGISTRATION_QUERY, [
+                (firstname, lastname, email, school, username, uuid, created_at, email, max_users)
+                for firstname, lastname, email, school, username, uuid, max_users in rows
+            ])
+            cursor.execute(
+                f"""
+                SELECT id, minecraft_username, minecraft_uuid, email, firstname FROM registrations
+                WHERE minecraft_username IN ({_placeholders(usernames)}) AND created_at = ? AND confirmed = 0
+                """,
+                (*usernames, created_at)
+            )
+            # Eine gleichzeitige Formular-Registrierung desselben Namens gehört nicht dazu
+            requested = {(row[4].lower(), row[2]) for row in rows}
+            inserted = [row for row in cursor.fetchall() if (row[1].lower(), row[3]) in requested]
+            now = _now()
+            cursor.executemany(ENQUEUE_MAIL_QUERY, [
+                (email, firstname, link_for(registration_id, username, uuid, email), now, now)
+                for registration_id, username, uuid, email, firstname in inserted
+            ])
+        return inserted
+
+    @timed('sqlite')
+    def refresh_pending_registration(self, email, minecraft_username, created_at):
+        with self._transaction() as cursor:
+            cursor.execute(
+                "SELECT id, minecraft_uuid FROM registrations WHERE email = ? AND minecraft_username = ? AND confirmed = 0",
+                (email, minecraft_username)
+            )
+            row = cursor.fetchone()
+            if row:
+                cursor.execute("UPDATE registrations SET created_at = ? WHERE id = ?", (created_at, row[0]))
+        return row
+
+    @timed('sqlite')
+    def delete_registration(self, email):
+        self.conn.execute("DELETE FROM registrations WHERE email = ?", (email,))
+
+    @timed('sqlite')
+    def confirm_registration(self, email):
+        self.conn.execute("UPDATE registrations SET confirmed = 1 WHERE email = ?", (email,))
+
+    @timed('sqlite')
+    def confirm_and_whitelist(self, registration_id, minecraft_username, uuid) -> bool:
+        with self._transaction() as cursor:
+            cursor.execute(
+                "SELECT id FROM registrations WHERE id = ? AND minecraft_username = ?", (registration_id, minecraft_username)
+            )
+            if cursor.fetchone() is None:
+                return False
+            cursor.execute("UPDATE registrations SET confirmed = 1 WHERE id = ?", (registration_id,))
+            cursor.execute(INSERT_WHITELIST_QUERY, (uuid, minecraft_username))
+        return True
+
+    def get_latest_minecraft_username(self, email):
+        profile = self.get_latest_registration_profile(email)
+        return profile[0] if profile else None
+
+    @timed('sqlite')
+    def get_latest_registration_profile(self, email):
+        return self.conn.execute(
+            "SELECT minecraft_username, minecraft_uuid FROM registrations WHERE email = ? ORDER BY created_at DESC LIMIT 1",
+            (email,)
+        ).fetchone()
+
+    @timed('sqlite')
+    def is_username_exists(self, minecraft_username):
+        row = self.conn.execute("SELECT 1 FROM registrations WHERE minecraft_username = ? LIMIT 1", (minecraft_username,)).fetchone()
+        return row is not None
+
+    @timed('sqlite')
+    def get_cached_profile(self, username):
+        return self.conn.execute("SELECT uuid, expires_at FROM mojang_profile_cache WHERE username = ?", (username,)).fetchone()
+
+    @timed('sqlite')
+    def store_cached_profile(self, username, uuid, expires_at):
+        self.conn.execute(STORE_CACHED_PROFILE_QUERY, (username, uuid, expires_at))
+
+    @timed('sqlite')
+    def store_cached_profiles(self, rows):
+        with self._transaction() as cursor:
+            cursor.executemany(STORE_CACHED_PROFILE_QUERY, rows)
+
+    @timed('sqlite')
+    def enqueue_mail(self, recipient, firstname, confirmation_link):
+        now = _now()
+        return self.conn.execute(ENQUEUE_MAIL_QUERY, (recipient, firstname, confirmation_link, now, now)).lastrowid
+
+    @timed('sqlite')
+    def enqueue_mail_unless_recent(self, recipient, firstname, confirmation_link, cooldown_seconds):
+        now = _now()
+        cursor = self.conn.execute(
+            ENQUEUE_MAIL_UNLESS_RECENT_QUERY,
+            (recipient, firstname, confirmation_link, now, now, recipient, now - timedelta(seconds=cooldown_seconds))
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    @timed('sqlite')
+    def claim_mail_batch(self, batch_size, lease_seconds):
+        now = _now()
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                SELECT id, recipient, firstname, confirmation_link, attempts FROM mail_queue
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at
+                LIMIT ?
+                """,
+                (now, batch_size)
+            )
+            rows = cursor.fetchall()
+            if rows:
+                cursor.execute(
+                    f"""
+                    UPDATE mail_queue SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                    WHERE id IN ({_placeholders(rows)})
+                    """,
+                    (now + timedelta(seconds=lease_seconds), *[row[0] for row in rows])
+                )
+        return [(mail_id, recipient, firstname, link, attempts + 1) for mail_id, recipient, firstname, link, attempts in rows]
+
+    @timed('sqlite')
+    def mark_mail_sent(self, mail_id):
+        self.conn.execute(
+            "UPDATE mail_queue SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?", (_now(), mail_id)
+        )
+
+    @timed('sqlite')
+    def reschedule_mail(self, mail_id, delay_seconds, error, failed=False):
+        self.conn.execute(
+            "UPDATE mail_queue SET status = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            ('failed' if failed else 'pending', _now() + timedelta(seconds=delay_seconds), str(error)[:1000], mail_id)
+        )
+
+    @timed('sqlite')
+    def delete_sent_mails_before(self, days):
+        return self.conn.execute(
+            "DELETE FROM mail_queue WHERE status = 'sent' AND sent_at < ?", (_now() - timedelta(days=days),)
+        ).rowcount
+
+    @timed('sqlite')
+    def update_rate_limit_bucket(self, key, initial_tokens, now, update):
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT OR IGNORE INTO rate_limit_buckets (bucket_key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, initial_tokens, now)
+            )
+            cursor.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE bucket_key = ?", (key,))
+            tokens, updated_at = cursor.fetchone()
+            cursor.execute(
+                "UPDATE rate_limit_buckets SET tokens = ?, updated_at = ? WHERE bucket_key = ?",
+                (update(tokens, updated_at), now, key)
+            )
+
+    @timed('sqlite')
+    def delete_rate_limit_buckets_before(self, timestamp):
+        return self.conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (timestamp,)).rowcount
+
+    @timed('sqlite')
+    def insert_into_whitelist_many(self, rows) -> int:
+        if not rows:
+            return 0
+        with self._transaction() as cursor:
+            cursor.executemany(INSERT_WHITELIST_QUERY, rows)
+            return cursor.rowcount
+
+    @timed('sqlite')
+    def get_whitelist_entries(self, uuids, usernames):
+        conditions, params = [], []
+        if uuids:
+            conditions.append(f"UUID IN ({_placeholders(uuids)})")
+            params.extend(uuids)
+        if usernames:
+            conditions.append(f"user IN ({_placeholders(usernames)})")
+            params.extend(usernames)
+        if not conditions:
+            return []
+        return self.conn.execute(f"SELECT UUID, user FROM mysql_whitelist WHERE {' OR '.join(conditions)}", params).fetchall()
+
+    @timed('sqlite')
+    def delete_whitelist_entries(self, rows) -> int:
+        if not rows:
+            return 0
+        with self._transaction() as cursor:
+            cursor.executemany("DELETE FROM mysql_whitelist WHERE UUID = ? AND user = ?", rows)
+            return cursor.rowcount
+
+    @timed('sqlite')
+    def set_registration_uuids(self, rows):
+        if not rows:
+            return
+        with self._transaction() as cursor:
+            cursor.executemany("UPDATE registrations SET minecraft_uuid = ? WHERE minecraft_username = ?", rows)
+
+    def stream_rows(self, query, params, batch_size):
+        """
+        SQLite liefert die Zeilen ohnehin schrittweise; die Platzhalter der gemeinsamen
+        Abfragen (%s) werden übersetzt.
+        """
+        cursor = self.conn.execute(query.replace('%s', '?'), params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    @timed('sqlite')
+    def get_registration_stats(self):
+        school_rows = self.conn.execute(REGISTRATION_STATS_QUERY).fetchall()
+        mail_rows = self.conn.execute(MAIL_STATUS_STATS_QUERY).fetchall()
+        whitelisted = self.conn.execute(WHITELISTED_REGISTRATIONS_QUERY).fetchone()[0]
+        return school_rows, mail_rows, whitelisted
+
+    @timed('sqlite')
+    def insert_into_whitelist(self, uuid, username):
+        try:
+            self.conn.execute(INSERT_WHITELIST_QUERY, (uuid, username))
+            logger.info(f"Spieler {username} mit UUID {uuid} erfolgreich in mysql_whitelist eingetragen.")
+        except Exception as e:
+            logger.error(f"Fehler beim Eintragen in mysql_whitelist: {e}")
@@ -0,0 +1,93 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from admin_handler import (
+    EXPORT_COLUMNS, ExportFilterError, StatsCache, build_export_query, build_stats, export_format, is_authorized,
+    render_export
+)
+
+CONFIG = {'admin_token': 's3cret-token'}
+ROW = (7, 'Anna', '=HYPERLINK("x")', 'anna@sluz.ch', 'KSR', 'Steve', 'abc', 1, datetime(2026, 3, 1, 12, 30))
+
+
+def test_admin_token_is_required():
+    assert is_authorized('Bearer s3cret-token', CONFIG)
+    assert is_authorized('bearer  s3cret-token ', CONFIG)
+    assert not is_authorized('Bearer wrong', CONFIG)
+    assert not is_authorized('Basic s3cret-token', CONFIG)
+    assert not is_authorized(None, CONFIG)
+    # Ohne konfiguriertes Token gibt es keinen Zugang
+    assert not is_authorized('Bearer ', {'admin_token': ''})
+
+
+def test_export_query_filters():
+    query, params = build_export_query({'school': ' KSR ', 'confirmed': '0', 'from': '2026-03-01', 'to': '2026-03-31'})
+
+    assert query.startswith(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM registrations WHERE ")
+    assert "school = %s AND confirmed = %s AND created_at >= %s AND created_at < %s" in query
+    assert params == ['KSR', 0, datetime(2026, 3, 1), datetime(2026, 4, 1)]
+
+    query, params = build_export_query({})
+    assert "WHERE" not in query and params == []
+
+
+@pytest.mark.parametrize('args', [
+    {'confirmed': 'ja'}, {'from': '01.03.2026'}, {'from': '2026-04-01', 'to': '2026-03-01'}
+])
+def test_invalid_export_filters(args):
+    with pytest.raises(ExportFilterError):
+        build_export_query(args)
+
+
+def test_export_format():
+    assert export_format({}) == 'csv'
+    assert export_format({'format': 'JSONL'}) == 'jsonl'
+    with pytest.raises(ExportFilterError):
+        export_format({'format': 'xlsx'})
+
+
+def test_render_csv_streams_batches_and_escapes_formulas():
+    chunks = list(render_export(iter([[ROW], [ROW]]), 'csv'))
+    assert len(chunks) == 3
+
+    rows = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert rows[1][2] == '\'=HYPERLINK("x")'
+    assert rows[1][8] == '2026-03-01T12:30:00'
+    assert len(rows) == 3
+
+
+def test_render_jsonl():
+    lines = ''.join(render_export(iter([[ROW]]), 'jsonl')).splitlines()
+    assert json.loads(lines[0]) == {
+        'id': 7, 'firstname': 'Anna', 'lastname': '=HYPERLINK("x")', 'email': 'anna@sluz.ch', 'school': 'KSR',
+        'minecraft_username': 'Steve', 'minecraft_uuid': 'abc', 'confirmed': 1, 'created_at': '2026-03-01T12:30:00'
+    }
+
+
+def test_build_stats():
+    stats = build_stats(
+        [('KSR', 1, 10), ('KSR', 0, 2), ('KSB', 0, 3), (None, 1, 1)], [('sent', 12), ('failed', 1)], 9
+    )
+
+    assert stats['funnel'] == {'registered': 16, 'confirmed': 11, 'pending': 5, 'whitelisted': 9}
+    assert stats['schools'][0] == {'school': 'KSR', 'registered': 12, 'confirmed': 10, 'pending': 2}
+    assert [entry['school'] for entry in stats['schools']] == ['KSR', 'KSB', '']
+    assert stats['mail_queue'] == {'sent': 12, 'failed': 1}
+    assert build_stats([], [], None)['funnel']['whitelisted'] is None
+
+
+def test_stats_cache_expires():
+    cache = StatsCache()
+    assert cache.get() is None
+    cache.put({'a': 1}, ttl=60)
+    assert cache.get() == {'a': 1}
+    cache.put({'a': 2}, ttl=0)
+    assert cache.get() is None
@@ -0,0 +1,23 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+from cleaner_handler import next_pass_delay
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+def test_delay_runs_until_oldest_deadline():
+    assert next_pass_delay(NOW + timedelta(seconds=90), 600, now=NOW) == 90
+
+
+def test_delay_without_pending_rows_is_one_window():
+    # Jede später eingefügte Registrierung läuft frühestens nach einem Zeitfenster ab
+    assert next_pass_delay(None, 600, now=NOW) == 600
+    assert next_pass_delay(NOW + timedelta(hours=2), 600, now=NOW) == 600
+
+
+def test_delay_respects_min_wait_for_past_deadlines():
+    assert next_pass_delay(NOW - timedelta(seconds=30), 600, min_wait=1.0, now=NOW) == 1.0
+    assert next_pass_delay(NOW + timedelta(seconds=2), 600, min_wait=5.0, now=NOW) == 5.0
@@ -0,0 +1,51 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from config_handler import ConfigError, ConfigSnapshot, EmailPolicy, validate_config
+
+
+def make_policy(**cfg):
+    return EmailPolicy(cfg)
+
+
+def test_accepted_endings_match_like_endswith():
+    policy = make_policy(accepted_mail_endings=["sluz.ch", "@edu.example.com"])
+
+    assert policy.is_allowed("Anna@SLUZ.ch")
+    assert policy.is_allowed("anna@ksr.sluz.ch")
+    assert policy.is_allowed("bob@edu.example.com")
+    assert not policy.is_allowed("bob@example.com")
+    assert not policy.is_allowed("")
+
+
+def test_email_user_limits_override_and_whitelist():
+    policy = make_policy(
+        max_users_per_mail=3,
+        accepted_mail_endings=["sluz.ch"],
+        email_user_limits={"Teacher@Gmail.com": 30, "broken@sluz.ch": "viele"},
+    )
+
+    assert policy.is_allowed(" teacher@gmail.com ")
+    assert policy.max_users("TEACHER@gmail.com") == 30
+    assert policy.max_users("broken@sluz.ch") == 3
+    assert policy.max_users("someone@sluz.ch") == 3
+
+
+def test_snapshot_is_read_only_mapping():
+    snapshot = ConfigSnapshot({"accepted_mail_endings": ["sluz.ch"], "email_user_limits": {"a@b.ch": 2}})
+
+    assert snapshot["accepted_mail_endings"] == ("sluz.ch",)
+    assert snapshot.get("missing", 5) == 5
+    with pytest.raises(TypeError):
+        snapshot["email_user_limits"]["a@b.ch"] = 3
+    assert snapshot.email_policy.max_users("a@b.ch") == 2
+
+
+def test_validate_config_reports_missing_and_wrong_types():
+    with pytest.raises(ConfigError) as excinfo:
+        validate_config({"db_port": "3306"})
+
+    assert "'db_host' fehlt" in str(excinfo.value)
+    assert "'db_port' hat den falschen Typ" in str(excinfo.value)
@@ -0,0 +1,56 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import pytest
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from registration_handler import TOKEN_SALT, ConfirmationTokens
+
+
+def test_token_carries_registration_data():
+    tokens = ConfirmationTokens("secret")
+    token = tokens.dumps(42, "069a79f444e94726a5befca90e38aaf5", "Notch", "anna@sluz.ch")
+
+    assert tokens.loads(token, 600) == {
+        'rid': 42, 'uuid': "069a79f444e94726a5befca90e38aaf5", 'username': "Notch", 'email': "anna@sluz.ch"
+    }
+
+
+def test_legacy_email_token_still_accepted():
+    legacy = URLSafeTimedSerializer("secret").dumps("anna@sluz.ch", salt=TOKEN_SALT)
+
+    assert ConfirmationTokens("secret").loads(legacy, 600) == {'email': "anna@sluz.ch"}
+
+
+def test_signature_checked_once_then_cached(monkeypatch):
+    tokens = ConfirmationTokens("secret")
+    token = tokens.dumps(1, None, "Steve", "bob@sluz.ch")
+
+    calls = []
+    original = tokens.serializer.loads
+    monkeypatch.setattr(tokens.serializer, "loads", lambda *a, **kw: calls.append(1) or original(*a, **kw))
+
+    tokens.loads(token, 600)
+    tokens.loads(token, 600)
+    assert len(calls) == 1
+
+
+def test_cached_token_still_expires():
+    tokens = ConfirmationTokens("secret")
+    token = tokens.dumps(1, None, "Steve", "bob@sluz.ch")
+    tokens.loads(token, 600)
+
+    real_time = time.time
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(time, "time", lambda: real_time() + 601)
+        with pytest.raises(SignatureExpired):
+            tokens.loads(token, 600)
+
+
+def test_foreign_or_tampered_token_rejected():
+    token = ConfirmationTokens("other").dumps(1, None, "Steve", "bob@sluz.ch")
+
+    with pytest.raises(BadSignature):
+        ConfirmationTokens("secret").loads(token, 600)
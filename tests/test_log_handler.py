@@ -0,0 +1,48 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import logging
+from datetime import datetime, timedelta
+
+from log_handler import DailyFileHandler, JsonFormatter
+
+
+def make_record(message, created):
+    record = logging.LogRecord('my_logger', logging.INFO, __file__, 1, message, None, None)
+    record.created = created.timestamp()
+    return record
+
+
+def test_daily_file_handler_switches_file_at_midnight(tmp_path):
+    handler = DailyFileHandler(str(tmp_path))
+    today = datetime.now()
+    tomorrow = today + timedelta(days=1)
+
+    handler.handle(make_record("heute", today))
+    handler.handle(make_record("morgen", tomorrow))
+    handler.close()
+
+    assert (tmp_path / f"{today:%Y-%m-%d}_logfile.log").read_text(encoding="utf-8") == "heute\n"
+    assert (tmp_path / f"{tomorrow:%Y-%m-%d}_logfile.log").read_text(encoding="utf-8") == "morgen\n"
+
+
+def test_purge_keeps_recent_and_foreign_files(tmp_path):
+    old = datetime.now() - timedelta(days=40)
+    recent = datetime.now() - timedelta(days=2)
+    for name in (f"{old:%Y-%m-%d}_logfile.log", f"{recent:%Y-%m-%d}_logfile.log", "fehler.log"):
+        (tmp_path / name).write_text("x", encoding="utf-8")
+
+    handler = DailyFileHandler(str(tmp_path), retention_days=30)
+    handler.purge_old_files()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{recent:%Y-%m-%d}_logfile.log", "fehler.log"]
+
+
+def test_json_formatter_writes_one_object_per_line():
+    line = JsonFormatter().format(make_record("Registrierung \"ok\"", datetime.now()))
+
+    entry = json.loads(line)
+    assert "\n" not in line
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "Registrierung \"ok\""
@@ -0,0 +1,37 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from prometheus_client import REGISTRY
+
+import metrics_handler
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_timed_records_duration_and_errors():
+    @metrics_handler.timed('test')
+    def query(fail=False):
+        if fail:
+            raise RuntimeError("kaputt")
+        return 42
+
+    before = sample('ksr_stage_duration_seconds_count', stage='test', operation='query')
+
+    assert query() == 42
+    with pytest.raises(RuntimeError):
+        query(fail=True)
+
+    assert sample('ksr_stage_duration_seconds_count', stage='test', operation='query') == before + 2
+    assert sample('ksr_stage_errors_total', stage='test', operation='query') == 1
+
+
+def test_render_metrics_exposes_counters():
+    metrics_handler.REJECTIONS.labels('email_limit').inc()
+
+    body, content_type = metrics_handler.render_metrics()
+
+    assert content_type.startswith('text/plain')
+    assert b'ksr_registration_rejections_total{reason="email_limit"}' in body
@@ -0,0 +1,91 @@
+import sys, os, json, threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import mojang_handler
+from mojang_cache import ProfileCache
+
+
+KNOWN_PROFILES = {f"player{i}": f"{i:032x}" for i in range(25)}
+
+
+class FakeMojangHandler(BaseHTTPRequestHandler):
+    """
+    Lokaler Ersatz für den Mojang-Bulk-Endpunkt (POST /profiles/minecraft).
+    """
+    requests_seen = []
+
+    def do_POST(self):
+        names = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeMojangHandler.requests_seen.append(names)
+
+        if len(names) > 10 or "broken" in names:
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        profiles = [
+            {"id": KNOWN_PROFILES[name.lower()], "name": name.lower()}
+            for name in names if name.lower() in KNOWN_PROFILES
+        ]
+        body = json.dumps(profiles).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_mojang(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMojangHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    FakeMojangHandler.requests_seen = []
+    monkeypatch.setattr(mojang_handler, "MOJANG_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(mojang_handler, "_profile_cache", ProfileCache())
+    yield FakeMojangHandler
+    server.shutdown()
+
+
+def test_resolve_many_chunks_by_ten(fake_mojang):
+    names = list(KNOWN_PROFILES) + ["unknown_a", "unknown_b"]
+
+    result = mojang_handler.resolve_many(names)
+
+    assert len(fake_mojang.requests_seen) == 3
+    assert all(len(chunk) <= 10 for chunk in fake_mojang.requests_seen)
+    assert result["player7"] == KNOWN_PROFILES["player7"]
+    assert result["unknown_a"] is None
+    assert len(result) == len(names)
+
+
+def test_resolve_many_uses_cache_and_dedupes(fake_mojang):
+    mojang_handler.resolve_many(["player1", "player2"])
+    fake_mojang.requests_seen.clear()
+
+    result = mojang_handler.resolve_many(["PLAYER1", "player2", "player3", "Player3"])
+
+    assert fake_mojang.requests_seen == [["player3"]]
+    assert result == {
+        "PLAYER1": KNOWN_PROFILES["player1"],
+        "player2": KNOWN_PROFILES["player2"],
+        "player3": KNOWN_PROFILES["player3"],
+    }
+
+
+def test_resolve_many_skips_failed_chunks(fake_mojang):
+    names = ["broken"] + [f"player{i}" for i in range(9)] + ["player20"]
+
+    result = mojang_handler.resolve_many(names)
+
+    assert "broken" not in result
+    assert "player0" not in result
+    assert result["player20"] == KNOWN_PROFILES["player20"]
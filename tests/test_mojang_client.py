@@ -0,0 +1,120 @@
+import sys, os, json, threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import mojang_handler
+
+
+class FakeMojangHandler(BaseHTTPRequestHandler):
+    """
+    Liefert für 'steve' ein Profil, für 'ratelimited' immer 429 mit Retry-After.
+    """
+    calls = 0
+
+    def do_GET(self):
+        FakeMojangHandler.calls += 1
+        name = self.path.rsplit("/", 1)[-1]
+        if name == "ratelimited":
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        if name != "steve":
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = json.dumps({"id": "8667ba71b85a4004af54457a9734eed7", "name": "Steve"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_mojang(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMojangHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    FakeMojangHandler.calls = 0
+    mojang_handler.configure({
+        "mojang_api_base": f"http://127.0.0.1:{server.server_port}",
+        "mojang_retries": 1,
+        "mojang_retry_backoff": 0,
+        "mojang_breaker_failures": 2,
+        "mojang_breaker_reset_timeout": 60,
+    })
+    yield FakeMojangHandler
+    server.shutdown()
+    mojang_handler.configure({})
+
+
+def test_lookup_is_cached(fake_mojang):
+    assert mojang_handler.get_uuid("steve") == "8667ba71b85a4004af54457a9734eed7"
+    assert mojang_handler.get_uuid("Steve") == "8667ba71b85a4004af54457a9734eed7"
+    assert mojang_handler.is_official_username("nobody") is False
+    assert mojang_handler.is_official_username("nobody") is False
+    assert fake_mojang.calls == 2
+
+
+def test_rate_limit_opens_breaker(fake_mojang):
+    for _ in range(2):
+        with pytest.raises(mojang_handler.MojangUnavailableError):
+            mojang_handler.get_uuid("ratelimited")
+    calls = fake_mojang.calls
+
+    with pytest.raises(mojang_handler.MojangUnavailableError):
+        mojang_handler.get_uuid("steve")
+
+    assert fake_mojang.calls == calls
+    assert mojang_handler.get_stats()["breaker_state"] == mojang_handler.CircuitBreaker.OPEN
+
+
+def test_breaker_reprobes_when_half_open_probe_never_reports(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(mojang_handler.time, "monotonic", lambda: now[0])
+    breaker = mojang_handler.CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+
+    now[0] += 30
+    assert breaker.allow() is True
+    assert breaker.state == mojang_handler.CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is False
+
+    now[0] += 30
+    assert breaker.allow() is True
+
+    breaker.release()
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+
+def test_cancelled_async_probe_releases_half_open_breaker(monkeypatch):
+    import asyncio
+
+    breaker = mojang_handler.CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    monkeypatch.setattr(mojang_handler, "_breaker", breaker)
+
+    async def hanging_send(method, url, **kwargs):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(mojang_handler, "_send_with_retries", hanging_send)
+
+    async def run():
+        task = asyncio.create_task(mojang_handler._request_async("GET", "http://mojang.invalid/steve"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    breaker.reset_timeout = 3600.0
+    asyncio.run(run())
+    assert breaker.state == mojang_handler.CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is True
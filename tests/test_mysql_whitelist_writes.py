@@ -0,0 +1,99 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import database_handler
+from database_handler import DatabaseHandler
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.statements.append((' '.join(query.split()), params))
+
+    def fetchone(self):
+        return (1,) if self.conn.has_index else None
+
+
+class FakeConnection:
+    def __init__(self, has_index):
+        self.has_index = has_index
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def start_transaction(self):
+        self.statements.append(('START TRANSACTION', None))
+
+    def commit(self):
+        self.statements.append(('COMMIT', None))
+
+    def rollback(self):
+        self.statements.append(('ROLLBACK', None))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    def make(has_index):
+        monkeypatch.setattr(database_handler, '_whitelist_uuid_unique', None)
+        handler = DatabaseHandler({})
+        handler.conn = FakeConnection(has_index)
+        return handler
+    return make
+
+
+def test_rename_uses_upsert_with_unique_index(db):
+    handler = db(has_index=True)
+    handler.insert_into_whitelist('uuid-steve', 'Steve2')
+    handler.insert_into_whitelist('uuid-steve', 'Steve3')
+
+    writes = [s for s in handler.conn.statements if s[0].startswith('INSERT')]
+    assert writes == [
+        (' '.join(database_handler.UPSERT_WHITELIST_QUERY.split()), ('uuid-steve', 'Steve2')),
+        (' '.join(database_handler.UPSERT_WHITELIST_QUERY.split()), ('uuid-steve', 'Steve3')),
+    ]
+    # Der Index wird nur einmal nachgeschlagen
+    assert sum('information_schema' in s[0] for s in handler.conn.statements) == 1
+
+
+def test_rename_without_unique_index_updates_before_insert(db):
+    handler = db(has_index=False)
+    handler.insert_into_whitelist('uuid-steve', 'Steve2')
+
+    assert [s for s in handler.conn.statements if 'information_schema' not in s[0]] == [
+        (database_handler.RENAME_WHITELIST_QUERY, ('Steve2', 'uuid-steve')),
+        (' '.join(database_handler.INSERT_WHITELIST_QUERY.split()), ('uuid-steve', 'Steve2', 'uuid-steve')),
+        ('COMMIT', None),
+    ]
+
+
+def test_bulk_write_is_one_statement_with_unique_index(db):
+    handler = db(has_index=True)
+    handler.insert_into_whitelist_many([('uuid-steve', 'Steve'), ('uuid-alex', 'Alex')])
+
+    writes = [s for s in handler.conn.statements if s[0].startswith('INSERT')]
+    assert writes == [(
+        "INSERT INTO mysql_whitelist (UUID, user) VALUES (%s, %s), (%s, %s) ON DUPLICATE KEY UPDATE user = VALUES(user)",
+        ['uuid-steve', 'Steve', 'uuid-alex', 'Alex']
+    )]
+
+
+def test_bulk_write_falls_back_to_rows_without_unique_index(db):
+    handler = db(has_index=False)
+    handler.insert_into_whitelist_many([('uuid-steve', 'Steve'), ('uuid-alex', 'Alex')])
+
+    statements = [s[0] for s in handler.conn.statements if 'information_schema' not in s[0]]
+    assert statements[0] == 'START TRANSACTION' and statements[-1] == 'COMMIT'
+    assert sum(s.startswith('INSERT') for s in statements) == 2
+    assert sum(s.startswith('UPDATE') for s in statements) == 2
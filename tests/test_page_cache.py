@@ -0,0 +1,77 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gzip
+
+from page_cache import ASSET_CACHE_CONTROL, CachedResponse, PageCache, StaticAssets, respond
+
+HTML = ('<html>' + 'Registrierung ' * 100 + '</html>').encode()
+
+
+class FakeConfig(dict):
+    def __init__(self, version, **values):
+        super().__init__(values)
+        self.version = version
+        self.mtime = 1700000000.0
+
+
+def test_respond_picks_precompressed_variant():
+    cached = CachedResponse(HTML, 'text/html; charset=utf-8', 1700000000, 'public, max-age=60')
+
+    body, status, headers = respond(cached, accept_encoding='deflate, gzip;q=0.8')
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body) == HTML
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert headers['Last-Modified'] == 'Tue, 14 Nov 2023 22:13:20 GMT'
+
+    body, _, headers = respond(cached, accept_encoding='gzip;q=0')
+    assert body == HTML and 'Content-Encoding' not in headers
+
+
+def test_small_and_binary_bodies_are_not_compressed():
+    assert CachedResponse(b'<p>kurz</p>', 'text/html; charset=utf-8', 0, '').variants == {}
+    assert CachedResponse(HTML, 'image/png', 0, '').variants == {}
+
+
+def test_conditional_requests_get_304():
+    cached = CachedResponse(HTML, 'text/html; charset=utf-8', 1700000000, 'public, max-age=60')
+    _, _, headers = respond(cached, accept_encoding='gzip')
+
+    body, status, _ = respond(cached, if_none_match=headers['ETag'])
+    assert (body, status) == (b'', 304)
+    assert respond(cached, if_none_match='"anders"')[1] == 200
+    assert respond(cached, if_modified_since='Tue, 14 Nov 2023 22:13:20 GMT')[1] == 304
+    assert respond(cached, if_modified_since='Mon, 13 Nov 2023 00:00:00 GMT')[1] == 200
+    assert respond(cached, if_modified_since='kein Datum')[1] == 200
+
+
+def test_page_cache_is_dropped_for_new_config_version(tmp_path):
+    pages = PageCache(str(tmp_path))
+    config = FakeConfig(1, page_cache_max_age=120)
+
+    assert pages.get('index.html', config) is None
+    cached = pages.put('index.html', '<html>1</html>', config)
+    assert pages.get('index.html', config) is cached
+    assert cached.cache_control == 'public, max-age=120'
+
+    assert pages.get('index.html', FakeConfig(2)) is None
+    pages.put('success.html', '<html>2</html>', FakeConfig(2))
+    assert pages.get('index.html', FakeConfig(2)) is None
+
+
+def test_static_assets_are_fingerprinted(tmp_path):
+    (tmp_path / 'styles.css').write_text('body { color: red; }\n' * 50)
+    (tmp_path / 'img').mkdir()
+    (tmp_path / 'img' / 'logo.png').write_bytes(b'\x89PNG')
+
+    assets = StaticAssets(str(tmp_path))
+    name = assets.fingerprinted('styles.css')
+    assert name.startswith('styles.') and name.endswith('.css') and len(name) == len('styles.css') + 13
+    assert assets.fingerprinted('img/logo.png').startswith('img/logo.')
+
+    cached = assets.get(name)
+    assert cached.cache_control == ASSET_CACHE_CONTROL
+    assert cached.content_type == 'text/css; charset=utf-8'
+    assert 'gzip' in cached.variants
+    assert assets.get('styles.css') is None
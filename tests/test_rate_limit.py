@@ -0,0 +1,92 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from rate_limit_handler import (
+    InflightLimiter, MemoryBucketStore, RateLimitExceeded, RateLimiter, client_ip, take_token
+)
+
+
+def make_limiter(**limits):
+    return RateLimiter.from_config({'rate_limits': limits})
+
+
+def test_take_token_refills_over_time():
+    tokens, allowed, retry_after = take_token(0.0, 0.0, 0.0, capacity=2, rate=0.5)
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+
+    tokens, allowed, _ = take_token(tokens, 0.0, 3.0, capacity=2, rate=0.5)
+    assert allowed
+    assert tokens == pytest.approx(0.5)
+
+    # Nie mehr als 'capacity' ansparen
+    tokens, allowed, _ = take_token(0.0, 0.0, 1000.0, capacity=2, rate=0.5)
+    assert allowed and tokens == pytest.approx(1.0)
+
+
+def test_limiter_rejects_burst_and_reports_retry_after():
+    limiter = make_limiter(register_email={'capacity': 2, 'per_minute': 1})
+
+    assert limiter.check(('register_email', 'anna@sluz.ch')) is None
+    assert limiter.check(('register_email', 'ANNA@sluz.ch ')) is None
+    assert limiter.check(('register_email', 'anna@sluz.ch')) == 60
+    # Andere Adresse hat einen eigenen Bucket
+    assert limiter.check(('register_email', 'bob@sluz.ch')) is None
+
+
+def test_disabled_and_unknown_scopes_are_allowed():
+    limiter = make_limiter(register_ip=None, register_username={'capacity': 0, 'per_minute': 1})
+
+    for _ in range(100):
+        assert limiter.check(('register_ip', '10.0.0.1'), ('register_username', 'Steve'), ('other', 'x')) is None
+
+
+def test_store_failure_does_not_block():
+    class BrokenStore:
+        def take(self, *args):
+            raise RuntimeError("DB weg")
+
+    limiter = RateLimiter(BrokenStore(), {'register_ip': (1.0, 1.0)})
+    assert limiter.check(('register_ip', '10.0.0.1')) is None
+
+
+def test_memory_store_prunes_idle_buckets():
+    store = MemoryBucketStore(max_keys=10)
+    for i in range(10):
+        store.take(f"k{i}", 5, 1.0, now=0.0)
+    store.take("new", 5, 1.0, now=100.0)
+
+    assert len(store._buckets) == 1
+
+
+def test_inflight_limiter_sheds_above_limit():
+    limiter = InflightLimiter(limit=2)
+    assert limiter.try_enter() and limiter.try_enter()
+    assert not limiter.try_enter()
+    limiter.leave()
+    assert limiter.try_enter()
+
+    unlimited = InflightLimiter()
+    assert all(unlimited.try_enter() for _ in range(100))
+
+
+def test_client_ip_behind_proxies():
+    assert client_ip("172.17.0.1") == "172.17.0.1"
+    assert client_ip("172.17.0.1", "1.2.3.4") == "172.17.0.1"
+    assert client_ip("172.17.0.1", "6.6.6.6, 1.2.3.4", proxy_count=1) == "1.2.3.4"
+    assert client_ip("172.17.0.1", "1.2.3.4, 10.0.0.2", proxy_count=2) == "1.2.3.4"
+    assert client_ip("172.17.0.1", "", proxy_count=1) == "172.17.0.1"
+
+
+def test_rate_limit_exceeded_messages():
+    assert "60 Sekunden" in RateLimitExceeded(60).message
+    assert "ausgelastet" in RateLimitExceeded(1, status=503).message
+
+
+def test_ip_limits_are_off_by_default():
+    limiter = RateLimiter.from_config({})
+    assert set(limiter.limits) == {'register_email', 'register_username'}
+    for _ in range(500):
+        assert limiter.check(('register_ip', '10.0.0.1'), ('confirm_ip', '10.0.0.1')) is None
@@ -0,0 +1,115 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+
+import pytest
+
+import mojang_handler
+import roster_import
+from registration_handler import ConfirmationTokens
+
+CONFIG = {'accepted_mail_endings': ['sluz.ch'], 'max_users_per_mail': 3}
+
+ROSTER = """firstname;lastname;email;school;minecraft_username
+Anna;Muster;anna@sluz.ch;KSR;Notch
+Bob;Beispiel;bob@gmail.com;KSR;jeb_
+Cara;Test;cara@sluz.ch;KSR;taken
+Dan;Test;dan@sluz.ch;KSR;ghost
+Eva;Test;eva@sluz.ch;KSR;notch
+Fred;;fred@sluz.ch;KSR;Fred
+"""
+
+
+class FakeDb:
+    def __init__(self):
+        self.next_id = 1
+        self.registrations = []
+        self.mails = []
+        # Namen, die zwischen Vorprüfung und Import über das Formular registriert werden
+        self.taken_meanwhile = set()
+
+    def get_registered_usernames(self, usernames):
+        registered = {"taken"} | {row[1].lower() for row in self.registrations}
+        return registered & {name.lower() for name in usernames}
+
+    def import_registrations(self, rows, created_at, link_for):
+        inserted = []
+        for firstname, lastname, email, school, username, uuid, max_users in rows:
+            if username.lower() in self.taken_meanwhile:
+                self.registrations.append((0, username, uuid, "web@sluz.ch", "Web"))
+                continue
+            if sum(row[3] == email for row in self.registrations + inserted) >= max_users:
+                continue
+            inserted.append((self.next_id, username, uuid, email, firstname))
+            self.next_id += 1
+        self.registrations.extend(inserted)
+        self.mails.extend(
+            (email, firstname, link_for(registration_id, username, uuid, email))
+            for registration_id, username, uuid, email, firstname in inserted
+        )
+        return inserted
+
+
+@pytest.fixture
+def fake_mojang(monkeypatch):
+    def resolve_many(usernames):
+        return {name: None if name == "ghost" else f"uuid-{name.lower()}" for name in usernames}
+    monkeypatch.setattr(mojang_handler, "resolve_many", resolve_many)
+
+
+def test_read_chunks_guesses_delimiter_and_streams_in_blocks():
+    chunks = list(roster_import.read_chunks(io.StringIO(ROSTER), chunk_size=4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    line, row = chunks[0][0]
+    assert line == 2 and row['minecraft_username'] == "Notch"
+
+
+def test_read_chunks_requires_all_columns():
+    with pytest.raises(ValueError):
+        list(roster_import.read_chunks(io.StringIO("firstname,email\nAnna,anna@sluz.ch\n"), chunk_size=10))
+
+
+def test_process_chunk_validates_resolves_and_enqueues(fake_mojang):
+    db = FakeDb()
+    tokens = ConfirmationTokens("secret")
+    job = roster_import.RosterImport(CONFIG, "https://reg.example.com", tokens)
+
+    for chunk in roster_import.read_chunks(io.StringIO(ROSTER), chunk_size=100):
+        job.process_chunk(db, chunk)
+
+    assert job.counts == {
+        'rows': 6, 'imported': 1, 'email_not_allowed': 1, 'username_taken': 1,
+        'invalid_username': 1, 'duplicate_in_file': 1, 'invalid_form': 1,
+    }
+    (recipient, firstname, link), = db.mails
+    assert recipient == "anna@sluz.ch" and firstname == "Anna"
+    assert link.startswith("https://reg.example.com/confirm_page/")
+    token = link.rsplit('/', 1)[1]
+    assert tokens.loads(token, 600) == {'rid': 1, 'uuid': "uuid-notch", 'username': "Notch", 'email': "anna@sluz.ch"}
+
+
+def test_dry_run_writes_nothing(fake_mojang):
+    db = FakeDb()
+    job = roster_import.RosterImport(CONFIG, "https://reg.example.com/", ConfirmationTokens("secret"), dry_run=True)
+
+    for chunk in roster_import.read_chunks(io.StringIO(ROSTER), chunk_size=100):
+        job.process_chunk(db, chunk)
+
+    assert job.counts['imported'] == 1
+    assert db.registrations == [] and db.mails == []
+
+
+def test_skipped_rows_tell_username_collision_from_email_limit(fake_mojang):
+    db = FakeDb()
+    db.taken_meanwhile = {"alex"}
+    db.registrations.append((99, "Steve", "uuid-steve", "anna@sluz.ch", "Anna"))
+    job = roster_import.RosterImport({**CONFIG, 'max_users_per_mail': 1}, "https://reg.example.com/", ConfirmationTokens("secret"))
+    roster = "firstname,lastname,email,school,minecraft_username\nAnna,M,anna@sluz.ch,KSR,Herobrine\nBob,B,bob@sluz.ch,KSR,Alex\n"
+
+    for chunk in roster_import.read_chunks(io.StringIO(roster), chunk_size=100):
+        job.process_chunk(db, chunk)
+
+    assert job.counts == {'rows': 2, 'imported': 0, 'email_limit': 1, 'username_taken': 1}
+    assert db.mails == []
@@ -0,0 +1,38 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mail_handler
+
+
+class FakeSmtp:
+    def __init__(self):
+        self.noops = 0
+
+    def noop(self):
+        self.noops += 1
+        return 250, b'OK'
+
+    def quit(self):
+        pass
+
+
+def test_maintain_sends_at_most_one_noop_per_keepalive_interval(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mail_handler.time, "monotonic", lambda: now[0])
+    sender = mail_handler.SmtpSender({}, idle_timeout=60.0, keepalive_interval=20.0)
+    server = sender._server = FakeSmtp()
+    sender._last_used = now[0]
+
+    for _ in range(10):
+        now[0] += 2.5
+        sender.maintain()
+    assert server.noops == 1
+
+    now[0] += 20
+    sender.maintain()
+    assert server.noops == 2
+
+    # Ohne Versand bleibt es beim Leerlauf-Timeout
+    now[0] += 20
+    sender.maintain()
+    assert sender._server is None
@@ -0,0 +1,185 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import admin_handler
+from config_handler import ConfigError, validate_config
+from database_handler import DatabaseHandler, RegistrationResult
+from migration_handler import run_migrations
+from sqlite_database_handler import SqliteDatabaseHandler
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = {'db_backend': 'sqlite', 'db_sqlite_path': str(tmp_path / 'registration.db')}
+    with DatabaseHandler(config) as db:
+        db.create_table()
+        run_migrations(db)
+    return config
+
+
+def register(db, username, email='anna@sluz.ch', created_at=NOW, limit=3):
+    return db.try_register('Anna', 'Muster', email, 'KSR', username, 'uuid-' + username.lower(), limit, created_at)
+
+
+def test_backend_is_selected_by_config(config):
+    with DatabaseHandler(config) as db:
+        assert isinstance(db, SqliteDatabaseHandler)
+        assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_register_limits_and_unique_username(config):
+    with DatabaseHandler(config) as db:
+        result, registration_id = register(db, 'Steve', limit=2)
+        assert result is RegistrationResult.OK and registration_id
+        assert register(db, 'steve', email='bob@sluz.ch') == (RegistrationResult.USERNAME_TAKEN, None)
+        assert register(db, 'Alex', email='ANNA@sluz.ch', limit=2)[0] is RegistrationResult.OK
+        assert register(db, 'Herobrine', limit=2) == (RegistrationResult.EMAIL_LIMIT, None)
+
+        assert db.get_user_count_by_email('anna@sluz.ch') == 2
+        assert db.is_username_exists('STEVE')
+        assert db.get_registered_usernames(['Steve', 'Notch']) == {'steve'}
+
+        later = NOW + timedelta(minutes=5)
+        assert db.refresh_pending_registration('anna@sluz.ch', 'Steve', later) == (registration_id, 'uuid-steve')
+        assert db.get_oldest_unconfirmed_created_at() == NOW
+
+
+def test_register_queues_confirmation_mail_in_same_transaction(config):
+    with DatabaseHandler(config) as db:
+        result, registration_id = db.try_register(
+            'Anna', 'Muster', 'anna@sluz.ch', 'KSR', 'Steve', 'uuid-steve', 3, NOW,
+            link_for=lambda rid: f'https://x/confirm_page/{rid}'
+        )
+        assert result is RegistrationResult.OK
+        assert db.claim_mail_batch(10, lease_seconds=300)[0][1:4] == (
+            'anna@sluz.ch', 'Anna', f'https://x/confirm_page/{registration_id}'
+        )
+
+        # Scheitert der Mail-Eintrag, bleibt auch keine Registrierung stehen
+        with pytest.raises(ZeroDivisionError):
+            db.try_register(
+                'Bob', 'Beispiel', 'bob@sluz.ch', 'KSR', 'Alex', 'uuid-alex', 3, NOW, link_for=lambda rid: 1 / 0
+            )
+        assert not db.is_username_exists('Alex')
+
+
+def test_confirm_and_whitelist_is_idempotent(config):
+    with DatabaseHandler(config) as db:
+        _, registration_id = register(db, 'Steve')
+        assert db.confirm_and_whitelist(registration_id, 'Steve', 'uuid-steve')
+        assert db.confirm_and_whitelist(registration_id, 'Steve', 'uuid-steve')
+        assert not db.confirm_and_whitelist(registration_id + 1, 'Steve', 'uuid-steve')
+
+        assert db.get_whitelist_entries(['uuid-steve'], []) == [('uuid-steve', 'Steve')]
+        assert db.get_latest_registration_profile('anna@sluz.ch') == ('Steve', 'uuid-steve')
+        assert [rows for rows in db.iter_confirmed_registrations(10)] == [[('Steve', 'uuid-steve')]]
+
+
+def test_whitelist_write_updates_name_of_known_uuid(config):
+    with DatabaseHandler(config) as db:
+        _, registration_id = register(db, 'Steve')
+        db.confirm_and_whitelist(registration_id, 'Steve', 'uuid-steve')
+        db.insert_into_whitelist('uuid-steve', 'Steve2')
+        assert db.get_whitelist_entries(['uuid-steve'], []) == [('uuid-steve', 'Steve2')]
+
+        db.insert_into_whitelist_many([('uuid-steve', 'Steve3'), ('uuid-alex', 'Alex')])
+        assert sorted(db.get_whitelist_entries(['uuid-steve', 'uuid-alex'], [])) == [
+            ('uuid-alex', 'Alex'), ('uuid-steve', 'Steve3')
+        ]
+
+
+def test_whitelisted_count_normalizes_uuids_and_counts_each_registration_once(config):
+    steve, alex = '8667ba71b85a4004af54457a9734eed7', '6ab4317889fd490597f60f67d9d76fd9'
+    with DatabaseHandler(config) as db:
+        _, steve_id = db.try_register('Anna', 'Muster', 'anna@sluz.ch', 'KSR', 'Steve', steve, 3, NOW)
+        _, alex_id = db.try_register('Bob', 'Beispiel', 'bob@sluz.ch', 'KSR', 'Alex', alex, 3, NOW)
+        db.confirm_and_whitelist(steve_id, 'Steve', steve)
+        db.confirm_registration('bob@sluz.ch')
+        # Steve steht doppelt auf der Whitelist, Alex nur mit Bindestrichen
+        db.insert_into_whitelist_many([
+            ('8667ba71-b85a-4004-af54-457a9734eed7', 'Steve'), ('6ab43178-89fd-4905-97f6-0f67d9d76fd9', 'Alex')
+        ])
+
+        assert db.get_registration_stats()[2] == 2
+
+
+def test_cleaner_deletes_expired_chunks_under_lock(config):
+    with DatabaseHandler(config) as db:
+        for i in range(5):
+            register(db, f"old{i}", email=f"old{i}@sluz.ch", created_at=NOW - timedelta(hours=2))
+        register(db, 'fresh', email='fresh@sluz.ch')
+
+        assert db.acquire_lock('cleaner')
+        with DatabaseHandler(config) as other:
+            assert not other.acquire_lock('cleaner')
+
+        assert len(db.delete_unconfirmed_chunk(NOW - timedelta(hours=1), 3)) == 3
+        assert [row[2] for row in db.delete_unconfirmed_chunk(NOW - timedelta(hours=1), 3)] == ['old3', 'old4']
+        db.release_lock('cleaner')
+        assert db.is_username_exists('fresh')
+
+
+def test_import_skips_taken_names_and_queues_mails_in_same_transaction(config):
+    with DatabaseHandler(config) as db:
+        register(db, 'Steve', email='web@sluz.ch')
+        rows = [
+            ('Anna', 'Muster', 'anna@sluz.ch', 'KSR', 'steve', 'uuid-steve', 3),
+            ('Bob', 'Beispiel', 'bob@sluz.ch', 'KSR', 'Alex', 'uuid-alex', 3),
+        ]
+        inserted = db.import_registrations(rows, NOW, lambda rid, username, uuid, email: f'https://x/{rid}/{username}')
+        assert [row[1:] for row in inserted] == [('Alex', 'uuid-alex', 'bob@sluz.ch', 'Bob')]
+        assert db.claim_mail_batch(10, lease_seconds=300)[0][1:4] == ('bob@sluz.ch', 'Bob', f'https://x/{inserted[0][0]}/Alex')
+
+        # Andere Fehler als der vergebene Name werden nicht verschluckt, nichts bleibt stehen
+        with pytest.raises(Exception):
+            db.import_registrations(
+                [('Cara', 'Test', 'cara@sluz.ch', 'KSR', 'Cara', 'uuid-cara', 3)], NOW,
+                lambda *args: 1 / 0
+            )
+        assert not db.is_username_exists('Cara')
+
+
+def test_mail_queue_claim_and_cooldown(config):
+    with DatabaseHandler(config) as db:
+        mail_id = db.enqueue_mail('anna@sluz.ch', 'Anna', 'https://example.com/confirm_page/x')
+        assert db.enqueue_mail_unless_recent('anna@sluz.ch', 'Anna', 'https://example.com/x', 300) is None
+        assert db.enqueue_mail_unless_recent('bob@sluz.ch', 'Bob', 'https://example.com/y', 300)
+
+        batch = db.claim_mail_batch(10, lease_seconds=300)
+        assert [row[0] for row in batch] == [mail_id, mail_id + 1]
+        assert batch[0][4] == 1
+        assert db.claim_mail_batch(10, lease_seconds=300) == []
+
+        db.mark_mail_sent(mail_id)
+        db.reschedule_mail(mail_id + 1, 0, 'SMTP weg', failed=True)
+        _, mail_rows, _ = db.get_registration_stats()
+        assert dict(mail_rows) == {'sent': 1, 'failed': 1}
+
+
+def test_admin_export_query_runs_on_sqlite(config):
+    with DatabaseHandler(config) as db:
+        register(db, 'Steve', created_at=NOW)
+        register(db, 'Alex', created_at=NOW - timedelta(days=3))
+        query, params = admin_handler.build_export_query({'school': 'KSR', 'from': '2026-03-01', 'to': '2026-03-01'})
+
+        rows = [row for batch in db.stream_rows(query, params, 10) for row in batch]
+        assert [row[5] for row in rows] == ['Steve']
+        assert rows[0][8] == NOW
+
+
+def test_config_without_mysql_credentials_for_sqlite():
+    base = {
+        'waiting_time_for_db_cleaner': 60, 'smtp_server': 'smtp', 'smtp_port': 587,
+        'smtp_username': 'u', 'smtp_password': 'p'
+    }
+    assert validate_config({**base, 'db_backend': 'sqlite'})
+    with pytest.raises(ConfigError, match='db_host'):
+        validate_config(dict(base))
+    with pytest.raises(ConfigError, match='db_backend'):
+        validate_config({**base, 'db_backend': 'postgres'})
@@ -0,0 +1,40 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from whitelist_reconciler import _uuid_variants, plan_batch
+
+NOTCH = "069a79f444e94726a5befca90e38aaf5"
+JEB = "853c80ef3c3749fdaa49938b674adae6"
+
+
+def test_missing_players_are_added():
+    missing, stale = plan_batch([("Notch", NOTCH), ("jeb_", JEB)], [(NOTCH, "Notch")])
+
+    assert missing == [(JEB, "jeb_")]
+    assert stale == []
+
+
+def test_matching_entries_are_left_alone():
+    dashed = _uuid_variants(NOTCH)[1]
+    missing, stale = plan_batch([("Notch", NOTCH)], [(dashed, "notch")])
+
+    assert missing == [] and stale == []
+
+
+def test_stale_uuid_and_renamed_player_are_replaced():
+    missing, stale = plan_batch(
+        [("Notch", NOTCH), ("jeb_", JEB)],
+        [("00000000000000000000000000000000", "Notch"), (JEB, "old_name")]
+    )
+
+    assert sorted(missing) == sorted([(NOTCH, "Notch"), (JEB, "jeb_")])
+    assert sorted(stale) == sorted([("00000000000000000000000000000000", "Notch"), (JEB, "old_name")])
+
+
+def test_registrations_without_uuid_are_skipped():
+    assert plan_batch([("ghost", None)], []) == ([], [])
+
+
+def test_uuid_variants():
+    assert _uuid_variants(NOTCH) == [NOTCH, "069a79f4-44e9-4726-a5be-fca90e38aaf5"]
+    assert _uuid_variants("069A79F4-44E9-4726-A5BE-FCA90E38AAF5")[0] == NOTCH
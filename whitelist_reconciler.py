@@ -0,0 +1,118 @@
+# Abgleich registrations <-> mysql_whitelist: trägt fehlende Spieler nach, ersetzt veraltete
+# Einträge und löst fehlende UUIDs bei Mojang auf (z.B. nach einem Ausfall beim Bestätigen).
+# Aufruf: python whitelist_reconciler.py [--dry-run] [--batch-size 500]
+import argparse
+import sys
+import mojang_handler
+from config_handler import get_config
+from database_handler import DatabaseHandler
+from log_handler import *
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _normalize_uuid(uuid) -> str:
+    return (uuid or "").replace("-", "").lower()
+
+
+def _uuid_variants(uuid) -> list:
+    """
+    UUID ohne und mit Bindestrichen (je nachdem, wie sie in mysql_whitelist steht).
+    """
+    plain = _normalize_uuid(uuid)
+    if len(plain) != 32:
+        return [plain]
+    return [plain, f"{plain[:8]}-{plain[8:12]}-{plain[12:16]}-{plain[16:20]}-{plain[20:]}"]
+
+
+def plan_batch(registrations, whitelist_entries):
+    """
+    Vergleicht einen Block bestätigter Registrierungen [(name, uuid)] mit den passenden
+    Whitelist-Zeilen [(UUID, user)]. Liefert (einzutragen, zu löschen), beide als (UUID, user).
+    Whitelist-Einträge ohne Registrierung (z.B. von Hand eingetragen) bleiben unberührt.
+    """
+    by_uuid = {}
+    by_user = {}
+    for entry in whitelist_entries:
+        by_uuid.setdefault(_normalize_uuid(entry[0]), []).append(entry)
+        by_user.setdefault(entry[1].lower(), []).append(entry)
+
+    missing, stale = [], []
+    for username, uuid in registrations:
+        if not uuid:
+            continue
+        key = _normalize_uuid(uuid)
+
+        # Gleicher Name mit anderer UUID oder gleiche UUID mit anderem Namen: veraltet
+        for entry in by_user.get(username.lower(), []):
+            if _normalize_uuid(entry[0]) != key and entry not in stale:
+                stale.append(entry)
+        current = by_uuid.get(key, [])
+        for entry in current:
+            if entry[1].lower() != username.lower() and entry not in stale:
+                stale.append(entry)
+
+        if not any(entry[1].lower() == username.lower() for entry in current):
+            missing.append((uuid, username))
+    return missing, stale
+
+
+def reconcile(config, batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False) -> dict:
+    """
+    Streamt die bestätigten Registrierungen blockweise und repariert die Whitelist.
+    Liefert die Zähler des Durchlaufs.
+    """
+    stats = {'checked': 0, 'missing': 0, 'stale': 0, 'resolved': 0, 'unresolved': 0}
+
+    # Zwei Verbindungen: eine bleibt durch den ungepufferten Cursor belegt
+    with DatabaseHandler(config) as reader, DatabaseHandler(config) as writer:
+        for batch in reader.iter_confirmed_registrations(batch_size):
+            stats['checked'] += len(batch)
+
+            without_uuid = [name for name, uuid in batch if not uuid]
+            if without_uuid:
+                resolved = {name: uuid for name, uuid in mojang_handler.resolve_many(without_uuid).items() if uuid}
+                stats['resolved'] += len(resolved)
+                stats['unresolved'] += len(without_uuid) - len(resolved)
+                if resolved and not dry_run:
+                    writer.set_registration_uuids([(uuid, name) for name, uuid in resolved.items()])
+                batch = [(name, uuid or resolved.get(name)) for name, uuid in batch]
+
+            uuids = [variant for _, uuid in batch if uuid for variant in _uuid_variants(uuid)]
+            entries = writer.get_whitelist_entries(uuids, [name for name, _ in batch])
+            missing, stale = plan_batch(batch, entries)
+            stats['missing'] += len(missing)
+            stats['stale'] += len(stale)
+
+            for uuid, user in stale:
+                logger.info(f"Whitelist: veralteter Eintrag {user} ({uuid}).")
+            for uuid, user in missing:
+                logger.info(f"Whitelist: {user} ({uuid}) fehlt.")
+            if not dry_run:
+                writer.delete_whitelist_entries(stale)
+                writer.insert_into_whitelist_many(missing)
+
+    logger.info(
+        f"Whitelist-Abgleich{' (Probelauf)' if dry_run else ''}: {stats['checked']} bestätigte Registrierungen, "
+        f"{stats['missing']} fehlend, {stats['stale']} veraltet, {stats['resolved']} UUIDs nachgetragen, "
+        f"{stats['unresolved']} nicht auflösbar."
+    )
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gleicht mysql_whitelist mit den bestätigten Registrierungen ab.")
+    parser.add_argument("--dry-run", action="store_true", help="nur prüfen, nichts schreiben (Exit-Code 1 bei Abweichungen)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Registrierungen pro Block")
+    args = parser.parse_args(argv)
+
+    config = get_config()
+    mojang_handler.configure(config)
+    stats = reconcile(config, batch_size=args.batch_size, dry_run=args.dry_run)
+    if args.dry_run and (stats['missing'] or stats['stale'] or stats['resolved']):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())